@@ -0,0 +1,85 @@
+"""Recall vs. latency of the approximate "ivf_sq8" neighbour backend against exact search.
+
+For each (n_lists, refine, n_probe) setting it reports recall@k of the neighbour
+sets, how often top_candidates_from_dataset picks the same best crop and
+the same top-5 as the exact engine, median query latency and index size.
+Runs on the bundled dataset and, with --rows, on a synthetic one of that
+size. Run from the repository root:
+
+    python -m benchmarks.ann [--rows 1000000] [--probes 1 2 4 8 16 32] [--refine 0 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, sample_readings
+from benchmarks.synthetic import synthetic_dataset
+from utils.dataset_index import FEATURES
+from utils.neighbors import build_neighbor_ranker
+
+
+def evaluate(exact, approx, queries, k, n_probe):
+    approx.backend.n_probe = n_probe  # top_candidates queries with the backend default
+    recall, top1, top5, latencies = [], [], [], []
+    for q in queries:
+        x = np.array([q[f] for f in FEATURES], dtype=np.float64)
+        ref_idx, _ = exact.backend.query(x, k)
+        start = time.perf_counter()
+        idx, _ = approx.backend.query(x, k)
+        latencies.append(time.perf_counter() - start)
+        recall.append(len(np.intersect1d(ref_idx, idx)) / max(len(ref_idx), 1))
+        want, got = exact.top_candidates(q, 5, k), approx.top_candidates(q, 5, k)
+        top1.append(want[0]["crop"] == got[0]["crop"])
+        top5.append([c["crop"] for c in want] == [c["crop"] for c in got])
+    return np.mean(recall), np.mean(top1), np.mean(top5), np.median(latencies) * 1e3
+
+
+def exact_latency(exact, queries, k):
+    latencies = []
+    for q in queries:
+        x = np.array([q[f] for f in FEATURES], dtype=np.float64)
+        start = time.perf_counter()
+        exact.backend.query(x, k)
+        latencies.append(time.perf_counter() - start)
+    return np.median(latencies) * 1e3
+
+
+def report(name, df, args):
+    queries = sample_readings(df, args.queries, seed=1)
+    exact = build_neighbor_ranker(df, backend="brute")
+    exact_ms = exact_latency(exact, queries, args.k)
+    print(f"\n{name}: {len(df)} rows, k={args.k}; exact brute force p50 {exact_ms:.3f} ms, "
+          f"{exact.backend.matrix.nbytes / 1e6:.1f} MB float matrix")
+    print(f"{'n_lists':>7} {'refine':>6} {'n_probe':>7} {'recall@k':>9} {'top-1':>7} {'top-5':>7} {'p50 ms':>8} {'speedup':>8} {'index MB':>9}")
+    list_counts = args.lists or [int(round(np.sqrt(len(df))))]
+    for n_lists in list_counts:
+        for refine in args.refine:
+            approx = build_neighbor_ranker(df, backend="ivf_sq8", n_lists=n_lists, refine=refine)
+            for n_probe in args.probes:
+                recall, top1, top5, ms = evaluate(exact, approx, queries, args.k, n_probe=n_probe)
+                print(f"{approx.backend.n_lists:>7} {refine:>6} {n_probe:>7} {recall:>9.3f} {top1:>7.3f} {top5:>7.3f} "
+                      f"{ms:>8.3f} {exact_ms / ms:>7.1f}x {approx.backend.nbytes / 1e6:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=0, help="also run on a synthetic dataset of this size")
+    parser.add_argument("--lists", type=int, nargs="+", help="n_lists settings (default sqrt(rows))")
+    parser.add_argument("--refine", type=int, nargs="+", default=[0, 2], help="refine settings (0 = codes only)")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=200, help="neighbours per query (top_candidates' nearest_k)")
+    args = parser.parse_args()
+
+    report("bundled dataset", pd.read_csv(DATA_PATH), args)
+    if args.rows:
+        report("synthetic dataset", synthetic_dataset(args.rows, seed=0), args)
+
+
+if __name__ == "__main__":
+    main()
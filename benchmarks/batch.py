@@ -0,0 +1,94 @@
+"""Throughput of the batch recommendation path against per-row model calls.
+
+Uses models/crop_model.pkl when present, otherwise trains the notebook's
+RandomForestClassifier(n_estimators=200, random_state=42) on the bundled data.
+Run from the repository root:
+
+    python -m benchmarks.batch [--rows 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.batch import recommend_batch
+from utils.dataset_index import FEATURES, build_dataset_index
+from utils.rules import generate_growing_tips
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+DATA_PATH = os.path.join(ROOT, "data", "crop_recommendation2_cleaned.csv")
+MODEL_PATH = os.path.join(ROOT, "models", "crop_model.pkl")
+
+
+def load_model(df):
+    if os.path.exists(MODEL_PATH):
+        import joblib
+        return joblib.load(MODEL_PATH)
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_estimators=200, random_state=42)
+    return model.fit(df[FEATURES], df["label"])
+
+
+def sample_readings(df, count, seed=0):
+    rng = np.random.default_rng(seed)
+    lo = df[FEATURES].min().to_numpy()
+    hi = df[FEATURES].max().to_numpy()
+    soils = np.array(["Clay", "Sandy", "Loam", "Silt"])
+    climates = np.array(["Tropical Wet", "Tropical Dry", "Urban Heat Zone", "Temperate"])
+    X = rng.uniform(lo, hi, size=(count, len(FEATURES)))
+    return [
+        dict(zip(FEATURES, row), soil_type=s, climate=c)
+        for row, s, c in zip(X.tolist(), rng.choice(soils, count), rng.choice(climates, count))
+    ]
+
+
+def per_row_recommend(model, reading):
+    """The single-request path from recommend(): one-row frame, one model call."""
+    X = pd.DataFrame([[reading[f] for f in FEATURES]], columns=FEATURES)
+    proba = model.predict_proba(X)[0]
+    classes = list(getattr(model, "classes_", []))
+    ranked = sorted(zip(classes, proba), key=lambda t: t[1], reverse=True)
+    suggestions = [{"crop": str(c), "suitability": int(round(p * 100))} for c, p in ranked[:5]]
+    crop = suggestions[0]["crop"]
+    return {"crop": crop, "suggestions": suggestions, "tips": generate_growing_tips(reading, crop)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--per-row-sample", type=int, default=200)
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    model = load_model(df)
+    index = build_dataset_index(df)
+    readings = sample_readings(df, args.rows)
+
+    sample = readings[:args.per_row_sample]
+    start = time.perf_counter()
+    single = [per_row_recommend(model, r) for r in sample]
+    per_row_s = (time.perf_counter() - start) / len(sample)
+
+    batched = recommend_batch(sample, model=model, dataset_index=index)
+    mismatches = sum(a != b for a, b in zip(single, batched))
+
+    start = time.perf_counter()
+    recommend_batch(readings, model=model, dataset_index=index)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recommend_batch(readings, model=None, dataset_index=index)
+    fallback_s = time.perf_counter() - start
+
+    print(f"per-row model path:       {1 / per_row_s:10.0f} rows/s  ({per_row_s * 1e3:.2f} ms/row)")
+    print(f"batch model path:         {args.rows / batch_s:10.0f} rows/s  ({args.rows} rows in {batch_s:.2f} s)")
+    print(f"batch dataset fallback:   {args.rows / fallback_s:10.0f} rows/s")
+    print(f"batch vs per-row results: {mismatches} mismatches over {len(sample)} rows")
+
+
+if __name__ == "__main__":
+    main()
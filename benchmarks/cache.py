@@ -0,0 +1,58 @@
+"""Latency of repeated /recommend pipeline calls with and without the result cache.
+
+Trains the notebook's RandomForest when models/crop_model.pkl is missing so
+the model path is exercised. Run from the repository root:
+
+    python -m benchmarks.cache [--calls 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'web_app')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+
+
+def percentiles(samples):
+    arr = np.array(samples) * 1e3
+    return {p: np.percentile(arr, p) for p in (50, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct readings cycled through")
+    args = parser.parse_args()
+
+    import app as web_app
+    web_app.resources.model.set(load_model(pd.read_csv(DATA_PATH)))
+
+    readings = sample_readings(pd.read_csv(DATA_PATH), args.distinct)
+    calls = [readings[i % len(readings)] for i in range(args.calls)]
+
+    runs = (
+        ("uncached", web_app.build_recommendation, False),
+        ("cold cache", web_app.cached_recommendation, False),
+        ("warm cache", web_app.cached_recommendation, True),
+    )
+    for label, fn, warm in runs:
+        if warm:
+            for r in readings:
+                fn(r)
+        samples = []
+        for r in calls:
+            start = time.perf_counter()
+            fn(r)
+            samples.append(time.perf_counter() - start)
+        p = percentiles(samples)
+        print(f"{label:>10}: p50 {p[50]:8.3f} ms   p99 {p[99]:8.3f} ms")
+    print(f"cache stats: {web_app.recommendation_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
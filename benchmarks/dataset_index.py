@@ -0,0 +1,107 @@
+"""Before/after micro-benchmark for the dataset fallback ranking.
+
+Run from the repository root:
+
+    python -m benchmarks.dataset_index
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.dataset_index import build_dataset_index
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "crop_recommendation2_cleaned.csv")
+
+
+def legacy_top_crops_by_dataset(df, inputs, k=5):
+    """Per-request pandas implementation that the index replaced."""
+    label_col = None
+    for c in df.columns:
+        lc = str(c).strip().lower()
+        if lc in ("label", "crop", "crops"):
+            label_col = c
+            break
+    if not label_col:
+        return []
+
+    feature_cols = [c for c in ["n","p","k","temperature","humidity","ph","rainfall"] if c in df.columns]
+    if not feature_cols:
+        return []
+
+    work = df[[label_col] + feature_cols].copy()
+    mins = work[feature_cols].min()
+    maxs = work[feature_cols].max()
+    ranges = (maxs - mins).replace(0, 1)
+
+    try:
+        x = pd.Series({c: float(inputs[c]) for c in feature_cols})
+    except Exception:
+        return []
+
+    x_norm = (x - mins) / ranges
+    X_norm = (work[feature_cols] - mins) / ranges
+    dists = ((X_norm - x_norm) ** 2).sum(axis=1) ** 0.5
+    work["_dist"] = dists
+
+    best = work.groupby(label_col)["_dist"].min().reset_index().sort_values("_dist")
+    if best.empty:
+        return []
+
+    d_max = best["_dist"].max()
+    eps = 1e-9
+    best["suitability"] = ((1.0 - best["_dist"] / (d_max + eps)) * 100).clip(lower=0, upper=100)
+
+    suggestions = []
+    for _, row in best.head(max(1, int(k))).iterrows():
+        suggestions.append({
+            "crop": str(row[label_col]).strip(),
+            "suitability": int(round(row["suitability"]))
+        })
+    return suggestions
+
+
+def random_queries(df, count, seed=0):
+    rng = np.random.default_rng(seed)
+    feats = ["n", "p", "k", "temperature", "humidity", "ph", "rainfall"]
+    lo = df[feats].min().to_numpy()
+    hi = df[feats].max().to_numpy()
+    return [dict(zip(feats, row)) for row in rng.uniform(lo, hi, size=(count, len(feats)))]
+
+
+def main():
+    df = pd.read_csv(DATA_PATH)
+    queries = random_queries(df, 200)
+
+    build_s = timeit.timeit(lambda: build_dataset_index(df), number=20) / 20
+    index = build_dataset_index(df)
+
+    # Agreement: same crops in the same order; suitability may differ by one
+    # point where float32 distances round differently.
+    mismatches = 0
+    for q in queries:
+        old = legacy_top_crops_by_dataset(df, q)
+        new = index.top_crops(q)
+        if [s["crop"] for s in old] != [s["crop"] for s in new] or any(
+            abs(a["suitability"] - b["suitability"]) > 1 for a, b in zip(old, new)
+        ):
+            mismatches += 1
+
+    reps = 5
+    old_s = timeit.timeit(lambda: [legacy_top_crops_by_dataset(df, q) for q in queries], number=reps)
+    new_s = timeit.timeit(lambda: [index.top_crops(q) for q in queries], number=reps)
+    old_us = old_s / (reps * len(queries)) * 1e6
+    new_us = new_s / (reps * len(queries)) * 1e6
+
+    print(f"rows: {len(df)}  queries: {len(queries)}  ranking mismatches: {mismatches}")
+    print(f"index build (once per load): {build_s * 1e3:.2f} ms")
+    print(f"legacy pandas per query:     {old_us:9.1f} us")
+    print(f"DatasetIndex per query:      {new_us:9.1f} us")
+    print(f"speedup:                     {old_us / new_us:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Per-call predict_proba latency: scikit-learn model vs. the exported ForestPredictor.
+
+Uses models/crop_model.pkl when present, otherwise trains the notebook's
+RandomForestClassifier(n_estimators=200, random_state=42) on the bundled
+data. Exports it with utils.forest, checks predict_proba is identical on
+every batch and reports median/p99 latency per call for each batch size.
+Run from the repository root:
+
+    python -m benchmarks.forest [--sizes 1 8 64 1000] [--calls 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+from utils.dataset_index import FEATURES
+from utils.forest import export_forest, load_forest
+
+
+def latency(fn, batches, calls):
+    fn(batches[0])  # warm-up
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(batches[i % len(batches)])
+        times.append(time.perf_counter() - start)
+    ms = np.array(times) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 64, 1000])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    model = load_model(df)
+    readings = pd.DataFrame(sample_readings(df, max(args.sizes) * 8, seed=0))[FEATURES]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        manifest = export_forest(model, tmp)
+        export_s = time.perf_counter() - start
+        size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+        forest = load_forest(tmp)
+        print(f"{manifest['source']}: {manifest['n_trees']} trees, {manifest['n_nodes']} nodes, depth "
+              f"{manifest['max_depth']}; export {export_s:.2f} s, {size_mb:.1f} MB on disk")
+        print(f"{'rows':>6} {'sklearn p50':>12} {'p99':>9} {'forest p50':>11} {'p99':>9} {'speedup':>8} {'identical':>9}")
+        for size in args.sizes:
+            batches = [readings.iloc[i:i + size] for i in range(0, size * 8, size)]
+            identical = all(np.array_equal(model.predict_proba(b), forest.predict_proba(b)) for b in batches)
+            calls = max(10, args.calls // max(1, size // 64))
+            sk50, sk99 = latency(model.predict_proba, batches, calls)
+            fo50, fo99 = latency(forest.predict_proba, batches, calls)
+            print(f"{size:>6} {sk50:>9.3f} ms {sk99:>6.3f} ms {fo50:>8.3f} ms {fo99:>6.3f} ms {sk50 / fo50:>7.1f}x "
+                  f"{'yes' if identical else 'NO':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Transfer bytes and time-to-first-byte for the HTML pages and their assets, VERDANTIA_STATIC_CACHE off vs. on.
+
+Starts web_app/serve.py once per mode and loads each page like a browser
+that accepts gzip and brotli. A first visit fetches the page and every
+asset it references (stylesheets, scripts, images and CSS url()s) with an
+empty cache. A repeat visit skips assets whose Cache-Control max-age is
+still fresh and revalidates the rest with If-None-Match /
+If-Modified-Since. Bytes are counted as sent on the wire (compressed
+bodies plus headers). TTFB is the median time from request to parsed
+response headers over ``--requests`` page loads.
+Run from the repository root:
+
+    python -m benchmarks.frontend [--requests 200]
+"""
+import argparse
+import gzip
+import http.client
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.load_test import SERVE, free_port
+
+PAGES = ("/", "/select", "/recommend", "/advisor")
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br", "Accept": "text/html,*/*"}
+HTML_REF = re.compile(r'(?:href|src)="(/(?:static|assets)/[^"]+)"')
+CSS_REF = re.compile(r"""url\(['"]?(/(?:static|assets)/[^'")]+)['"]?\)""")
+
+
+def fetch(conn, path, headers=None):
+    """(status, headers, raw body, wire bytes, seconds to headers)."""
+    start = time.perf_counter()
+    conn.request("GET", path, headers=dict(BROWSER_HEADERS, **(headers or {})))
+    resp = conn.getresponse()
+    ttfb = time.perf_counter() - start
+    body = resp.read()
+    head = {k.lower(): v for k, v in resp.getheaders()}
+    wire = len(body) + sum(len(k) + len(v) + 4 for k, v in resp.getheaders()) + 17
+    return resp.status, head, body, wire, ttfb
+
+
+def decoded(head, body):
+    return gzip.decompress(body) if head.get("content-encoding") == "gzip" else body
+
+
+def max_age(head):
+    match = re.search(r"max-age=(\d+)", head.get("cache-control", ""))
+    return int(match.group(1)) if match and "no-cache" not in head.get("cache-control", "") else 0
+
+
+def visit(conn, page, cache):
+    """Load ``page`` and its assets through ``cache``; return (requests, wire bytes, page TTFB)."""
+    requests, wire_total, page_ttfb = 0, 0, None
+    queue, seen = [page], set()
+    while queue:
+        path = queue.pop(0)
+        if path in seen:
+            continue
+        seen.add(path)
+        entry = cache.get(path)
+        if entry and entry["expires"] > time.monotonic():
+            body = entry["body"]
+        else:
+            validators = {}
+            if entry and entry.get("etag"):
+                validators["If-None-Match"] = entry["etag"]
+            if entry and entry.get("last-modified"):
+                validators["If-Modified-Since"] = entry["last-modified"]
+            status, head, raw, wire, ttfb = fetch(conn, path, validators)
+            requests += 1
+            wire_total += wire
+            if page_ttfb is None:
+                page_ttfb = ttfb
+            if status == 304 and entry:
+                body = entry["body"]
+            else:
+                body = decoded(head, raw)
+            cache[path] = {"body": body, "etag": head.get("etag") or (entry or {}).get("etag"),
+                           "last-modified": head.get("last-modified"), "expires": time.monotonic() + max_age(head)}
+        if path.endswith(".css") or path == page:
+            text = body.decode("utf-8", "replace")
+            refs = HTML_REF.findall(text) + CSS_REF.findall(text)
+            queue.extend(refs)
+    return requests, wire_total, page_ttfb
+
+
+def measure(static_cache, args):
+    port = free_port()
+    tmp = os.path.join(tempfile.gettempdir(), "verdantia-frontend-benchmark")
+    env = dict(os.environ, VERDANTIA_STATIC_CACHE=static_cache, VERDANTIA_LOAD_MODE="lazy",
+               VERDANTIA_MODEL_PATH=os.path.join(tmp, "missing.pkl"), VERDANTIA_SHARED_DIR=os.path.join(tmp, "missing"))
+    server = subprocess.Popen([sys.executable, SERVE, "--port", str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                fetch(conn, "/")
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        rows = []
+        for page in PAGES:
+            cache = {}
+            first = visit(conn, page, cache)
+            repeat = visit(conn, page, cache)
+            ttfbs = [fetch(conn, page)[4] for _ in range(args.requests)]
+            rows.append((page, first, repeat, np.median(ttfbs) * 1e3))
+        conn.close()
+        return rows
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="page loads per TTFB median")
+    args = parser.parse_args()
+
+    print(f"{'page':<11} {'mode':<4} {'first: reqs':>11} {'KB':>9} {'repeat: reqs':>12} {'KB':>7} {'TTFB p50 ms':>12}")
+    results = {mode: measure(mode, args) for mode in ("off", "on")}
+    for i, page in enumerate(PAGES):
+        for mode in ("off", "on"):
+            _, first, repeat, ttfb = results[mode][i]
+            print(f"{page:<11} {mode:<4} {first[0]:>11} {first[1] / 1024:>9.1f} {repeat[0]:>12} {repeat[1] / 1024:>7.1f} "
+                  f"{ttfb:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Throughput and latency of POST /recommend at rising concurrency.
+
+Starts web_app/serve.py on a free port (or targets ``--url``) with the
+notebook's RandomForest when models/crop_model.pkl is missing, waits for
+/ready and then, for each concurrency level, keeps that many client
+threads posting random readings for ``--duration`` seconds. Readings are
+drawn fresh per request so the result cache does not hide inference cost.
+Run from the repository root:
+
+    python -m benchmarks.load_test [--concurrency 1 4 16 64] [--duration 5]
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+
+SERVE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "web_app", "serve.py"))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/ready", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def client(url, readings, stop, latencies, statuses):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    i = 0
+    while not stop.is_set():
+        body = urllib.parse.urlencode(readings[i % len(readings)])
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/recommend", body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except Exception:
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            status = 0
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+    conn.close()
+
+
+def run_level(url, concurrency, duration, readings):
+    stop = threading.Event()
+    latencies, statuses = [], []
+    threads = [
+        threading.Thread(target=client, args=(url, readings[i::concurrency], stop, latencies, statuses))
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    statuses = np.array(statuses)
+    ok = np.array(latencies)[statuses == 200] * 1e3
+    p50, p95, p99 = np.percentile(ok, [50, 95, 99]) if len(ok) else (float("nan"),) * 3
+    return len(ok) / duration, p50, p95, p99, int((statuses == 503).sum()), int(((statuses != 200) & (statuses != 503)).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="existing server to target instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=64, help="server connection threads")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    readings = sample_readings(df, 20000)
+
+    server = None
+    tmp = tempfile.mkdtemp()
+    url = args.url
+    if url is None:
+        import joblib
+        model_path = os.path.join(tmp, "crop_model.pkl")
+        joblib.dump(load_model(df), model_path)
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ, VERDANTIA_MODEL_PATH=model_path, VERDANTIA_SHARED_DIR=os.path.join(tmp, "missing"))
+        server = subprocess.Popen([sys.executable, SERVE, "--port", str(port), "--threads", str(args.threads)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url)
+        print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'503s':>6} {'errors':>6}")
+        for c in args.concurrency:
+            rps, p50, p95, p99, busy, errors = run_level(url, c, args.duration, readings)
+            print(f"{c:>5} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {busy:>6} {errors:>6}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
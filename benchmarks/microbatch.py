@@ -0,0 +1,79 @@
+"""Per-request inference vs. micro-batched inference at 50-500 concurrent clients.
+
+Imports web_app/app.py with the result cache off and the notebook's
+RandomForest (when models/crop_model.pkl is missing), then has N client
+threads call cached_recommendation() on random readings for a fixed time,
+once with one predict_proba per request and once through the micro-batcher.
+Run from the repository root:
+
+    python -m benchmarks.microbatch [--clients 50 100 250 500] [--duration 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'web_app')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+
+
+def client(fn, readings, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        fn(readings[i % len(readings)])
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def run_level(fn, clients, duration, readings):
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=client, args=(fn, readings[i::clients], stop, latencies)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    ms = np.array(latencies) * 1e3
+    return len(ms) / duration, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # No cache, and a queue deep enough that neither path sheds load
+    os.environ.update(VERDANTIA_CACHE_SIZE="0", VERDANTIA_LOAD_MODE="eager",
+                      VERDANTIA_INFERENCE_QUEUE=str(max(args.clients) * 2))
+    import app as web_app
+    df = pd.read_csv(DATA_PATH)
+    web_app.resources.model.set(load_model(df))
+    readings = sample_readings(df, 20000)
+    batcher = web_app.microbatcher
+
+    print(f"{'clients':>7} {'path':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10} {'queue ms':>8}")
+    for n in args.clients:
+        for name in ("per-request", "microbatch"):
+            web_app.microbatcher = batcher if name == "microbatch" else None
+            before = batcher.stats()
+            rps, p50, p99 = run_level(web_app.cached_recommendation, n, args.duration, readings)
+            after = batcher.stats()
+            batches = after["batches"] - before["batches"]
+            items = after["items"] - before["items"]
+            delay = (after["mean_queue_delay_ms"] * after["items"] - before["mean_queue_delay_ms"] * before["items"])
+            mean_batch = f"{items / batches:10.1f}" if batches else f"{'-':>10}"
+            mean_delay = f"{delay / items:8.2f}" if items else f"{'-':>8}"
+            print(f"{n:>7} {name:>11} {rps:>8.1f} {p50:>8.1f} {p99:>8.1f} {mean_batch} {mean_delay}")
+
+
+if __name__ == "__main__":
+    main()
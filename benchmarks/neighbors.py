@@ -0,0 +1,102 @@
+"""Query latency of the neighbour-search backends as the dataset grows.
+
+Run from the repository root:
+
+    python -m benchmarks.neighbors [--sizes 2000,20000,200000,1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.dataset_index import FEATURES
+from utils.neighbors import EXACT_BACKENDS, build_neighbor_ranker
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "crop_recommendation2_cleaned.csv")
+
+
+def legacy_top_candidates_from_dataset(dataset_df, inputs, top_n, nearest_k=200):
+    """Full-sort pandas implementation that the backends replaced."""
+    feats = FEATURES
+    q = np.array([float(inputs[f]) for f in feats], dtype=float)
+    M = dataset_df[feats].to_numpy(dtype=float)
+    dists = np.linalg.norm(M - q, axis=1)
+    idx = np.argsort(dists)[:nearest_k]
+    nearest = dataset_df.iloc[idx]
+    nearest = nearest.assign(_dist=dists[idx])
+    nearest["_inv"] = nearest["_dist"].apply(lambda x: 1.0 / (x + 1e-6))
+    agg = nearest.groupby("label").agg(freq=("label", "count"), inv=("_inv", "mean")).reset_index()
+    agg["score"] = agg["freq"] * agg["inv"]
+    agg.sort_values("score", ascending=False, inplace=True)
+    total_freq = float(agg["freq"].sum()) or 1.0
+    out = []
+    for _, row in agg.head(max(1, top_n)).iterrows():
+        out.append({
+            "crop": row["label"],
+            "confidence": round(100.0 * (row["freq"] / total_freq), 1)
+        })
+    return out
+
+
+def synthetic_dataset(base, rows, seed=0):
+    """Resample the bundled dataset with small jitter to ``rows`` rows."""
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(base), size=rows)
+    values = base[FEATURES].to_numpy(dtype=float)[pick]
+    values += rng.normal(0, 0.02, size=values.shape) * values.std(axis=0)
+    out = pd.DataFrame(values, columns=FEATURES)
+    out["label"] = base["label"].to_numpy()[pick]
+    return out
+
+
+def sample_queries(df, count, seed=1):
+    rng = np.random.default_rng(seed)
+    lo = df[FEATURES].min().to_numpy()
+    hi = df[FEATURES].max().to_numpy()
+    return [dict(zip(FEATURES, row)) for row in rng.uniform(lo, hi, size=(count, len(FEATURES)))]
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="2000,20000,200000,1000000")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    base = pd.read_csv(DATA_PATH)
+
+    # Rankings on the bundled dataset must match the legacy implementation exactly
+    checks = sample_queries(base, 200)
+    for backend in EXACT_BACKENDS:
+        ranker = build_neighbor_ranker(base, backend=backend)
+        diffs = sum(ranker.top_candidates(q, 5) != legacy_top_candidates_from_dataset(base, q, 5) for q in checks)
+        print(f"{backend:>9}: {diffs} ranking differences vs legacy over {len(checks)} queries")
+    print()
+
+    print(f"{'rows':>9} {'backend':>9} {'build ms':>10} {'query ms':>10}")
+    for rows in (int(s) for s in args.sizes.split(",")):
+        df = base if rows == len(base) else synthetic_dataset(base, rows)
+        queries = sample_queries(df, args.queries)
+        legacy_queries = queries[:max(3, args.queries // (1 + rows // 100000))]
+        ms = time_per_query(lambda q: legacy_top_candidates_from_dataset(df, q, 5), legacy_queries)
+        print(f"{rows:>9} {'legacy':>9} {'-':>10} {ms:>10.3f}")
+        for backend in EXACT_BACKENDS:
+            start = time.perf_counter()
+            ranker = build_neighbor_ranker(df, backend=backend)
+            build_ms = (time.perf_counter() - start) * 1e3
+            ms = time_per_query(lambda q: ranker.top_candidates(q, 5), queries)
+            print(f"{rows:>9} {backend:>9} {build_ms:>10.1f} {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
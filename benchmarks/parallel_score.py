@@ -0,0 +1,68 @@
+"""Scaling of the offline scorer (utils.score) from 1 to N worker processes.
+
+Writes a CSV of random readings, trains the notebook's RandomForestClassifier
+(or uses models/crop_model.pkl) and scores the file with each worker count,
+reporting rows/s, speedup over one worker and parallel efficiency. Every
+run's output is checked byte-for-byte against the single-worker run.
+Run from the repository root:
+
+    python -m benchmarks.parallel_score [--rows 200000] [--workers 1 2 4 8] [--chunksize 5000]
+"""
+import argparse
+import csv
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+from utils.score import run_scoring
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))) or [1])
+    parser.add_argument("--chunksize", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = pd.read_csv(DATA_PATH)
+        model_path = os.path.join(tmp, "model.pkl")
+        import joblib
+        joblib.dump(load_model(df), model_path)
+
+        in_path = os.path.join(tmp, "readings.csv")
+        readings = sample_readings(df, args.rows, seed=0)
+        with open(in_path, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=["plot_id"] + list(readings[0]))
+            writer.writeheader()
+            for i, r in enumerate(readings):
+                writer.writerow(dict(r, plot_id=i))
+        del readings
+
+        print(f"{args.rows} rows, chunksize {args.chunksize}, {cpus} CPU(s)")
+        print(f"{'workers':>7} {'seconds':>8} {'rows/s':>9} {'speedup':>8} {'efficiency':>10} {'output':>7}")
+        reference = base = None
+        for workers in args.workers:
+            out_path = os.path.join(tmp, f"scored_{workers}.csv")
+            start = time.perf_counter()
+            rows = run_scoring(in_path, out_path, workers=workers, chunksize=args.chunksize, model_path=model_path)
+            elapsed = time.perf_counter() - start
+            reference = reference or out_path
+            base = base or elapsed
+            same = "same" if filecmp.cmp(reference, out_path, shallow=False) else "DIFFERS"
+            print(f"{workers:>7} {elapsed:>8.2f} {rows / elapsed:>9.0f} {base / elapsed:>7.2f}x "
+                  f"{base / elapsed / workers:>10.0%} {same:>7}")
+            if workers > cpus:
+                print(f"        (more workers than the {cpus} CPU(s) available)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Agreement and latency of the per-crop profile fallback against the full dataset scans.
+
+Builds CropProfiles from the dataset index and compares, for two query
+sets (uniform over the feature ranges, and dataset rows with 5% noise):
+profiles.top_crops against DatasetIndex.top_crops, and
+profiles.top_candidates against the exact NeighborRanker. Reports how often
+the best crop matches, the mean share of the reference top-5 that the
+profiles also return, and median latency.
+Runs on the bundled dataset and, with --rows, on a synthetic one of that
+size. Run from the repository root:
+
+    python -m benchmarks.profiles [--rows 200000] [--prototypes 8 16 32]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, sample_readings
+from benchmarks.synthetic import synthetic_dataset
+from utils.dataset_index import FEATURES, build_dataset_index
+from utils.neighbors import build_neighbor_ranker
+from utils.profiles import build_crop_profiles
+
+
+def near_data_readings(df, count, seed=0):
+    """Dataset rows jittered by 5% of each feature's range."""
+    rng = np.random.default_rng(seed)
+    values = df[FEATURES].to_numpy(dtype=np.float64)
+    spread = values.max(axis=0) - values.min(axis=0)
+    X = values[rng.integers(0, len(values), count)] + rng.normal(0, 0.05, (count, len(FEATURES))) * spread
+    return [dict(zip(FEATURES, row)) for row in X.tolist()]
+
+
+def compare(reference, approx, queries):
+    """(top-1 agreement, mean top-5 overlap, reference p50 us, approx p50 us)."""
+    top1, top5, ref_times, approx_times = [], [], [], []
+    for q in queries:
+        start = time.perf_counter()
+        want = reference(q)
+        ref_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        got = approx(q)
+        approx_times.append(time.perf_counter() - start)
+        top1.append(want[0]["crop"] == got[0]["crop"])
+        want5 = {c["crop"] for c in want}
+        top5.append(len(want5 & {c["crop"] for c in got}) / len(want5))
+    return np.mean(top1), np.mean(top5), np.median(ref_times) * 1e6, np.median(approx_times) * 1e6
+
+
+def report(name, df, args):
+    index = build_dataset_index(df)
+    ranker = build_neighbor_ranker(df, backend="brute")
+    query_sets = [("uniform", sample_readings(df, args.queries, seed=1)),
+                  ("near-data", near_data_readings(df, args.queries, seed=2))]
+    print(f"\n{name}: {len(df)} rows, {len(index.group_labels)} crops")
+    print(f"{'protos':>6} {'build s':>8} {'fallback':<15} {'queries':<10} {'top-1':>6} {'top-5':>6} "
+          f"{'scan us':>9} {'profile us':>10} {'speedup':>8}")
+    for n_prototypes in args.prototypes:
+        start = time.perf_counter()
+        profiles = build_crop_profiles(index, n_prototypes=n_prototypes)
+        build_s = time.perf_counter() - start
+        cases = [
+            ("top_crops", lambda q: index.top_crops(q, 5), lambda q: profiles.top_crops(q, 5)),
+            ("top_candidates", lambda q: ranker.top_candidates(q, 5, args.k),
+             lambda q: profiles.top_candidates(q, 5, args.k)),
+        ]
+        for fallback, reference, approx in cases:
+            for query_name, queries in query_sets:
+                top1, top5, ref_us, approx_us = compare(reference, approx, queries)
+                print(f"{n_prototypes:>6} {build_s:>8.2f} {fallback:<15} {query_name:<10} {top1:>6.3f} {top5:>6.3f} "
+                      f"{ref_us:>9.1f} {approx_us:>10.1f} {ref_us / approx_us:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=0, help="also run on a synthetic dataset of this size")
+    parser.add_argument("--prototypes", type=int, nargs="+", default=[16], help="k-means prototypes per crop")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=200, help="neighbours per query (top_candidates' nearest_k)")
+    args = parser.parse_args()
+
+    report("bundled dataset", pd.read_csv(DATA_PATH), args)
+    if args.rows:
+        report("synthetic dataset", synthetic_dataset(args.rows, seed=0), args)
+
+
+if __name__ == "__main__":
+    main()
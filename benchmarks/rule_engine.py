@@ -0,0 +1,48 @@
+"""Per-reading and batch throughput of the compiled diagnosis rules.
+
+Times the original hand-written if-chain (kept in benchmarks/legacy_rules.py;
+tests/test_rules.py checks the rules against it) against per-reading apply_rules and
+RuleSet.match_batch, best of ``--repeats`` runs each. Run from the repository root:
+
+    python -m benchmarks.rule_engine [--rows 100000] [--repeats 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.legacy_rules import legacy_apply_rules
+from benchmarks.synthetic import sample_columns, to_rows
+from utils import rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5, help="timings per path; the best is reported")
+    args = parser.parse_args()
+
+    columns = sample_columns(args.rows, seed=1)
+    rows = to_rows(columns)
+
+    def best_of(fn, repeats):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    legacy_s = best_of(lambda: [legacy_apply_rules(r) for r in rows], args.repeats)
+    apply_rules = rules.apply_rules  # bound like legacy_apply_rules, so both pay the same lookup
+    scalar_s = best_of(lambda: [apply_rules(r) for r in rows], args.repeats)
+    batch_s = best_of(lambda: rules.DIAGNOSIS_RULES.match_batch(columns), args.repeats)
+
+    print(f"legacy if-chain, per reading:  {args.rows / legacy_s:12.0f} readings/s")
+    print(f"RuleSet.evaluate, per reading: {args.rows / scalar_s:12.0f} readings/s")
+    print(f"RuleSet.match_batch:           {args.rows / batch_s:12.0f} readings/s")
+
+
+if __name__ == "__main__":
+    main()
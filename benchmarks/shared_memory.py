@@ -0,0 +1,111 @@
+"""Total memory of N app workers with private copies vs. the memory-mapped exports.
+
+Starts N worker processes at once, each importing web_app/app.py with eager
+loading, as N gunicorn workers without --preload would. Once every worker
+is loaded it sums VmRSS and Pss (which splits shared pages between the
+processes mapping them). Layouts:
+- private: every worker reads the pickle and CSV itself;
+- shared: the ``utils.shared`` export (dataset arrays are mapped, but the
+  joblib-loaded forest is still copied into each worker);
+- forest: the same dataset arrays plus a ``utils.forest`` model directory,
+  whose node arrays are mapped as well.
+Trains the notebook's RandomForest. Run from the repository root:
+
+    python -m benchmarks.shared_memory [--workers 1 4 16]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model
+from utils.forest import export_forest
+from utils.shared import export_shared
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "web_app"))
+
+WORKER = r"""
+import sys
+sys.path.insert(0, {app_dir!r})
+import app
+assert app.resources.get_model() is not None and app.resources.get_dataset_index() is not None
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def memory_kb(pid):
+    rss = pss = 0
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            if line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def measure(workers, env):
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER.format(app_dir=APP_DIR)], env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    try:
+        for p in procs:
+            # Skip load notices (e.g. the export's model being ignored for a forest directory)
+            for line in p.stdout:
+                if line.strip() == "ready":
+                    break
+            else:
+                raise RuntimeError("worker failed to load the model and dataset")
+        totals = [memory_kb(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+    return sum(t[0] for t in totals) / 1024, sum(t[1] for t in totals) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    tmp = tempfile.mkdtemp()
+    try:
+        import joblib
+        model = load_model(df)
+        pickle_path = os.path.join(tmp, "crop_model.pkl")
+        joblib.dump(model, pickle_path)
+        shared_dir = os.path.join(tmp, "shared")
+        export_shared(shared_dir, df, model, data_source=DATA_PATH, model_source=pickle_path)
+        forest_dir = os.path.join(tmp, "forest")
+        export_forest(model, forest_dir)
+
+        base = dict(os.environ, VERDANTIA_LOAD_MODE="eager", VERDANTIA_MODEL_PATH=pickle_path,
+                    VERDANTIA_DATA_PATH=DATA_PATH)
+        layouts = {
+            "private": dict(base, VERDANTIA_SHARED_DIR=os.path.join(tmp, "missing")),
+            "shared": dict(base, VERDANTIA_SHARED_DIR=shared_dir),
+            "forest": dict(base, VERDANTIA_SHARED_DIR=shared_dir, VERDANTIA_MODEL_PATH=forest_dir),
+        }
+        print(f"{'workers':>7} {'layout':>8} {'sum RSS MB':>11} {'sum PSS MB':>11}")
+        for n in args.workers:
+            for name, env in layouts.items():
+                rss, pss = measure(n, env)
+                print(f"{n:>7} {name:>8} {rss:>11.1f} {pss:>11.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Cold-start time and resident memory of one app worker.
+
+Each run imports web_app/app.py in a fresh interpreter, waits until the
+model and dataset are loaded (``/ready`` would return 200) and reports the
+import time, time to ready and VmRSS. ``--app-dir`` points at another
+checkout's web_app directory to measure a before/after pair.
+Run from the repository root:
+
+    python -m benchmarks.startup [--runs 5] [--app-dir path/to/web_app]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+import app
+t1 = time.perf_counter()
+resources = getattr(app, "resources", None)
+if resources is not None:
+    while not resources.ready:
+        time.sleep(0.001)
+t2 = time.perf_counter()
+rss_kb = 0
+with open("/proc/self/status") as fh:
+    for line in fh:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+loaded = "pandas" in sys.modules, "sklearn" in sys.modules
+print(json.dumps({{"import_s": t1 - t0, "ready_s": t2 - t0, "rss_mb": rss_kb / 1024, "pandas": loaded[0], "sklearn": loaded[1]}}))
+"""
+
+
+def run_once(app_dir):
+    out = subprocess.run([sys.executable, "-c", CHILD.format(app_dir=app_dir)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    default_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "web_app"))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=default_dir)
+    args = parser.parse_args()
+
+    runs = [run_once(os.path.abspath(args.app_dir)) for _ in range(args.runs)]
+    med = {k: statistics.median(r[k] for r in runs) for k in ("import_s", "ready_s", "rss_mb")}
+    print(f"app: {args.app_dir}  runs: {args.runs}")
+    print(f"import (worker can accept requests): {med['import_s'] * 1e3:8.1f} ms")
+    print(f"ready (model + dataset loaded):      {med['ready_s'] * 1e3:8.1f} ms")
+    print(f"VmRSS once ready:                    {med['rss_mb']:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
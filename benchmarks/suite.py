@@ -0,0 +1,194 @@
+"""Offline benchmark suite for the recommend and advisor pipelines.
+
+``run`` times top_crops_by_dataset, top_candidates_from_dataset,
+apply_rules, generate_growing_tips and full POST /recommend and /advisor
+requests through the Flask test client. The dataset functions and
+/recommend run against synthetic datasets at each scale. Every case
+records throughput, latency percentiles and tracemalloc peak memory in a
+JSON results file. The model is left unloaded and the result cache is
+off, so /recommend measures the dataset path and runs do not depend on
+local files.
+
+``compare`` exits 1 when any case in a results file is slower (or uses
+more memory) than a saved baseline by more than ``--threshold``.
+Run from the repository root:
+
+    python -m benchmarks.suite run [--scales 1k 100k 1M] [--out bench_results.json]
+    python -m benchmarks.suite compare baseline.json bench_results.json [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'web_app')))
+from benchmarks.batch import sample_readings
+from benchmarks.synthetic import parse_scale, synthetic_dataset
+
+COMPARED_METRICS = ("p50_ms", "p95_ms", "peak_kib")
+# Absolute changes below these are timer / allocator noise, never regressions
+MIN_DELTA = {"p50_ms": 0.005, "p95_ms": 0.01, "p99_ms": 0.01, "peak_kib": 4.0}
+RULE_CROPS = ["tomato", "lettuce", "rice", "maize", "your plant"]
+
+
+def time_case(fn, args_list, max_calls, max_seconds, memory_calls=20):
+    """Call ``fn(*args)`` over ``args_list`` (cycled) and summarize latency and peak memory."""
+    fn(*args_list[0])  # warm-up
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    for i in range(max_calls):
+        args = args_list[i % len(args_list)]
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+        if latencies[-1] and time.perf_counter() > deadline:
+            break
+
+    tracemalloc.start()
+    for i in range(min(memory_calls, len(latencies))):
+        fn(*args_list[i % len(args_list)])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = np.array(latencies) * 1e3
+    return {
+        "calls": len(ms),
+        "throughput_per_s": round(len(ms) / (ms.sum() / 1e3), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def measure_build(fn):
+    """Time one call of ``fn`` and its tracemalloc peak; returns (result, summary)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {"calls": 1, "throughput_per_s": round(1 / elapsed, 4), "p50_ms": round(elapsed * 1e3, 4),
+                    "p95_ms": round(elapsed * 1e3, 4), "p99_ms": round(elapsed * 1e3, 4), "peak_kib": round(peak / 1024, 1)}
+
+
+def form(reading, **extra):
+    return {k: str(v) for k, v in dict(reading, **extra).items()}
+
+
+def run(args):
+    os.environ.update(VERDANTIA_CACHE_SIZE="0", VERDANTIA_LOAD_MODE="lazy", VERDANTIA_PROFILE="off")
+    import app as web_app
+    from utils.resources import DatasetResources
+    from utils.rules import apply_rules, generate_growing_tips
+
+    web_app.resources.model.set(None)
+    client = web_app.app.test_client()
+    source = synthetic_dataset(2000, seed=args.seed)
+    readings = sample_readings(source, args.readings, seed=args.seed)
+    rule_inputs = [dict(r, crop=RULE_CROPS[i % len(RULE_CROPS)]) for i, r in enumerate(readings)]
+    results = {}
+
+    def record(name, summary):
+        results[name] = summary
+        print(f"{name:<40} {summary['throughput_per_s']:>12.1f}/s  p50 {summary['p50_ms']:>9.3f} ms  "
+              f"p99 {summary['p99_ms']:>9.3f} ms  peak {summary['peak_kib']:>10.1f} KiB", flush=True)
+
+    # Scale-independent stages
+    record("apply_rules", time_case(apply_rules, [(r,) for r in rule_inputs], args.calls * 10, args.max_seconds))
+    record("generate_growing_tips", time_case(generate_growing_tips, [(r, r["crop"]) for r in rule_inputs],
+                                              args.calls * 10, args.max_seconds))
+    record("flask_advisor", time_case(lambda r: client.post("/advisor", data=form(r, current_plant=r["crop"])),
+                                      [(r,) for r in rule_inputs], args.calls, args.max_seconds))
+
+    for scale in args.scales:
+        rows = parse_scale(scale)
+        df = synthetic_dataset(rows, seed=args.seed)
+        dataset, summary = measure_build(lambda: DatasetResources(df, nn_backend=args.nn_backend))
+        record(f"dataset_build@{scale}", summary)
+        web_app.resources.dataset.set(dataset)
+        del df
+
+        one = [(r,) for r in readings]
+        record(f"top_crops_by_dataset@{scale}", time_case(web_app.top_crops_by_dataset, one, args.calls, args.max_seconds))
+        record(f"top_candidates_from_dataset@{scale}",
+               time_case(lambda r: web_app.top_candidates_from_dataset(r, 5), one, args.calls, args.max_seconds))
+        record(f"flask_recommend@{scale}", time_case(lambda r: client.post("/recommend", data=form(r)), one,
+                                                     args.calls, args.max_seconds))
+
+    output = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "scales": args.scales,
+            "nn_backend": args.nn_backend,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(output, fh, indent=2)
+    print(f"wrote {args.out}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)["results"]
+    with open(args.current) as fh:
+        current = json.load(fh)["results"]
+
+    failures = 0
+    print(f"{'case':<40} {'metric':<9} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, base in baseline.items():
+        if name not in current:
+            print(f"{name:<40} missing from {args.current}")
+            continue
+        for metric in args.metrics:
+            old, new = base.get(metric), current[name].get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = change > args.threshold and new - old > MIN_DELTA.get(metric, 0)
+            failures += regressed
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<40} {metric:<9} {old:>12.3f} {new:>12.3f} {change:>+7.1%}{flag}")
+    print(f"{failures} regression(s) over {args.threshold:.0%}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the suite and write a results file")
+    p_run.add_argument("--scales", nargs="+", default=["1k", "100k", "1M"])
+    p_run.add_argument("--calls", type=int, default=200, help="timed calls per case (rules/tips run 10x)")
+    p_run.add_argument("--max-seconds", type=float, default=10.0, help="time budget per case")
+    p_run.add_argument("--readings", type=int, default=500, help="distinct readings cycled through")
+    p_run.add_argument("--nn-backend", default="brute")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--out", default="bench_results.json")
+
+    p_cmp = sub.add_parser("compare", help="fail when results regress against a baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.2, help="allowed relative increase (0.2 = 20%%)")
+    p_cmp.add_argument("--metrics", nargs="+", default=list(COMPARED_METRICS))
+    args = parser.parse_args()
+
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
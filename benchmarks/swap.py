@@ -0,0 +1,180 @@
+"""POST /recommend latency while the model registry hot-swaps versions under load.
+
+Publishes two registry versions into a temporary registry:
+- v1 is the notebook's RandomForest with the bundled dataset.
+- v2 is a smaller forest with a ``--rows`` synthetic dataset, so that
+  loading it takes real time.
+
+It starts web_app/serve.py on that registry with SQLite server-side
+sessions. ``--concurrency`` clients then post readings, each keeping its
+session cookie. A third of the way through, the benchmark activates v2,
+and two thirds of the way through it activates v1 again. Each request is
+assigned to a window by when it started:
+- before the first swap;
+- during a swap, from activation until /ready reports the new version;
+- otherwise after a swap.
+
+The benchmark reports latency and errors per window, plus how long each
+node took to follow an activation. Run from the repository root:
+
+    python -m benchmarks.swap [--concurrency 8] [--duration 15] [--rows 200000]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+from benchmarks.load_test import SERVE, free_port, wait_ready
+from benchmarks.synthetic import synthetic_dataset
+from utils.dataset_index import FEATURES
+from utils.registry import ModelRegistry
+
+
+def session_client(url, readings, stop, records, name):
+    """Post readings until ``stop``, sending back the session cookie; record (start, seconds, status)."""
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    i = 0
+    while not stop.is_set():
+        body = urllib.parse.urlencode(dict(readings[i % len(readings)], profile_username=name))
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/recommend", body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            cookie = resp.getheader("Set-Cookie")
+            if cookie:
+                headers["Cookie"] = cookie.split(";", 1)[0]
+            status = resp.status
+        except Exception:
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            status = 0
+        records.append((start, time.perf_counter() - start, status))
+    conn.close()
+
+
+def served_version(url):
+    with urllib.request.urlopen(url + "/ready", timeout=5) as resp:
+        return json.load(resp).get("version")
+
+
+def wait_version(url, version, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if served_version(url) == version:
+            return time.perf_counter()
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not switch to {version} within {timeout}s")
+
+
+def summarize(records):
+    latencies = np.array([r[1] for r in records]) * 1e3
+    errors = sum(1 for r in records if r[2] != 200)
+    if not len(latencies):
+        return 0, float("nan"), float("nan"), float("nan"), errors
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return len(latencies), p50, p99, latencies.max(), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in v2's synthetic dataset")
+    parser.add_argument("--threads", type=int, default=16, help="server connection threads")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    readings = sample_readings(df, 20000)
+
+    tmp = tempfile.mkdtemp()
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    v1_model = os.path.join(tmp, "v1.pkl")
+    joblib.dump(load_model(df), v1_model)
+    v2_model, v2_data = os.path.join(tmp, "v2.pkl"), os.path.join(tmp, "v2.csv")
+    synthetic = synthetic_dataset(args.rows, seed=1, source=df)
+    synthetic.to_csv(v2_data, index=False)
+    small = RandomForestClassifier(n_estimators=100, random_state=7).fit(df[FEATURES], df["label"])
+    joblib.dump(small, v2_model)
+
+    registry = ModelRegistry(os.path.join(tmp, "registry"))
+    v1 = registry.publish(v1_model, DATA_PATH, note="notebook forest", activate=True).version
+    v2 = registry.publish(v2_model, v2_data, note=f"{args.rows} synthetic rows").version
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, VERDANTIA_REGISTRY_DIR=registry.root, VERDANTIA_REGISTRY_POLL="0.1",
+               VERDANTIA_SHARED_DIR=os.path.join(tmp, "missing"), VERDANTIA_SESSION_BACKEND="sqlite",
+               VERDANTIA_SESSION_PATH=os.path.join(tmp, "sessions.sqlite3"))
+    server = subprocess.Popen([sys.executable, SERVE, "--port", str(port), "--threads", str(args.threads)],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url)
+        stop = threading.Event()
+        records = [[] for _ in range(args.concurrency)]
+        threads = [threading.Thread(target=session_client, args=(url, readings[i::args.concurrency], stop, records[i],
+                                                                 f"bench{i}"))
+                   for i in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        time.sleep(1.0)  # warm-up, excluded below
+        began = time.perf_counter()
+        swaps = []
+        for version, at in ((v2, args.duration / 3), (v1, 2 * args.duration / 3)):
+            time.sleep(max(0.0, began + at - time.perf_counter()))
+            activated = time.perf_counter()
+            registry.activate(version)
+            swaps.append((version, activated, wait_version(url, version)))
+        time.sleep(max(0.0, began + args.duration - time.perf_counter()))
+        stop.set()
+        for t in threads:
+            t.join()
+        ended = time.perf_counter()
+
+        windows = {"before swaps": [], "during swap": [], "after swap": []}
+        for start, seconds, status in (r for rs in records for r in rs):
+            if start < began or start > ended:
+                continue
+            if start < swaps[0][1]:
+                windows["before swaps"].append((start, seconds, status))
+            elif any(activated <= start <= serving for _, activated, serving in swaps):
+                windows["during swap"].append((start, seconds, status))
+            else:
+                windows["after swap"].append((start, seconds, status))
+        swap_seconds = sum(serving - activated for _, activated, serving in swaps)
+        spans = {"before swaps": swaps[0][1] - began, "during swap": swap_seconds,
+                 "after swap": ended - began - (swaps[0][1] - began) - swap_seconds}
+
+        print(f"{args.concurrency} clients with sqlite sessions, {args.duration:g} s, v2 dataset {args.rows} rows")
+        for version, activated, serving in swaps:
+            print(f"activate {version}: serving after {serving - activated:.2f} s")
+        print(f"{'window':<14} {'requests':>9} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+        for name, rows in windows.items():
+            count, p50, p99, worst, errors = summarize(rows)
+            rate = count / spans[name] if spans[name] > 0 else float("nan")
+            print(f"{name:<14} {count:>9} {rate:>7.1f} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f} {errors:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
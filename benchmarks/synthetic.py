@@ -0,0 +1,77 @@
+"""Synthetic crop datasets shaped like data/crop_recommendation2_cleaned.csv.
+
+Each label keeps its share of rows and the per-feature mean and standard
+deviation it has in the real data; values are clipped to the real range
+and n/p/k stay integers. ``sample_columns`` makes diagnosis-rule inputs
+instead, pinned to the rule thresholds. The same ``seed`` always gives the
+same data.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_index import FEATURES
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "crop_recommendation2_cleaned.csv")
+INTEGER_FEATURES = ("n", "p", "k")
+
+
+def parse_scale(text):
+    """'1k' -> 1000, '100k' -> 100000, '1M' -> 1000000, '2500' -> 2500."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*", str(text))
+    if not m:
+        raise ValueError(f"Invalid scale: {text!r}")
+    factor = {"": 1, "k": 1_000, "m": 1_000_000}[m.group(2).lower()]
+    return int(float(m.group(1)) * factor)
+
+
+def synthetic_dataset(rows, seed=0, source=None):
+    """Return a DataFrame of ``rows`` synthetic readings with a ``label`` column."""
+    src = pd.read_csv(source or DATA_PATH) if not isinstance(source, pd.DataFrame) else source
+    rng = np.random.default_rng(seed)
+    stats = src.groupby("label")[FEATURES].agg(["mean", "std"])
+    labels = stats.index.to_numpy()
+    share = src["label"].value_counts(normalize=True).reindex(labels).to_numpy()
+
+    codes = rng.choice(len(labels), size=rows, p=share)
+    means = stats.xs("mean", axis=1, level=1)[FEATURES].to_numpy()
+    stds = stats.xs("std", axis=1, level=1)[FEATURES].fillna(0).to_numpy()
+    values = rng.normal(means[codes], stds[codes])
+    values = np.clip(values, src[FEATURES].min().to_numpy(), src[FEATURES].max().to_numpy())
+
+    df = pd.DataFrame(values, columns=FEATURES)
+    for f in INTEGER_FEATURES:
+        df[f] = df[f].round().astype(np.int64)
+    df["label"] = labels[codes]
+    return df
+
+
+def sample_columns(rows, seed=0):
+    """Random readings with a share of values pinned to every rule threshold."""
+    rng = np.random.default_rng(seed)
+
+    def numeric(lo, hi, edges):
+        col = rng.uniform(lo, hi, rows)
+        pin = rng.random(rows) < 0.3
+        col[pin] = rng.choice(edges, pin.sum())
+        return col
+
+    return {
+        "n": numeric(-2, 3, [-0.5, 1.5]),
+        "p": numeric(-2, 3, [-0.5]),
+        "k": numeric(-2, 3, [-0.5]),
+        "temperature": numeric(5, 45, [30]),
+        "humidity": numeric(10, 100, [85]),
+        "rainfall": numeric(0, 300, [40, 50, 150, 200]),
+        "ph": numeric(4, 9, [6.0, 7.5]),
+        "soil_type": rng.choice(["Clay", "Sandy", "Loam", "Silt"], rows),
+        "climate": rng.choice(["Tropical Wet", "Tropical Dry", "Urban Heat Zone", "Temperate"], rows),
+        "crop": rng.choice(["lettuce", "spinach", "pechay", "tomato", "eggplant", "pepper", "rice", "your plant"], rows),
+    }
+
+
+def to_rows(columns):
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*(columns[k].tolist() for k in keys))]
@@ -0,0 +1,134 @@
+"""POST /recommend latency while other clients upload large avatars.
+
+Starts web_app/serve.py like benchmarks.load_test, then runs the same
+/recommend clients three times: alone, next to ``--uploaders`` threads
+posting fresh ``--upload-mb`` MB images to /profile (each one new, so
+every upload is hashed and written), and next to threads posting bodies
+over the server's MAX_CONTENT_LENGTH, which should be refused before the
+app sees them. Run from the repository root:
+
+    python -m benchmarks.uploads [--concurrency 4] [--uploaders 4] [--upload-mb 4] [--duration 5]
+"""
+import argparse
+import http.client
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.batch import DATA_PATH, load_model, sample_readings
+from benchmarks.load_test import SERVE, client, free_port, wait_ready
+
+BOUNDARY = "verdantia-benchmark-boundary"
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+
+def multipart_avatar(payload):
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"username\"\r\n\r\nbench\r\n"
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"avatar\"; filename=\"avatar.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n").encode()
+    return head + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def uploader(url, size, stop, statuses, seed):
+    """Post distinct PNG-headed uploads of ``size`` bytes to /profile until ``stop`` is set."""
+    parts = urllib.parse.urlsplit(url)
+    rng = np.random.default_rng(seed)
+    filler = rng.bytes(size)
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    body = multipart_avatar(b"\x89PNG\r\n\x1a\n" + filler[8:]) if size > MAX_CONTENT_LENGTH else None
+    i = 0
+    while not stop.is_set():
+        if size <= MAX_CONTENT_LENGTH:
+            # A new prefix per upload defeats de-duplication, so every upload is really stored
+            body = multipart_avatar(b"\x89PNG\r\n\x1a\n" + i.to_bytes(8, "big") + filler[16:])
+        i += 1
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        try:
+            conn.request("POST", "/profile", body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            statuses.append(resp.status)
+        except Exception:
+            statuses.append(0)  # the server closed the connection mid-body
+        finally:
+            conn.close()
+
+
+def run_phase(url, readings, concurrency, duration, uploaders, upload_size):
+    stop = threading.Event()
+    latencies, statuses, upload_statuses = [], [], []
+    threads = [threading.Thread(target=client, args=(url, readings[i::concurrency], stop, latencies, statuses))
+               for i in range(concurrency)]
+    threads += [threading.Thread(target=uploader, args=(url, upload_size, stop, upload_statuses, i))
+                for i in range(uploaders)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    ok = np.array(latencies)[np.array(statuses) == 200] * 1e3
+    p50, p99 = np.percentile(ok, [50, 99]) if len(ok) else (float("nan"),) * 2
+    codes = {}
+    for s in upload_statuses:
+        codes[s] = codes.get(s, 0) + 1
+    return len(ok) / duration, p50, p99, len(upload_statuses) / duration, codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=4, help="/recommend client threads")
+    parser.add_argument("--uploaders", type=int, default=4, help="upload client threads")
+    parser.add_argument("--upload-mb", type=float, default=4.0, help="size of each accepted upload")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=16, help="server connection threads")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    readings = sample_readings(df, 20000)
+
+    tmp = tempfile.mkdtemp()
+    import joblib
+    model_path = os.path.join(tmp, "crop_model.pkl")
+    joblib.dump(load_model(df), model_path)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, VERDANTIA_MODEL_PATH=model_path, VERDANTIA_SHARED_DIR=os.path.join(tmp, "missing"),
+               VERDANTIA_UPLOAD_DIR=os.path.join(tmp, "uploads"), VERDANTIA_MAX_CONTENT_LENGTH=str(MAX_CONTENT_LENGTH),
+               VERDANTIA_AVATAR_MAX_BYTES=str(int(args.upload_mb * 1024 * 1024) + 1024))
+    os.makedirs(env["VERDANTIA_UPLOAD_DIR"])
+    server = subprocess.Popen([sys.executable, SERVE, "--port", str(port), "--threads", str(args.threads)],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    phases = [
+        ("no uploads", 0, 0),
+        (f"{args.upload_mb:g} MB uploads", args.uploaders, int(args.upload_mb * 1024 * 1024)),
+        ("oversized (>16 MB)", args.uploaders, 2 * MAX_CONTENT_LENGTH),
+    ]
+    try:
+        wait_ready(url)
+        run_phase(url, readings, args.concurrency, 1.0, 0, 0)  # warm-up
+        print(f"{args.concurrency} /recommend clients, {args.uploaders} upload clients, {args.duration:g} s per phase")
+        print(f"{'phase':<20} {'rec/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'uploads/s':>10}  upload statuses")
+        for name, uploaders, size in phases:
+            rps, p50, p99, ups, codes = run_phase(url, readings, args.concurrency, args.duration, uploaders, size)
+            print(f"{name:<20} {rps:>7.1f} {p50:>8.1f} {p99:>8.1f} {ups:>10.1f}  {codes or '-'}")
+        stored = [f for f in os.listdir(env["VERDANTIA_UPLOAD_DIR"]) if not f.startswith(".")]
+        print(f"{len(stored)} files stored, no partial files left: "
+              f"{not any(f.startswith('.') for f in os.listdir(env['VERDANTIA_UPLOAD_DIR']))}")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
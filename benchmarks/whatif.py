@@ -0,0 +1,72 @@
+"""Latency of what-if deltas (POST /api/whatif) against resubmitting the whole /recommend form.
+
+Trains the notebook's RandomForestClassifier (or uses models/crop_model.pkl),
+disables the result cache so every re-rank really runs, and times through
+the Flask test client: the full form POST, a delta touching a model feature
+(pH: re-rank plus one tip) and a delta the model does not read (climate:
+one rule pass and one tip, no re-rank). Run from the repository root:
+
+    python -m benchmarks.whatif [--calls 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'web_app')))
+from benchmarks.batch import DATA_PATH, load_model
+
+FORM = {"n": 90, "p": 42, "k": 43, "temperature": 21, "humidity": 82, "ph": 6.5, "rainfall": 203,
+        "soil_type": "Clay", "climate": "Tropical Wet"}
+CLIMATES = ["Tropical Wet", "Tropical Dry", "Urban Heat Zone", "Tropical Moist"]
+
+
+def percentiles(fn, calls):
+    fn(0)  # warm-up
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    ms = np.array(times) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.update(VERDANTIA_CACHE_SIZE="0", VERDANTIA_LOAD_MODE="lazy", VERDANTIA_PROFILE="off")
+    import app as web_app
+    web_app.resources.model.set(load_model(pd.read_csv(DATA_PATH)))
+    client = web_app.app.test_client()
+
+    state = {"base": client.post("/api/whatif", json={"inputs": FORM}).get_json()["request_id"]}
+
+    def delta(changes):
+        data = client.post("/api/whatif", json={"base": state["base"], "changes": changes}).get_json()
+        state["base"] = data["request_id"]
+        return data
+
+    def full_form(i):
+        client.post("/recommend", data={k: str(v) for k, v in dict(FORM, ph=6.0 + (i % 20) / 10).items()})
+
+    cases = [
+        ("full /recommend form POST", full_form),
+        ("what-if delta: ph", lambda i: delta({"ph": 6.0 + (i % 20) / 10})),
+        ("what-if delta: climate", lambda i: delta({"climate": CLIMATES[i % len(CLIMATES)]})),
+    ]
+    print(f"{'case':<28} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, fn in cases:
+        p50, p99 = percentiles(fn, args.calls)
+        print(f"{name:<28} {p50:>8.3f} {p99:>8.3f}")
+    print("recomputed on the last climate delta:", delta({"climate": "Tropical Dry"})["recomputed"])
+
+
+if __name__ == "__main__":
+    main()
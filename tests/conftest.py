@@ -0,0 +1,45 @@
+"""Fixtures for tests that drive the Flask app in web_app/app.py."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def web_app(tmp_path_factory):
+    """The app module, imported once with eager loading and its files kept in a temporary directory.
+
+    No model is loaded (the configured pickle does not exist); tests that
+    need one swap it in with ``serving``.
+    """
+    tmp = tmp_path_factory.mktemp("web_app")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("VERDANTIA_LOAD_MODE", "eager")
+        mp.setenv("VERDANTIA_MODEL_PATH", str(tmp / "missing.pkl"))
+        mp.setenv("VERDANTIA_SHARED_DIR", str(tmp / "shared"))
+        mp.setenv("VERDANTIA_UPLOAD_DIR", str(tmp / "uploads"))
+        mp.setenv("VERDANTIA_SESSION_BACKEND", "cookie")
+        mp.delenv("VERDANTIA_REGISTRY_DIR", raising=False)
+        mp.syspath_prepend(os.path.join(ROOT, "web_app"))
+        import app
+    app.app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def serving(web_app):
+    """Call ``serving(model, dataset)`` to serve them for one test; the previous pair comes back after."""
+    before = web_app.resources.snapshot()
+
+    def serve(model, dataset=before.dataset):
+        web_app.resources.swap(model, dataset, version=before.version)
+
+    yield serve
+    web_app.resources.swap(before.model, before.dataset, version=before.version)
+
+
+@pytest.fixture
+def client(web_app):
+    return web_app.app.test_client()
@@ -0,0 +1,41 @@
+"""ETags of pre-compressed pages and assets: one per encoding, each revalidating only itself."""
+import pytest
+
+IDENTITY = {"Accept-Encoding": "identity"}
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def compressed_asset(web_app):
+    return next(a for a in web_app.assets.by_name.values() if "gzip" in a.variants)
+
+
+def fetch(client, url, headers, etag=None):
+    if etag is not None:
+        headers = dict(headers, **{"If-None-Match": etag})
+    return client.get(url, headers=headers)
+
+
+@pytest.fixture(params=["page", "asset"])
+def url(request, web_app):
+    if request.param == "page":
+        return "/select"
+    return "/assets/" + compressed_asset(web_app).name
+
+
+def test_each_encoding_has_its_own_etag(client, url):
+    plain = fetch(client, url, IDENTITY)
+    gzipped = fetch(client, url, GZIP)
+    assert plain.content_encoding is None and gzipped.content_encoding == "gzip"
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+    assert gzipped.headers["ETag"].endswith('-gzip"')
+    assert "Accept-Encoding" in gzipped.headers["Vary"]
+
+
+def test_etags_revalidate_only_their_own_encoding(client, url):
+    plain_etag = fetch(client, url, IDENTITY).headers["ETag"]
+    gzip_etag = fetch(client, url, GZIP).headers["ETag"]
+    assert fetch(client, url, IDENTITY, plain_etag).status_code == 304
+    assert fetch(client, url, GZIP, gzip_etag).status_code == 304
+    # A cached identity body is not a valid copy of the gzip one, or the reverse
+    assert fetch(client, url, GZIP, plain_etag).status_code == 200
+    assert fetch(client, url, IDENTITY, gzip_etag).status_code == 200
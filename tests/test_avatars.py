@@ -0,0 +1,73 @@
+"""Avatar thumbnails in the navigation bar of the cached page shells."""
+import os
+
+import pytest
+
+PAGES = ["/select", "/recommend", "/advisor"]
+AVATAR = "0123456789abcdef0123456789abcdef.png"
+OTHER_AVATAR = "fedcba9876543210fedcba9876543210.png"
+
+
+@pytest.fixture
+def uploads(web_app):
+    """The upload folder, with the test avatars and their thumbnails removed afterwards."""
+    os.makedirs(web_app.UPLOAD_FOLDER, exist_ok=True)
+    names = [AVATAR, OTHER_AVATAR] + [web_app.thumbnail_name(n, web_app.AVATAR_SIZE) for n in (AVATAR, OTHER_AVATAR)]
+    yield web_app.UPLOAD_FOLDER
+    for name in names:
+        path = os.path.join(web_app.UPLOAD_FOLDER, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def make_thumbnail(web_app, uploads, name):
+    """What the avatar pool leaves behind once it has downscaled ``name``."""
+    thumb = web_app.thumbnail_name(name, web_app.AVATAR_SIZE)
+    with open(os.path.join(uploads, thumb), "wb") as fh:
+        fh.write(b"\x89PNG\r\n\x1a\n")
+    return f"/uploads/{thumb}"
+
+
+def set_avatar(client, name):
+    with client.session_transaction() as s:
+        s["profile_avatar"] = name
+
+
+def page(client, url):
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("url", PAGES)
+def test_pages_show_the_thumbnail_once_made(web_app, client, uploads, url):
+    set_avatar(client, AVATAR)
+    assert f'src="/uploads/{AVATAR}"' in page(client, url)
+
+    thumbnail = make_thumbnail(web_app, uploads, AVATAR)
+    html = page(client, url)
+    assert f'src="{thumbnail}"' in html
+    assert f'src="/uploads/{AVATAR}"' not in html
+
+
+@pytest.mark.parametrize("url", PAGES)
+def test_changed_avatar_invalidates_the_cached_shell(web_app, client, uploads, url):
+    first = make_thumbnail(web_app, uploads, AVATAR)
+    second = make_thumbnail(web_app, uploads, OTHER_AVATAR)
+    set_avatar(client, AVATAR)
+    assert f'src="{first}"' in page(client, url)
+    hits = web_app.shell_cache.hits
+    assert f'src="{first}"' in page(client, url)
+    # The unchanged page came from the shell cache
+    assert web_app.shell_cache.hits == hits + 1
+
+    etag = client.get(url, headers={"Accept-Encoding": "identity"}).headers["ETag"]
+    set_avatar(client, OTHER_AVATAR)
+    html = page(client, url)
+    assert f'src="{second}"' in html and f'src="{first}"' not in html
+    # A browser holding the old page gets the new one, not a 304
+    assert client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": etag}).status_code == 200
+
+    set_avatar(client, None)
+    html = page(client, url)
+    assert "/uploads/" not in html and "cute-sapling" in html
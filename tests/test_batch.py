@@ -0,0 +1,128 @@
+"""Batch ranking: rank_classes ties, batch vs. per-row results and model failures."""
+import logging
+
+import numpy as np
+import pytest
+
+from utils.batch import ModelInferenceError, rank_batch, rank_classes, recommend_batch
+from utils.dataset_index import FEATURES, build_dataset_index
+from tests.test_ranking import crop_frame
+
+
+class ProbaModel:
+    """Stands in for a classifier with fixed class order and a probability function."""
+
+    def __init__(self, classes, proba):
+        self.classes_ = np.asarray(classes)
+        self.proba = proba
+
+    def predict_proba(self, X):
+        return self.proba(np.asarray(X, dtype=float))
+
+
+class FailingModel:
+    classes_ = np.array(["rice"])
+
+    def predict_proba(self, X):
+        raise RuntimeError("model exploded")
+
+
+def stable_top(proba, top_n):
+    order = np.argsort(-proba, axis=1, kind="stable")[:, :top_n]
+    return order, np.take_along_axis(proba, order, axis=1)
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 5, 8])
+def test_rank_classes_matches_stable_argsort_with_ties(top_n):
+    rng = np.random.default_rng(0)
+    # Few distinct values, so most rows tie, many across the top-N cut
+    proba = rng.integers(0, 4, size=(500, 8)) / 4.0
+    proba[:20] = 0.25
+    top, p = rank_classes(proba, top_n)
+    expected_top, expected_p = stable_top(proba, top_n)
+    assert np.array_equal(top, expected_top)
+    assert np.array_equal(p, expected_p)
+
+
+def test_rank_classes_without_ties_matches_argsort():
+    proba = np.random.default_rng(1).dirichlet(np.ones(22), size=300)
+    top, p = rank_classes(proba, 5)
+    expected_top, expected_p = stable_top(proba, 5)
+    assert np.array_equal(top, expected_top) and np.array_equal(p, expected_p)
+
+
+def per_row_ranking(model, x, top_n=5):
+    """The single-reading path in web_app/app.py: sort (class, p) pairs, best first."""
+    proba = model.predict_proba(x[None, :])[0]
+    ranked = sorted(zip(model.classes_, proba), key=lambda t: t[1], reverse=True)
+    return [{"crop": str(c), "suitability": int(round(p * 100))} for c, p in ranked[:top_n]]
+
+
+def softmax_model():
+    classes = ["rice", "maize", "chickpea", "banana", "mango", "coffee", "apple"]
+    weights = np.random.default_rng(2).normal(size=(len(FEATURES), len(classes)))
+
+    def proba(X):
+        z = (X / 50.0) @ weights
+        # Coarse rounding creates ties between classes
+        e = np.round(np.exp(z - z.max(axis=1, keepdims=True)), 1)
+        return e / e.sum(axis=1, keepdims=True)
+
+    return ProbaModel(classes, proba)
+
+
+def test_model_batch_matches_per_row():
+    model = softmax_model()
+    X = np.random.default_rng(3).uniform(0, 100, size=(400, len(FEATURES)))
+    assert rank_batch(X, model=model) == [per_row_ranking(model, x) for x in X]
+
+
+def test_dataset_batch_matches_per_row():
+    index = build_dataset_index(crop_frame())
+    X = np.random.default_rng(4).uniform(0, 100, size=(100, len(FEATURES)))
+    expected = [index.top_crops(dict(zip(FEATURES, x)), k=5) for x in X]
+    assert rank_batch(X, dataset_index=index) == expected
+
+
+def test_model_failure_falls_back_and_reports():
+    index = build_dataset_index(crop_frame())
+    X = np.random.default_rng(5).uniform(0, 100, size=(10, len(FEATURES)))
+    errors = []
+    ranked = rank_batch(X, model=FailingModel(), dataset_index=index, on_model_error=errors.append)
+    assert ranked == rank_batch(X, dataset_index=index)
+    assert [str(e) for e in errors] == ["model exploded"]
+
+
+def test_model_failure_is_logged_by_default(caplog, capsys):
+    index = build_dataset_index(crop_frame())
+    X = np.zeros((2, len(FEATURES)))
+    with caplog.at_level(logging.WARNING, logger="utils.batch"):
+        rank_batch(X, model=FailingModel(), dataset_index=index)
+    assert "model exploded" in caplog.text
+    assert capsys.readouterr().out == ""
+
+
+def test_model_failure_without_fallback_raises():
+    with pytest.raises(ModelInferenceError) as info:
+        rank_batch(np.zeros((2, len(FEATURES))), model=FailingModel())
+    assert isinstance(info.value.__cause__, RuntimeError)
+
+
+def reading(**overrides):
+    return dict({"n": 90, "p": 42, "k": 43, "temperature": 20.8, "humidity": 82, "ph": 6.5, "rainfall": 202,
+                 "soil_type": "Loamy", "climate": "Tropical"}, **overrides)
+
+
+def test_recommend_batch_attaches_tips():
+    results = recommend_batch([reading(), reading(ph=5.0)], model=softmax_model())
+    assert [r["crop"] for r in results] == [r["suggestions"][0]["crop"] for r in results]
+    assert all(r["tips"] for r in results)
+
+
+def test_batch_api_reports_model_failure_as_json_503(web_app, serving, client):
+    serving(FailingModel(), dataset=None)
+    before = web_app.MODEL_ERRORS.labels(error="RuntimeError").value
+    response = client.post("/api/recommend/batch", json=[reading()])
+    assert response.status_code == 503
+    assert response.is_json and "error" in response.get_json()
+    assert web_app.MODEL_ERRORS.labels(error="RuntimeError").value == before + 1
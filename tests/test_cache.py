@@ -0,0 +1,53 @@
+"""The recommendation cache: cached rankings against uncached ones, within the cache precision."""
+import numpy as np
+
+from utils.cache import LRUCache, quantized_inputs, recommendation_key
+from utils.dataset_index import FEATURES
+from tests.test_batch import ProbaModel, reading, softmax_model
+
+
+def random_readings(count=40, decimals=6, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform([0, 5, 5, 8, 14, 3.5, 20], [140, 145, 205, 43, 100, 9.9, 300], size=(count, len(FEATURES)))
+    return [reading(**dict(zip(FEATURES, row))) for row in values.round(decimals).tolist()]
+
+
+def ph_step_model():
+    """Switches crops between pH 6.501 and 6.502, finer than the default cache precision."""
+    return ProbaModel(["maize", "rice"], lambda X: np.where(X[:, [5]] > 6.5015, [[0.2, 0.8]], [[0.8, 0.2]]))
+
+
+def test_quantized_readings_stay_within_the_precision(web_app):
+    half_step = 0.5 * 10 ** -web_app.CACHE_PRECISION
+    for inputs in random_readings():
+        quantized = quantized_inputs(recommendation_key(inputs, web_app.CACHE_PRECISION))
+        assert all(abs(quantized[f] - inputs[f]) <= half_step + 1e-9 for f in FEATURES)
+
+
+def test_cached_ranking_is_the_ranking_of_the_quantized_reading(web_app, serving):
+    serving(softmax_model())
+    for inputs in random_readings():
+        quantized = quantized_inputs(recommendation_key(inputs, web_app.CACHE_PRECISION))
+        assert web_app.cached_ranking(inputs, inline=True) == web_app.rank_reading(quantized)
+
+
+def test_cached_matches_uncached_for_readings_at_the_precision(web_app, serving):
+    serving(softmax_model())
+    for inputs in random_readings(decimals=web_app.CACHE_PRECISION, seed=1):
+        cold = web_app.cached_ranking(inputs, inline=True)
+        assert cold == web_app.cached_ranking(inputs, inline=True) == web_app.rank_reading(inputs)
+    serving(None)
+    for inputs in random_readings(decimals=web_app.CACHE_PRECISION, seed=2):
+        assert web_app.cached_ranking(inputs, inline=True) == web_app.rank_reading(inputs)
+
+
+def test_disabled_cache_ranks_the_exact_reading(web_app, serving, monkeypatch):
+    serving(ph_step_model())
+    inputs = reading(ph=6.504)
+    assert web_app.cached_ranking(inputs, inline=True)[0] == "maize"
+
+    monkeypatch.setattr(web_app, "recommendation_cache", LRUCache(maxsize=0))
+    assert web_app.cached_ranking(inputs, inline=True) == web_app.rank_reading(inputs)
+    assert web_app.cached_ranking(inputs, inline=True)[0] == "rice"
+    # Off the inference pool too
+    assert web_app.cached_ranking(inputs)[0] == "rice"
@@ -0,0 +1,110 @@
+"""ForestPredictor against scikit-learn's predict_proba for every exportable tree classifier."""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from utils.dataset_index import FEATURES
+from utils.forest import ForestPredictor, export_forest, is_exportable, is_forest_dir, load_forest, load_model
+
+ESTIMATORS = {
+    "random forest": lambda: RandomForestClassifier(n_estimators=25, random_state=0),
+    "extra trees": lambda: ExtraTreesClassifier(n_estimators=25, random_state=0),
+    "decision tree": lambda: DecisionTreeClassifier(random_state=0),
+}
+
+
+def readings(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.uniform(0, 100, size=(rows, len(FEATURES))), columns=FEATURES)
+
+
+def labels(X):
+    # Several classes with structure the trees can learn
+    return np.array(["rice", "maize", "coffee", "mango"])[(X["n"] // 30 + (X["rainfall"] > 50)).astype(int) % 4]
+
+
+def exported(model, tmp_path):
+    export_forest(model, tmp_path)
+    return load_forest(tmp_path)
+
+
+@pytest.fixture(params=ESTIMATORS)
+def fitted(request):
+    X = readings(400, seed=0)
+    return ESTIMATORS[request.param]().fit(X, labels(X))
+
+
+def test_predict_proba_matches_sklearn(fitted, tmp_path):
+    forest = exported(fitted, tmp_path)
+    X = readings(300, seed=1)
+    assert isinstance(forest, ForestPredictor)
+    assert np.array_equal(forest.predict_proba(X), fitted.predict_proba(X))
+    assert np.array_equal(forest.predict(X), fitted.predict(X))
+    assert np.array_equal(forest.predict_proba(X.iloc[:1]), fitted.predict_proba(X.iloc[:1]))
+
+
+def test_reordered_columns_are_realigned(fitted, tmp_path):
+    forest = exported(fitted, tmp_path)
+    X = readings(50, seed=2)
+    assert np.array_equal(forest.predict_proba(X[FEATURES[::-1]]), fitted.predict_proba(X))
+
+
+def test_numpy_inputs_match(tmp_path):
+    X = readings(400, seed=0)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X.to_numpy(), labels(X))
+    forest = exported(model, tmp_path)
+    Q = readings(100, seed=3).to_numpy()
+    assert np.array_equal(forest.predict_proba(Q), model.predict_proba(Q))
+
+
+@pytest.mark.parametrize("fit_with_nan", [False, True])
+def test_nan_inputs_match(fit_with_nan, tmp_path):
+    X = readings(400, seed=0)
+    y = labels(X)
+    if fit_with_nan:
+        X = X.mask(np.random.default_rng(4).random(X.shape) < 0.1)
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, y)
+    forest = exported(model, tmp_path)
+    Q = readings(200, seed=5)
+    Q = Q.mask(np.random.default_rng(6).random(Q.shape) < 0.2)
+    assert np.array_equal(forest.predict_proba(Q), model.predict_proba(Q))
+
+
+def test_nan_matches_a_stump_that_never_routes_left(tmp_path):
+    X = readings(100, seed=0)
+    model = DecisionTreeClassifier(max_depth=1, random_state=0).fit(X, X["n"] > 50)
+    forest = exported(model, tmp_path)
+    Q = pd.DataFrame([[np.nan] * len(FEATURES)], columns=FEATURES)
+    assert np.array_equal(forest.predict_proba(Q), model.predict_proba(Q))
+
+
+def test_infinite_inputs_are_rejected(fitted, tmp_path):
+    forest = exported(fitted, tmp_path)
+    Q = readings(2, seed=7)
+    Q.iloc[0, 0] = np.inf
+    with pytest.raises(ValueError):
+        forest.predict_proba(Q)
+
+
+def test_unsupported_estimator_is_served_from_its_pickle(tmp_path):
+    X = readings(200, seed=0)
+    model = LogisticRegression(max_iter=5000).fit(X, labels(X))
+    assert not is_exportable(model)
+    with pytest.raises(ValueError):
+        export_forest(model, tmp_path / "forest")
+    assert not is_forest_dir(tmp_path / "forest")
+
+    joblib.dump(model, tmp_path / "model.pkl")
+    loaded = load_model(str(tmp_path / "model.pkl"))
+    assert isinstance(loaded, LogisticRegression)
+    assert np.array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+
+def test_load_model_opens_exports(tmp_path):
+    X = readings(200, seed=0)
+    export_forest(DecisionTreeClassifier(random_state=0).fit(X, labels(X)), tmp_path)
+    assert isinstance(load_model(str(tmp_path)), ForestPredictor)
@@ -0,0 +1,85 @@
+"""Chunked ingestion: the reservoir sample's determinism and cap."""
+import numpy as np
+import pytest
+
+from utils.dataset_index import FEATURES
+from utils.ingest import DEFAULT_MAX_ROWS, StreamingDataset, build_streamed_indexes, stream_dataset
+from tests.test_ranking import crop_frame
+
+
+def numbered_frame(rows):
+    """A crop frame whose "n" column is the row number, so a sample shows which rows it kept."""
+    df = crop_frame(rows=rows, seed=4)
+    df["n"] = np.arange(rows, dtype=float)
+    return df
+
+
+def write_csv(tmp_path, df):
+    path = tmp_path / "crops.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def sample(dataset):
+    values, codes, labels = dataset.arrays()
+    return values, labels[codes]
+
+
+def feed(df, max_rows, seed=0, chunk=700):
+    dataset = StreamingDataset(FEATURES, max_rows=max_rows, seed=seed)
+    for start in range(0, len(df), chunk):
+        part = df.iloc[start:start + chunk]
+        dataset.add(part[FEATURES].to_numpy(), part["label"].to_numpy())
+        assert len(dataset.arrays()[0]) == min(dataset.seen, max_rows or dataset.seen)
+    return dataset
+
+
+def test_reservoir_is_deterministic_for_a_seed():
+    df = numbered_frame(5000)
+    first, again = sample(feed(df, 400, seed=7)), sample(feed(df, 400, seed=7))
+    assert np.array_equal(first[0], again[0]) and np.array_equal(first[1], again[1])
+    assert not np.array_equal(first[0], sample(feed(df, 400, seed=8))[0])
+
+
+def test_reservoir_never_exceeds_the_cap():
+    df = numbered_frame(5000)
+    for max_rows in (1, 399, 700, 4999):
+        dataset = feed(df, max_rows)
+        values, labels = sample(dataset)
+        assert len(values) == len(labels) == max_rows
+        # Distinct source rows, each with its own label
+        rows = values[:, FEATURES.index("n")].astype(int)
+        assert len(set(rows.tolist())) == max_rows
+        assert labels.tolist() == df["label"].to_numpy()[rows].tolist()
+        # Ranges still cover every row read
+        assert dataset.mins[FEATURES.index("n")] == 0 and dataset.maxs[FEATURES.index("n")] == 4999
+
+
+def test_reservoir_samples_the_whole_file():
+    rows = feed(numbered_frame(20000), 2000, chunk=1500).arrays()[0][:, FEATURES.index("n")]
+    # Uniform over all rows read, not biased towards the first chunks
+    counts = np.histogram(rows, bins=10, range=(0, 20000))[0]
+    assert counts.min() > 140 and counts.max() < 260
+
+
+def test_files_under_the_cap_keep_every_row_in_order():
+    df = numbered_frame(900)
+    values, labels = sample(feed(df, 1000))
+    assert values[:, FEATURES.index("n")].tolist() == list(range(900))
+    assert labels.tolist() == df["label"].tolist()
+
+
+@pytest.mark.parametrize("max_rows", [None, 0])
+def test_no_cap_keeps_every_row(max_rows):
+    values, _ = sample(feed(numbered_frame(3000), max_rows))
+    assert len(values) == 3000
+
+
+def test_streamed_indexes_use_the_default_cap(tmp_path):
+    assert StreamingDataset(FEATURES).max_rows == DEFAULT_MAX_ROWS
+    path = write_csv(tmp_path, numbered_frame(3000))
+    assert stream_dataset(path, chunksize=500).seen == 3000
+    _, _, rows = build_streamed_indexes(path, nn_backend=None, chunksize=500, max_rows=1000)
+    assert rows == 1000
+    first = stream_dataset(path, chunksize=500, max_rows=1000).arrays()[0]
+    assert np.array_equal(first, stream_dataset(path, chunksize=500, max_rows=1000).arrays()[0])
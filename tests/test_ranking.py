@@ -0,0 +1,156 @@
+"""DatasetIndex and NeighborRanker against the per-request pandas rankings they replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.dataset_index import FEATURES, build_dataset_index
+from utils.neighbors import EXACT_BACKENDS, build_neighbor_ranker
+
+CROPS = ["rice", "maize", "chickpea", "banana", "mango", "coffee"]
+
+
+def legacy_top_crops_by_dataset(df, inputs, k=5):
+    label_col = None
+    for c in df.columns:
+        lc = str(c).strip().lower()
+        if lc in ("label", "crop", "crops"):
+            label_col = c
+            break
+    if not label_col:
+        return []
+
+    feature_cols = [c for c in ["n","p","k","temperature","humidity","ph","rainfall"] if c in df.columns]
+    if not feature_cols:
+        return []
+
+    work = df[[label_col] + feature_cols].copy()
+    mins = work[feature_cols].min()
+    maxs = work[feature_cols].max()
+    ranges = (maxs - mins).replace(0, 1)
+
+    try:
+        x = pd.Series({c: float(inputs[c]) for c in feature_cols})
+    except Exception:
+        return []
+
+    x_norm = (x - mins) / ranges
+    X_norm = (work[feature_cols] - mins) / ranges
+    dists = ((X_norm - x_norm) ** 2).sum(axis=1) ** 0.5
+    work["_dist"] = dists
+
+    # Stable here, where the app used the default quicksort: numpy may run that as
+    # an unstable SIMD sort, so exact ties came out in a platform-dependent order.
+    # The index keeps label order for ties, as a stable sort does
+    best = work.groupby(label_col)["_dist"].min().reset_index().sort_values("_dist", kind="stable")
+    if best.empty:
+        return []
+
+    d_max = best["_dist"].max()
+    eps = 1e-9
+    best["suitability"] = ((1.0 - best["_dist"] / (d_max + eps)) * 100).clip(lower=0, upper=100)
+
+    suggestions = []
+    for _, row in best.head(max(1, int(k))).iterrows():
+        suggestions.append({
+            "crop": str(row[label_col]).strip(),
+            "suitability": int(round(row["suitability"]))
+        })
+    return suggestions
+
+
+def legacy_top_candidates_from_dataset(dataset_df, inputs, top_n, nearest_k=200):
+    feats = ["n", "p", "k", "temperature", "humidity", "ph", "rainfall"]
+    q = np.array([float(inputs[f]) for f in feats], dtype=float)
+    M = dataset_df[feats].to_numpy(dtype=float)
+    dists = np.linalg.norm(M - q, axis=1)
+    idx = np.argsort(dists)[:nearest_k]
+    nearest = dataset_df.iloc[idx]
+    nearest = nearest.assign(_dist=dists[idx])
+    nearest["_inv"] = nearest["_dist"].apply(lambda x: 1.0 / (x + 1e-6))
+    agg = nearest.groupby("label").agg(freq=("label", "count"), inv=("_inv", "mean")).reset_index()
+    agg["score"] = agg["freq"] * agg["inv"]
+    agg.sort_values("score", ascending=False, inplace=True)
+    total_freq = float(agg["freq"].sum()) or 1.0
+    out = []
+    for _, row in agg.head(max(1, top_n)).iterrows():
+        out.append({
+            "crop": row["label"],
+            "confidence": round(100.0 * (row["freq"] / total_freq), 1)
+        })
+    return out
+
+
+def crop_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 100, size=(rows, len(FEATURES))).round(1), columns=FEATURES)
+    df["label"] = rng.choice(CROPS, size=rows)
+    return df
+
+
+def queries(df, count=25, seed=1):
+    rng = np.random.default_rng(seed)
+    lo, hi = df[FEATURES].min().to_numpy(), df[FEATURES].max().to_numpy()
+    out = [dict(zip(FEATURES, row)) for row in rng.uniform(lo, hi, size=(count, len(FEATURES)))]
+    # Readings that sit exactly on dataset rows
+    return out + [dict(zip(FEATURES, row)) for row in df[FEATURES].to_numpy()[:5]]
+
+
+def tied_frame():
+    """Every row duplicated under a second crop, so crops tie on best distance."""
+    df = crop_frame(rows=80, seed=2)
+    twin = df.copy()
+    twin["label"] = twin["label"].map({c: CROPS[(i + 1) % len(CROPS)] for i, c in enumerate(CROPS)})
+    return pd.concat([df, twin], ignore_index=True)
+
+
+def constant_frame():
+    df = crop_frame(rows=120, seed=3)
+    df["ph"] = 6.5
+    return df
+
+
+FRAMES = {"random": crop_frame, "ties": tied_frame, "constant feature": constant_frame}
+
+
+@pytest.mark.parametrize("frame", FRAMES)
+@pytest.mark.parametrize("k", [1, 5, 10])
+def test_dataset_index_matches_pandas(frame, k):
+    df = FRAMES[frame]()
+    index = build_dataset_index(df)
+    for q in queries(df):
+        assert index.top_crops(q, k=k) == legacy_top_crops_by_dataset(df, q, k=k)
+
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_dataset_index_batch_matches_pandas(frame):
+    df = FRAMES[frame]()
+    index = build_dataset_index(df)
+    qs = queries(df)
+    X = np.array([[q[f] for f in index.features] for q in qs])
+    assert index.top_crops_batch(X, k=5) == [legacy_top_crops_by_dataset(df, q, k=5) for q in qs]
+
+
+@pytest.mark.parametrize("backend", EXACT_BACKENDS)
+@pytest.mark.parametrize("frame", ["random", "constant feature"])
+@pytest.mark.parametrize("nearest_k", [1, 25, 200])
+def test_neighbor_ranker_matches_pandas(backend, frame, nearest_k):
+    df = FRAMES[frame]()
+    ranker = build_neighbor_ranker(df, backend=backend, leaf_size=8)
+    for q in queries(df):
+        assert ranker.top_candidates(q, 5, nearest_k) == legacy_top_candidates_from_dataset(df, q, 5, nearest_k)
+
+
+@pytest.mark.parametrize("backend", EXACT_BACKENDS)
+def test_neighbor_ranker_ties_match_pandas(backend):
+    # Twin rows sit at equal distances; with every twin inside nearest_k the
+    # ranking does not depend on which of two tied rows a search returns first
+    df = tied_frame()
+    ranker = build_neighbor_ranker(df, backend=backend, leaf_size=8)
+    for q in queries(df):
+        assert ranker.top_candidates(q, 5, len(df)) == legacy_top_candidates_from_dataset(df, q, 5, len(df))
+
+
+def test_bad_inputs_rank_nothing():
+    df = crop_frame()
+    q = dict(queries(df)[0], ph="acidic")
+    assert build_dataset_index(df).top_crops(q) == legacy_top_crops_by_dataset(df, q) == []
@@ -0,0 +1,71 @@
+"""The ranking_path and model_errors counters: one count per ranking served, cached or not."""
+import logging
+
+import numpy as np
+
+from utils.batch import rank_batch
+from tests.test_batch import FailingModel, reading, softmax_model
+
+
+def path_counts(web_app):
+    return {path: web_app.RANKING_PATH.labels(path=path).value for path in ("model", "dataset", "error")}
+
+
+def counted(web_app, before):
+    after = path_counts(web_app)
+    return {path: after[path] - before[path] for path in after if after[path] != before[path]}
+
+
+def test_rank_batch_reports_its_path():
+    X = np.array([[reading()[f] for f in ("n", "p", "k", "temperature", "humidity", "ph", "rainfall")]])
+    paths = []
+    rank_batch(X, model=softmax_model(), on_path=paths.append)
+    rank_batch(X, model=None, dataset_index=None, on_path=paths.append)
+    assert paths == ["model"]
+
+
+def test_cache_hits_are_counted_like_misses(web_app, serving):
+    serving(softmax_model())
+    before = path_counts(web_app)
+    first = web_app.cached_ranking(reading(), inline=True)
+    hits = web_app.recommendation_cache.hits
+    assert web_app.cached_ranking(reading(), inline=True) == first
+    assert web_app.recommendation_cache.hits == hits + 1
+    assert counted(web_app, before) == {"model": 2}
+
+
+def test_dataset_fallback_is_counted(web_app, serving):
+    serving(None)
+    before = path_counts(web_app)
+    web_app.cached_ranking(reading(), inline=True)
+    web_app.cached_ranking(reading(), inline=True)
+    assert counted(web_app, before) == {"dataset": 2}
+
+
+def test_batch_rows_are_counted_by_path(web_app, serving, client):
+    serving(softmax_model())
+    before = path_counts(web_app)
+    assert client.post("/api/recommend/batch", json=[reading(), reading(ph=5.0), reading(n=10)]).status_code == 200
+    assert counted(web_app, before) == {"model": 3}
+
+    serving(FailingModel())
+    before = path_counts(web_app)
+    assert client.post("/api/recommend/batch", json=[reading(), reading(ph=5.0)]).status_code == 200
+    assert counted(web_app, before) == {"dataset": 2}
+
+    serving(FailingModel(), dataset=None)
+    before = path_counts(web_app)
+    assert client.post("/api/recommend/batch", json=[reading(), reading(ph=5.0)]).status_code == 503
+    assert counted(web_app, before) == {"error": 2}
+
+
+def test_rank_readings_counts_and_logs_model_errors(web_app, serving, caplog):
+    serving(FailingModel())
+    errors = web_app.MODEL_ERRORS.labels(error="RuntimeError")
+    before = errors.value
+    with caplog.at_level(logging.WARNING):
+        rankings = web_app.rank_readings([reading(), reading(ph=5.0)])
+    assert [path for _, _, path in rankings] == ["dataset", "dataset"]
+    # Once for the batch call, then once per reading retried alone
+    assert errors.value == before + 3
+    assert "Model inference failed" in caplog.text
@@ -0,0 +1,133 @@
+"""Model registry: publishing, activation and rollback, and the app following the active version."""
+import logging
+
+import joblib
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from utils.dataset_index import FEATURES
+from utils.registry import ModelRegistry, RegistryError, RegistryWatcher
+from tests.test_ranking import crop_frame
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    """Two fitted models and a dataset CSV to publish."""
+    df = crop_frame(rows=200, seed=5)
+    paths = {}
+    for name, depth in (("v1", 1), ("v2", 4)):
+        paths[name] = str(tmp_path / f"{name}.pkl")
+        joblib.dump(DecisionTreeClassifier(max_depth=depth, random_state=0).fit(df[FEATURES], df["label"]), paths[name])
+    paths["data"] = str(tmp_path / "crops.csv")
+    df.to_csv(paths["data"], index=False)
+    return paths
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / "registry"))
+
+
+def test_publish_numbers_versions_and_copies_artifacts(registry, artifacts):
+    first = registry.publish(artifacts["v1"], artifacts["data"], note="baseline")
+    second = registry.publish(artifacts["v2"])
+    assert [v.version for v in registry.versions()] == ["v0001", "v0002"]
+    assert first.meta["note"] == "baseline" and first.data_path.endswith("data.csv")
+    assert second.data_path is None
+    assert open(first.model_path, "rb").read() == open(artifacts["v1"], "rb").read()
+    # Publishing alone activates nothing
+    assert registry.active_version() is None
+
+
+def test_activate_and_roll_back(registry, artifacts):
+    registry.publish(artifacts["v1"], activate=True)
+    registry.publish(artifacts["v2"])
+    assert registry.active_version() == "v0001"
+
+    assert registry.activate("v0002") == "v0001"
+    assert registry.active().version == "v0002"
+    # Rolling back is activating the previous version again
+    assert registry.activate("v0001") == "v0002"
+    assert registry.active_version() == "v0001"
+
+
+@pytest.mark.parametrize("version", ["v0009", "latest", "../v0001"])
+def test_activating_an_unknown_version_changes_nothing(registry, artifacts, version):
+    registry.publish(artifacts["v1"], activate=True)
+    with pytest.raises(RegistryError):
+        registry.activate(version)
+    assert registry.active_version() == "v0001"
+
+
+def test_publish_rejects_missing_artifacts(registry, artifacts, tmp_path):
+    with pytest.raises(RegistryError):
+        registry.publish(str(tmp_path / "missing.pkl"))
+    with pytest.raises(RegistryError):
+        registry.publish(artifacts["v1"], str(tmp_path / "missing.csv"))
+    assert registry.versions() == []
+
+
+def test_watcher_hands_each_activation_over_once(registry, artifacts):
+    registry.publish(artifacts["v1"], activate=True)
+    registry.publish(artifacts["v2"])
+    seen = []
+    watcher = RegistryWatcher(registry, seen.append)
+    assert watcher.check() and not watcher.check()
+    registry.activate("v0002")
+    registry.activate("v0001")
+    assert watcher.check() is False
+    registry.activate("v0002")
+    assert watcher.check()
+    assert seen == ["v0001", "v0002"]
+
+
+def test_watcher_keeps_failed_activations_until_the_next_change(registry, artifacts):
+    registry.publish(artifacts["v1"], activate=True)
+
+    def fail(version):
+        raise OSError("disk unavailable")
+
+    watcher = RegistryWatcher(registry, fail)
+    assert watcher.check()
+    assert watcher.last_error == "disk unavailable"
+    assert not watcher.check()
+
+
+def test_app_serves_activated_versions_and_rolls_back(web_app, serving, registry, artifacts, monkeypatch, caplog):
+    serving(None)
+    monkeypatch.setattr(web_app, "registry", registry)
+    watcher = RegistryWatcher(registry, web_app.activate_version)
+    registry.publish(artifacts["v1"], artifacts["data"], activate=True)
+    registry.publish(artifacts["v2"], artifacts["data"])
+
+    with caplog.at_level(logging.INFO):
+        watcher.check()
+    snapshot = web_app.resources.snapshot()
+    assert snapshot.version == "v0001" and snapshot.model.get_depth() == 1
+    assert snapshot.dataset.rows == 200
+    assert "Serving model version v0001" in caplog.text
+
+    registry.activate("v0002")
+    watcher.check()
+    assert web_app.resources.snapshot().model.get_depth() == 4
+
+    registry.activate("v0001")
+    watcher.check()
+    snapshot = web_app.resources.snapshot()
+    assert snapshot.version == "v0001" and snapshot.model.get_depth() == 1
+
+
+def test_app_keeps_serving_when_a_version_fails_to_load(web_app, serving, registry, artifacts, monkeypatch, tmp_path):
+    serving(None)
+    monkeypatch.setattr(web_app, "registry", registry)
+    watcher = RegistryWatcher(registry, web_app.activate_version)
+    registry.publish(artifacts["v1"], activate=True)
+    watcher.check()
+    broken = tmp_path / "broken.pkl"
+    broken.write_bytes(b"not a pickle")
+    registry.publish(str(broken), activate=True)
+
+    watcher.check()
+    assert watcher.last_error
+    snapshot = web_app.resources.snapshot()
+    assert snapshot.version == "v0001" and snapshot.model.get_depth() == 1
@@ -0,0 +1,153 @@
+"""ResourceManager snapshots: what a request sees while the model and dataset are swapped."""
+import threading
+import time
+
+from utils.cache import LRUCache
+from utils.resources import ResourceManager
+
+
+def make_manager(**kwargs):
+    return ResourceManager(lambda: "model-v1", lambda: "dataset-v1", mode="eager", version="v1", **kwargs)
+
+
+def test_snapshot_holds_loaded_resources():
+    manager = make_manager()
+    manager.start()
+    snapshot = manager.snapshot()
+    assert (snapshot.model, snapshot.dataset, snapshot.version) == ("model-v1", "dataset-v1", "v1")
+    assert manager.status()["generation"] == snapshot.generation
+
+
+def test_lazy_snapshot_loads_both_resources():
+    manager = ResourceManager(lambda: "model", lambda: "dataset", mode="lazy")
+    manager.start()
+    snapshot = manager.snapshot()
+    assert (snapshot.model, snapshot.dataset) == ("model", "dataset")
+
+
+def test_lazy_mode_loads_once_on_first_snapshot():
+    calls = []
+
+    def loader(name):
+        def load():
+            calls.append((name, threading.current_thread().name))
+            return name
+        return load
+
+    manager = ResourceManager(loader("model"), loader("dataset"), mode="lazy")
+    manager.start()
+    assert not calls and not manager.ready
+    assert manager.snapshot().model == "model"
+    assert manager.snapshot().dataset == "dataset"
+    # Loaded by the first request's thread, not in the background
+    assert calls == [("model", threading.current_thread().name), ("dataset", threading.current_thread().name)]
+    assert manager.ready
+
+
+def test_lazy_load_failure_serves_none():
+    def fail():
+        raise OSError("no such model")
+
+    manager = ResourceManager(fail, lambda: "dataset", mode="lazy")
+    manager.start()
+    snapshot = manager.snapshot()
+    assert (snapshot.model, snapshot.dataset) == (None, "dataset")
+    assert manager.status()["model"]["error"] == "no such model"
+
+
+def test_snapshot_waits_at_most_wait_timeout_in_all():
+    release = threading.Event()
+
+    def slow(name):
+        def load():
+            release.wait(5)
+            return name
+        return load
+
+    manager = ResourceManager(slow("model"), slow("dataset"), mode="background", wait_timeout=0.3)
+    manager.start()
+    try:
+        start = time.monotonic()
+        snapshot = manager.snapshot()
+        elapsed = time.monotonic() - start
+    finally:
+        release.set()
+    # One shared deadline, not wait_timeout per resource
+    assert 0.25 <= elapsed < 0.5
+    assert (snapshot.model, snapshot.dataset) == (None, None)
+
+
+def test_snapshot_after_timeout_serves_what_finished():
+    release = threading.Event()
+
+    def slow_model():
+        release.wait(5)
+        return "model"
+
+    manager = ResourceManager(slow_model, lambda: "dataset", mode="background", wait_timeout=0.05)
+    manager.start()
+    try:
+        while not manager.dataset.ready:
+            time.sleep(0.01)
+        snapshot = manager.snapshot()
+        assert (snapshot.model, snapshot.dataset) == (None, "dataset")
+    finally:
+        release.set()
+    while not manager.ready:
+        time.sleep(0.01)
+    assert manager.snapshot().model == "model"
+
+
+def test_swap_publishes_once():
+    changes = []
+    manager = make_manager(on_change=lambda: changes.append(manager.current))
+    manager.start()
+    before = manager.snapshot()
+    changes.clear()
+
+    manager.swap("model-v2", "dataset-v2", version="v2")
+
+    assert len(changes) == 1
+    after = manager.snapshot()
+    assert changes[0] is after
+    assert (after.model, after.dataset, after.version) == ("model-v2", "dataset-v2", "v2")
+    assert after.generation == before.generation + 1
+    # Requests holding the old snapshot keep a consistent view
+    assert (before.model, before.dataset, before.version) == ("model-v1", "dataset-v1", "v1")
+
+
+def test_snapshots_never_mix_versions_during_swaps():
+    manager = make_manager()
+    manager.start()
+    stop = threading.Event()
+    mixed = []
+
+    def read():
+        while not stop.is_set():
+            snapshot = manager.snapshot()
+            if snapshot.model[-2:] != snapshot.dataset[-2:]:
+                mixed.append((snapshot.model, snapshot.dataset))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(2000):
+        v = f"v{i % 2 + 1}"
+        manager.swap(f"model-{v}", f"dataset-{v}", version=v)
+    stop.set()
+    reader.join()
+    assert not mixed
+
+
+def test_result_computed_before_swap_is_not_served_after_it():
+    cache = LRUCache(maxsize=16)
+    manager = make_manager(on_change=cache.invalidate)
+    manager.start()
+
+    snapshot = manager.snapshot()
+    generation = cache.generation
+    manager.swap("model-v2", "dataset-v2", version="v2")
+    # The request that started before the swap finishes now
+    cache.set((snapshot.generation, "reading"), snapshot.model, generation=generation)
+
+    assert cache.get((manager.snapshot().generation, "reading")) is None
+    assert len(cache) == 0
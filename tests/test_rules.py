@@ -0,0 +1,59 @@
+"""The rules-as-data diagnosis engine against the original hand-written if-chains."""
+import pytest
+
+from benchmarks.legacy_rules import legacy_apply_rules, legacy_climate_rules, legacy_nutrient_rules
+from benchmarks.legacy_rules import legacy_pest_disease_rules, legacy_soil_rules, legacy_vegetable_rules
+from benchmarks.synthetic import sample_columns, to_rows
+from utils import rules
+from utils.rule_engine import Field, Rule, RuleSet
+
+
+ROWS = to_rows(sample_columns(20000))
+COLUMNS = sample_columns(20000)
+
+
+@pytest.mark.parametrize("legacy, current, args", [
+    (legacy_apply_rules, rules.apply_rules, lambda r: (r,)),
+    (legacy_soil_rules, rules.soil_rules, lambda r: (r["soil_type"], r["rainfall"])),
+    (legacy_pest_disease_rules, rules.pest_disease_rules, lambda r: (r["temperature"], r["humidity"])),
+    (legacy_nutrient_rules, rules.nutrient_rules, lambda r: (r["n"], r["p"], r["k"])),
+    (legacy_vegetable_rules, rules.vegetable_rules, lambda r: (r["crop"],)),
+    (legacy_climate_rules, rules.climate_rules, lambda r: (r["climate"], r["soil_type"])),
+], ids=["apply_rules", "soil", "pest_disease", "nutrient", "vegetable", "climate"])
+def test_scalar_rules_match_legacy(legacy, current, args):
+    for row in ROWS:
+        assert tuple(current(*args(row))) == tuple(legacy(*args(row))), row
+
+
+@pytest.mark.parametrize("legacy, ruleset", [
+    (lambda r: legacy_apply_rules(r), rules.DIAGNOSIS_RULES),
+    (lambda r: legacy_soil_rules(r["soil_type"], r["rainfall"]), rules.SOIL_RULES),
+    (lambda r: legacy_pest_disease_rules(r["temperature"], r["humidity"]), rules.PEST_DISEASE_RULES),
+    (lambda r: legacy_nutrient_rules(r["n"], r["p"], r["k"]), rules.NUTRIENT_RULES),
+    (lambda r: legacy_vegetable_rules(r["crop"]), rules.VEGETABLE_RULES),
+    (lambda r: legacy_climate_rules(r["climate"], r["soil_type"]), rules.CLIMATE_RULES),
+], ids=["diagnosis", "soil", "pest_disease", "nutrient", "vegetable", "climate"])
+def test_batch_rules_match_legacy(legacy, ruleset):
+    expected = [tuple(legacy(r)) for r in to_rows(COLUMNS)]
+    assert [tuple(o) for o in ruleset.evaluate_batch(COLUMNS)] == expected
+
+
+def test_apply_rules_batch_matches_scalar():
+    assert rules.apply_rules_batch(COLUMNS) == [rules.apply_rules(r) for r in to_rows(COLUMNS)]
+
+
+def test_incremental_matches_full_evaluation():
+    previous = ROWS[0]
+    outputs, hits, _ = rules.DIAGNOSIS_RULES.evaluate_incremental(previous)
+    for row in ROWS[1:2000]:
+        changed = {f for f in row if row[f] != previous[f]}
+        outputs, hits, _ = rules.DIAGNOSIS_RULES.evaluate_incremental(row, hits, changed)
+        assert outputs == legacy_apply_rules(row)
+        previous = row
+
+
+def test_compile_function_rejects_missing_fields():
+    ruleset = RuleSet([Rule(1, Field("n") > 1, ("high",))], default=("ok",))
+    assert ruleset.compile_function("n")(2) == ("high",)
+    with pytest.raises(ValueError):
+        ruleset.compile_function("p")
@@ -0,0 +1,87 @@
+"""Server-side session expiry: the TTL runs from the last write, not the last read."""
+import pytest
+from flask import Flask, session
+
+from utils import sessions
+from utils.sessions import FileSessionStore, SQLiteSessionStore, ServerSideSessionInterface, new_sid
+
+TTL = 100
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["filesystem", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "filesystem":
+        return FileSessionStore(str(tmp_path / "sessions"))
+    return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+
+
+def test_store_expires_entries(store, clock):
+    live, stale = new_sid(), new_sid()
+    store.save(live, {"user": "a"}, clock.now + TTL)
+    store.save(stale, {"user": "b"}, clock.now - 1)
+    assert store.load(live) == {"user": "a"}
+    assert store.load(stale) is None
+    assert store.purge_expired() == 1
+    clock.now += TTL + 1
+    assert store.load(live) is None
+    assert store.purge_expired() == 1
+
+
+@pytest.fixture
+def client(store, clock):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = ServerSideSessionInterface(store, ttl=TTL)
+
+    @app.route("/write/<value>")
+    def write(value):
+        session["value"] = value
+        return "ok"
+
+    @app.route("/read")
+    def read():
+        return session.get("value", "")
+
+    return app.test_client()
+
+
+def test_reads_do_not_extend_a_session(client, clock):
+    client.get("/write/a")
+    clock.now += TTL - 10
+    assert client.get("/read").text == "a"
+    # 20 s after that read, but TTL + 10 s after the write
+    clock.now += 20
+    assert client.get("/read").text == ""
+
+
+def test_writes_restart_the_ttl(client, clock):
+    client.get("/write/a")
+    clock.now += TTL - 10
+    client.get("/write/b")
+    clock.now += TTL - 10
+    assert client.get("/read").text == "b"
+    clock.now += 20
+    assert client.get("/read").text == ""
+
+
+def test_rewriting_the_same_value_is_not_a_write(client, clock):
+    client.get("/write/a")
+    clock.now += TTL - 10
+    client.get("/write/a")
+    clock.now += 20
+    assert client.get("/read").text == ""
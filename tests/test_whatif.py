@@ -0,0 +1,120 @@
+"""What-if edits: a delta evaluation redoes only the affected stages and matches a full one."""
+import numpy as np
+import pytest
+
+from utils.dataset_index import FEATURES
+from utils.rules import DIAGNOSIS_RULES, TIP_SECTIONS
+from utils.whatif import apply_changes, evaluate
+from tests.test_batch import reading, softmax_model
+
+EDITS = {
+    "n": [-1.0, 0.0, 2.0, 120],
+    "p": [-1.0, 80],
+    "k": [-1.0, 10],
+    "temperature": [18.0, 31.0, 35.0],
+    "humidity": [50.0, 86.0, 95.0],
+    "ph": [5.0, 6.4, 6.6, 7.9],
+    "rainfall": [20.0, 45.0, 120.0, 160.0, 250.0],
+    "soil_type": ["Clay", "Sandy", "Silt"],
+    "climate": ["Tropical Wet", "Urban Heat Zone", "Temperate"],
+}
+
+
+class CountingRank:
+    """A ranking that depends on pH and rainfall and counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, inputs):
+        self.calls += 1
+        crops = ["rice", "maize"] if inputs["ph"] < 6.5 else ["maize", "rice"]
+        if inputs["rainfall"] > 150:
+            crops.reverse()
+        return crops[0], [{"crop": c, "suitability": 60 - 20 * i} for i, c in enumerate(crops)], "model"
+
+
+def outputs(result):
+    return {k: v for k, v in result.to_dict().items() if k != "recomputed"}
+
+
+def base_inputs():
+    return apply_changes({}, reading())
+
+
+def edits():
+    return [(field, value) for field, values in EDITS.items() for value in values]
+
+
+@pytest.mark.parametrize("field, value", edits())
+def test_delta_matches_full_evaluation(field, value):
+    rank = CountingRank()
+    base = evaluate(base_inputs(), rank=rank)
+    edited = apply_changes(base.inputs, {field: value})
+    assert outputs(evaluate(edited, rank=rank, previous=base)) == outputs(evaluate(edited, rank=rank))
+
+
+@pytest.mark.parametrize("field, value", edits())
+def test_delta_recomputes_only_affected_stages(field, value):
+    rank = CountingRank()
+    base = evaluate(base_inputs(), rank=rank)
+    calls = rank.calls
+    result = evaluate(apply_changes(base.inputs, {field: value}), rank=rank, previous=base)
+
+    assert result.recomputed["ranking"] == (field in FEATURES)
+    assert rank.calls == calls + (field in FEATURES)
+
+    by_priority = {r.priority: i for i, r in enumerate(DIAGNOSIS_RULES.rules)}
+    for i in (by_priority[p] for p in result.recomputed["rules"]):
+        # Re-tested because it reads the edited field, or never tested before
+        assert field in DIAGNOSIS_RULES.rule_fields[i] or base.rule_hits[i] is None
+
+    changed = {field} | ({"crop"} if result.crop != base.crop else set())
+    assert result.recomputed["tips"] == [name for name, fields, _ in TIP_SECTIONS if fields & changed]
+
+
+def test_unchanged_edit_recomputes_nothing():
+    rank = CountingRank()
+    base = evaluate(base_inputs(), rank=rank)
+    result = evaluate(apply_changes(base.inputs, {"ph": base.inputs["ph"]}), rank=rank, previous=base)
+    assert result.recomputed == {"ranking": False, "rules": [], "tips": []}
+    assert rank.calls == 1
+    assert outputs(result) == outputs(base)
+
+
+def test_chained_deltas_match_full_evaluations():
+    rng = np.random.default_rng(0)
+    rank = CountingRank()
+    result = evaluate(base_inputs(), rank=rank)
+    fields = list(EDITS)
+    for _ in range(300):
+        field = fields[rng.integers(len(fields))]
+        values = EDITS[field]
+        edited = apply_changes(result.inputs, {field: values[rng.integers(len(values))]})
+        result = evaluate(edited, rank=rank, previous=result)
+        assert outputs(result) == outputs(evaluate(edited, rank=rank))
+
+
+def test_api_delta_matches_full_request(serving, client):
+    serving(softmax_model())
+    inputs = reading()
+    first = client.post("/api/whatif", json={"inputs": inputs}).get_json()
+    delta = client.post("/api/whatif", json={"base": first["request_id"], "changes": {"ph": 5.2}}).get_json()
+    full = client.post("/api/whatif", json={"inputs": dict(inputs, ph=5.2)}).get_json()
+    assert delta["recomputed"]["ranking"] and delta["recomputed"]["tips"][0] == "ph"
+    for key in ("inputs", "crop", "suggestions", "tips", "diagnosis"):
+        assert delta[key] == full[key]
+
+
+@pytest.mark.parametrize("rank", ["false", "true", 0, 1, None, []])
+def test_api_rank_must_be_a_boolean(client, rank):
+    response = client.post("/api/whatif", json={"inputs": reading(), "rank": rank})
+    assert response.status_code == 400
+    assert "'rank'" in response.get_json()["error"]
+
+
+def test_api_rank_false_skips_ranking(client):
+    body = client.post("/api/whatif", json={"inputs": reading(), "rank": False}).get_json()
+    assert body["crop"] is None and body["suggestions"] == []
+    assert body["recomputed"]["ranking"] is False
+    assert body["tips"] and body["diagnosis"]["condition"]
@@ -0,0 +1,177 @@
+"""Fingerprinted, pre-compressed static assets and cached page shells.
+
+``build_assets`` reads every file under the static folder once. Each file
+gets a content-hash name (``style.css`` becomes ``style.<hash>.css``), so
+its URL can be cached for a year and changes whenever the file does.
+Text files are gzip-compressed up front, and brotli-compressed too when
+the ``brotli`` package is installed. ``url(/static/...)`` references in
+CSS are rewritten to the hashed names before the CSS is hashed, so the
+background images are cached as well. ``Shell`` holds one rendered page
+with its ETag and compressed variants.
+
+To write the hashed files and a manifest for a CDN or reverse proxy
+(e.g. nginx ``gzip_static``), run from the repository root:
+
+    python -m utils.assets --out build/assets
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+HASH_LENGTH = 12
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt", ".xml", ".map"}
+# Bodies smaller than this gain nothing worth a Content-Encoding
+MIN_COMPRESS_BYTES = 512
+ENCODINGS = ("br", "gzip")
+CSS_URL = re.compile(r"""url\((['"]?)/static/([^'")?#]+)\1\)""")
+
+
+def compress_variants(data, level=9):
+    """{"gzip": bytes, "br": bytes} for ``data``, keeping only encodings that make it smaller."""
+    if len(data) < MIN_COMPRESS_BYTES:
+        return {}
+    variants = {"gzip": gzip.compress(data, compresslevel=level, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11 if level >= 9 else 5)
+    return {enc: body for enc, body in variants.items() if len(body) < len(data)}
+
+
+def choose_encoding(accept_encodings, variants):
+    """Best encoding in ``variants`` the client accepts (werkzeug Accept), or None for identity."""
+    offered = [enc for enc in ENCODINGS if enc in variants]
+    return accept_encodings.best_match(offered) if offered else None
+
+
+def variant_etag(etag, encoding):
+    """ETag of the ``encoding`` variant of a body; each encoding is a separate representation."""
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+class Asset:
+    """One static file: its logical path, hashed name, bytes and compressed variants."""
+
+    __slots__ = ("path", "name", "data", "content_type", "etag", "variants")
+
+    def __init__(self, path, data):
+        digest = hashlib.sha256(data).hexdigest()
+        stem, ext = os.path.splitext(path)
+        self.path = path
+        self.name = f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+        self.data = data
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type.endswith(("javascript", "json", "xml")):
+            self.content_type += "; charset=utf-8"
+        self.etag = digest[:2 * HASH_LENGTH]
+        self.variants = compress_variants(data) if ext.lower() in COMPRESSIBLE else {}
+
+
+class AssetBundle:
+    """Assets by logical path (``url_name``) and by hashed name (``get``)."""
+
+    def __init__(self, assets):
+        self.by_name = {a.name: a for a in assets}
+        self.names = {a.path: a.name for a in assets}
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def url_name(self, path):
+        return self.names.get(path)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def manifest(self):
+        return {
+            a.path: {"name": a.name, "bytes": len(a.data), "encodings": {e: len(b) for e, b in a.variants.items()}}
+            for a in sorted(self.by_name.values(), key=lambda a: a.path)
+        }
+
+
+def _static_files(static_dir, exclude):
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir)
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                         and os.path.normpath(os.path.join(rel_root, d)) not in exclude)
+        for f in sorted(files):
+            if not f.startswith("."):
+                yield os.path.normpath(os.path.join(rel_root, f)).replace(os.sep, "/")
+
+
+def build_assets(static_dir, exclude=("uploads",), url_prefix="/assets/"):
+    """Read and fingerprint every file under ``static_dir`` except the ``exclude`` subdirectories.
+
+    ``url_prefix`` is where the app serves hashed names; CSS references to
+    ``/static/<path>`` are rewritten to it.
+    """
+    paths = list(_static_files(static_dir, set(exclude)))
+    raw = {}
+    for path in paths:
+        with open(os.path.join(static_dir, path), "rb") as fh:
+            raw[path] = fh.read()
+
+    assets = {p: Asset(p, data) for p, data in raw.items() if not p.endswith(".css")}
+
+    def rewrite(match):
+        target = assets.get(match.group(2))
+        if target is None:
+            return match.group(0)
+        return f"url({match.group(1)}{url_prefix}{target.name}{match.group(1)})"
+
+    for path, data in raw.items():
+        if path.endswith(".css"):
+            css = CSS_URL.sub(rewrite, data.decode("utf-8"))
+            assets[path] = Asset(path, css.encode("utf-8"))
+    return AssetBundle(assets.values())
+
+
+def write_assets(bundle, out_dir):
+    """Write every hashed file (plus ``.gz``/``.br`` siblings) and ``manifest.json`` under ``out_dir``."""
+    for asset in bundle.by_name.values():
+        path = os.path.join(out_dir, asset.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(asset.data)
+        for enc, body in asset.variants.items():
+            with open(path + (".gz" if enc == "gzip" else ".br"), "wb") as fh:
+                fh.write(body)
+    with open(os.path.join(out_dir, "manifest.json"), "w") as fh:
+        json.dump(bundle.manifest(), fh, indent=2)
+
+
+class Shell:
+    """A rendered page kept for reuse: body, ETag and compressed variants."""
+
+    __slots__ = ("body", "etag", "variants")
+
+    def __init__(self, html):
+        self.body = html.encode("utf-8")
+        self.etag = hashlib.sha256(self.body).hexdigest()[:2 * HASH_LENGTH]
+        self.variants = compress_variants(self.body, level=6)
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--static", default=os.path.join(root, "web_app", "static"))
+    parser.add_argument("--out", default=os.path.join(root, "build", "assets"))
+    parser.add_argument("--prefix", default="/assets/", help="URL prefix the hashed files are served under")
+    args = parser.parse_args()
+
+    bundle = build_assets(args.static, url_prefix=args.prefix)
+    write_assets(bundle, args.out)
+    total = sum(len(a.data) for a in bundle.by_name.values())
+    print(f"wrote {len(bundle)} assets ({total / 1e6:.2f} MB) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+import csv
+import io
+import logging
+
+import numpy as np
+
+from utils.dataset_index import FEATURES
+from utils.rules import generate_growing_tips
+
+TEXT_FIELDS = ["soil_type", "climate"]
+
+log = logging.getLogger(__name__)
+
+
+class BatchValidationError(ValueError):
+    """Raised when one or more readings in a batch are invalid.
+
+    ``errors`` lists ``{"row": i, "error": message}`` entries.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid reading(s)")
+
+
+class ModelInferenceError(RuntimeError):
+    """Raised when the model fails and there is no dataset index to fall back to.
+
+    The model's exception is chained as ``__cause__``.
+    """
+
+
+def readings_from_csv(text):
+    """Parse CSV text with a header row into a list of reading dicts."""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{str(k).strip().lower(): v for k, v in row.items() if k is not None} for row in reader]
+
+
+def _row_errors(records):
+    errors = []
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            errors.append({"row": i, "error": "reading must be an object"})
+            continue
+        for f in FEATURES:
+            try:
+                v = float(r[f])
+            except KeyError:
+                errors.append({"row": i, "error": f"missing field '{f}'"})
+                break
+            except (TypeError, ValueError):
+                errors.append({"row": i, "error": f"field '{f}' is not a number"})
+                break
+            if not np.isfinite(v):
+                errors.append({"row": i, "error": f"field '{f}' is not finite"})
+                break
+        else:
+            for f in TEXT_FIELDS:
+                if not str(r.get(f) or "").strip():
+                    errors.append({"row": i, "error": f"missing field '{f}'"})
+                    break
+    return errors
+
+
+def validate_readings(records):
+    """Validate reading dicts into an (N, 7) float array plus their text fields.
+
+    Raises BatchValidationError listing every bad row.
+    """
+    try:
+        X = np.array([[r[f] for f in FEATURES] for r in records], dtype=np.float64).reshape(len(records), len(FEATURES))
+        texts = [[str(r[f]).strip() for f in TEXT_FIELDS] for r in records]
+        ok = np.isfinite(X).all() and all(s for row in texts for s in row)
+    except Exception:
+        ok = False
+    if not ok:
+        raise BatchValidationError(_row_errors(records))
+    return X, texts
+
+
+def rank_classes(proba, top_n):
+    """Return (class indices, probabilities) of the top-N classes per row, best first.
+
+    Ties keep class order, matching a stable descending sort of each row.
+    """
+    n_rows, n_classes = proba.shape
+    top_n = max(1, min(int(top_n), n_classes))
+    if top_n < n_classes:
+        top = np.argpartition(-proba, top_n - 1, axis=1)[:, :top_n]
+        # Rows where ties straddle the cut need a stable sort to pick the same classes
+        kth = np.take_along_axis(proba, top, axis=1).min(axis=1)
+        tied = (proba >= kth[:, None]).sum(axis=1) > top_n
+        if tied.any():
+            top[tied] = np.argsort(-proba[tied], axis=1, kind="stable")[:, :top_n]
+    else:
+        top = np.broadcast_to(np.arange(n_classes), (n_rows, n_classes)).copy()
+    p = np.take_along_axis(proba, top, axis=1)
+    order = np.lexsort((top, -p), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    return top, np.take_along_axis(p, order, axis=1)
+
+
+def _model_frame(model, X):
+    # Models fitted on a DataFrame warn when given bare arrays
+    if getattr(model, "feature_names_in_", None) is not None:
+        import pandas as pd
+        return pd.DataFrame(X, columns=FEATURES)
+    return X
+
+
+def rank_batch(X, model=None, dataset_index=None, top_n=5, on_model_error=None, on_path=None):
+    """Rank crops for every row of ``X`` with one model call.
+
+    Falls back to the dataset index when the model is missing or fails. A
+    model failure is passed to ``on_model_error`` (logged by default); with
+    no dataset index to fall back to it raises ModelInferenceError instead.
+    ``on_path`` is called once with "model" or "dataset", whichever ranked
+    the rows. Returns a list of ``[{"crop", "suitability"}, ...]`` per row.
+    """
+    if model is not None and hasattr(model, "predict_proba"):
+        try:
+            proba = np.asarray(model.predict_proba(_model_frame(model, X)))
+            classes = np.asarray(getattr(model, "classes_", []))
+            if len(classes):
+                top, p = rank_classes(proba, top_n)
+                names = classes[top]
+                pct = np.rint(p * 100).astype(int)
+                if on_path is not None:
+                    on_path("model")
+                return [
+                    [{"crop": str(c), "suitability": int(s)} for c, s in zip(row_names, row_pct)]
+                    for row_names, row_pct in zip(names.tolist(), pct.tolist())
+                ]
+        except Exception as e:
+            if dataset_index is None:
+                raise ModelInferenceError(f"Model inference failed: {e}") from e
+            if on_model_error is not None:
+                on_model_error(e)
+            else:
+                log.warning("Model inference failed, using dataset fallback: %s", e)
+
+    if dataset_index is None:
+        return [[] for _ in range(len(X))]
+    if on_path is not None:
+        on_path("dataset")
+    cols = [FEATURES.index(f) for f in dataset_index.features]
+    return dataset_index.top_crops_batch(X[:, cols], k=top_n)
+
+
+def recommend_batch(records, model=None, dataset_index=None, top_n=5, on_model_error=None, on_path=None):
+    """Validate N readings, rank crops for all of them and attach growing tips.
+
+    Returns one ``{"crop", "suggestions", "tips"}`` dict per reading
+    (``crop`` is None when no ranking is available).
+    """
+    X, texts = validate_readings(records)
+    ranked = rank_batch(X, model=model, dataset_index=dataset_index, top_n=top_n, on_model_error=on_model_error,
+                        on_path=on_path)
+
+    results = []
+    for values, (soil_type, climate), suggestions in zip(X.tolist(), texts, ranked):
+        inputs = dict(zip(FEATURES, values), soil_type=soil_type, climate=climate)
+        crop = suggestions[0]["crop"] if suggestions else None
+        results.append({
+            "crop": crop,
+            "suggestions": suggestions,
+            "tips": generate_growing_tips(inputs, crop),
+        })
+    return results
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils.dataset_index import FEATURES
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with an optional TTL (seconds).
+
+    Keeps hit/miss/eviction counters; ``invalidate()`` drops every entry,
+    e.g. after the model or dataset is reloaded. Read ``generation`` before
+    computing a value and pass it to ``set``: a value computed from data
+    replaced in the meantime is then dropped instead of outliving the
+    invalidation.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    @property
+    def generation(self):
+        return self.invalidations
+
+    def set(self, key, value, generation=None):
+        if self.maxsize <= 0:
+            return
+        expires = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self.invalidations:
+                return
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def recommendation_key(inputs, precision=2):
+    """Cache key for a crop ranking: the seven numeric features rounded to ``precision`` decimals."""
+    return tuple(round(float(inputs[f]), precision) for f in FEATURES)
+
+
+def quantized_inputs(key):
+    """The feature dict a ranking cached under ``key`` is computed from, so it depends on the key alone."""
+    return dict(zip(FEATURES, key))
@@ -0,0 +1,206 @@
+import numpy as np
+
+FEATURES = ["n", "p", "k", "temperature", "humidity", "ph", "rainfall"]
+LABEL_COLUMNS = ("label", "crop", "crops")
+# Elements in the (queries, rows, features) float32 temporary of one best_distances_batch
+# chunk (16 MB), so large datasets take fewer queries per chunk instead of more memory
+BATCH_ELEMENTS = 1 << 22
+
+
+def merge_labels(labels, codes, new_labels):
+    """Add ``new_labels`` to the sorted vocabulary ``labels`` (with row ``codes``).
+
+    Returns (merged labels, existing codes remapped into them, codes of the new rows).
+    """
+    labels = np.asarray(labels)
+    new_labels = np.asarray(new_labels)
+    merged = np.unique(np.concatenate([labels, new_labels]))
+    if len(merged) == len(labels):
+        old_codes = np.asarray(codes, dtype=np.int32)
+    else:
+        old_codes = np.searchsorted(merged, labels).astype(np.int32)[codes]
+    return merged, old_codes, np.searchsorted(merged, new_labels).astype(np.int32)
+
+
+def rank_suggestions(best, labels, k):
+    """Turn per-crop distances into the top-k ``{"crop", "suitability"}`` list, closest first.
+
+    Suitability is 100 at distance 0 falling to 0 at the largest distance.
+    """
+    best = np.asarray(best, dtype=np.float64)
+    # Stable sort keeps label order for ties, as groupby + sort_values did
+    order = np.argsort(best, kind="stable")[:max(1, int(k))]
+
+    # Convert to suitability score (higher is better); plain floats, as np.clip
+    # on a handful of values costs more than the ranking itself
+    d_max = float(best.max())
+    eps = 1e-9
+    suitability = [min(max((1.0 - b / (d_max + eps)) * 100, 0.0), 100.0) for b in best[order].tolist()]
+
+    return [
+        {"crop": str(labels[i]).strip(), "suitability": int(round(s))}
+        for i, s in zip(order.tolist(), suitability)
+    ]
+
+
+def detect_label_column(columns):
+    """Return the first column that looks like a crop label, or None."""
+    for c in columns:
+        if str(c).strip().lower() in LABEL_COLUMNS:
+            return c
+    return None
+
+
+class DatasetIndex:
+    """Min-max normalized view of the crop dataset, built once at load time.
+
+    ``matrix`` holds the float32 normalized features with rows grouped by
+    label code, so the best distance per crop is one ``np.minimum.reduceat``
+    over the distance vector.
+    """
+
+    def __init__(self, features, matrix, mins, ranges, codes, labels, maxs=None):
+        self.features = list(features)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.mins = np.asarray(mins, dtype=np.float64)
+        self.ranges = np.asarray(ranges, dtype=np.float64)
+        self.maxs = self.mins + self.ranges if maxs is None else np.asarray(maxs, dtype=np.float64)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.labels = np.asarray(labels)
+        # First row of every label group (codes are sorted)
+        self.starts = np.flatnonzero(np.r_[True, self.codes[1:] != self.codes[:-1]])
+        self.group_labels = self.labels[self.codes[self.starts]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def normalize(self, x):
+        """Scale raw feature values into the index's [0, 1] space."""
+        return ((np.asarray(x, dtype=np.float64) - self.mins) / self.ranges).astype(np.float32)
+
+    def query_vector(self, inputs):
+        """Build the raw feature vector for ``inputs``, or None if a value is missing/invalid."""
+        try:
+            return np.array([float(inputs[c]) for c in self.features], dtype=np.float64)
+        except Exception:
+            return None
+
+    def best_distances(self, x):
+        """Return the minimum normalized distance to each label group."""
+        diff = self.matrix - self.normalize(x)
+        dists = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        return np.minimum.reduceat(dists, self.starts)
+
+    def best_distances_batch(self, X, chunk_size=None):
+        """Return the minimum normalized distance to each label group for every row of ``X``.
+
+        Queries are processed ``chunk_size`` at a time, by default as many as
+        fit in BATCH_ELEMENTS.
+        """
+        Q = self.normalize(X)
+        out = np.empty((len(Q), len(self.starts)), dtype=np.float32)
+        if chunk_size is None:
+            chunk_size = max(1, BATCH_ELEMENTS // max(1, self.matrix.size))
+        for lo in range(0, len(Q), chunk_size):
+            diff = self.matrix[None, :, :] - Q[lo:lo + chunk_size, None, :]
+            dists = np.sqrt(np.einsum("qij,qij->qi", diff, diff))
+            out[lo:lo + chunk_size] = np.minimum.reduceat(dists, self.starts, axis=1)
+        return out
+
+    def _suggestions(self, best, k):
+        return rank_suggestions(best, self.group_labels, k)
+
+    def top_crops(self, inputs, k=5):
+        """Return top-k crop names ranked by similarity to inputs."""
+        if not len(self.codes):
+            return []
+        x = self.query_vector(inputs)
+        if x is None:
+            return []
+        return self._suggestions(self.best_distances(x), k)
+
+    def top_crops_batch(self, X, k=5):
+        """Rank crops for every row of the raw feature matrix ``X`` (columns in ``self.features`` order)."""
+        if not len(self.codes):
+            return [[] for _ in range(len(X))]
+        return [self._suggestions(best, k) for best in self.best_distances_batch(X)]
+
+    def append(self, values, labels):
+        """Return a new index with raw ``values`` rows (``self.features`` order) and their labels added.
+
+        ``self`` is left untouched so queries in flight keep a consistent view.
+        New rows are slotted into their label groups; the existing matrix is
+        only rescaled when the new rows widen a feature's min-max range.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.features))
+        labels = np.asarray(labels).astype(str)
+        keep = np.isfinite(values).all(axis=1)
+        values, labels = values[keep], labels[keep]
+        if not len(values):
+            return self
+
+        merged, old_codes, new_codes = merge_labels(self.labels, self.codes, labels)
+        if len(self.codes):
+            mins = np.minimum(self.mins, values.min(axis=0))
+            maxs = np.maximum(self.maxs, values.max(axis=0))
+        else:
+            mins, maxs = values.min(axis=0), values.max(axis=0)
+        ranges = maxs - mins
+        ranges[ranges == 0] = 1
+        matrix = self.matrix
+        if len(self.codes) and (not np.array_equal(mins, self.mins) or not np.array_equal(ranges, self.ranges)):
+            # Affine rescale of the normalized rows into the widened range
+            matrix = (matrix * (self.ranges / ranges) + (self.mins - mins) / ranges).astype(np.float32)
+
+        order = np.argsort(new_codes, kind="stable")
+        new_codes = new_codes[order]
+        rows = ((values[order] - mins) / ranges).astype(np.float32)
+        at = np.searchsorted(old_codes, new_codes, side="right")
+        return DatasetIndex(
+            self.features,
+            np.insert(matrix, at, rows, axis=0),
+            mins,
+            ranges,
+            np.insert(old_codes, at, new_codes),
+            merged,
+            maxs=maxs,
+        )
+
+
+def build_dataset_index(df):
+    """Build a DatasetIndex from a crop DataFrame, or None if it lacks the needed columns."""
+    if df is None:
+        return None
+
+    label_col = detect_label_column(df.columns)
+    if not label_col:
+        return None
+    feature_cols = [c for c in FEATURES if c in df.columns]
+    if not feature_cols:
+        return None
+
+    work = df[[label_col] + feature_cols].dropna()
+    values = work[feature_cols].to_numpy(dtype=np.float64)
+    labels, codes = np.unique(work[label_col].astype(str).to_numpy(), return_inverse=True)
+    return build_dataset_index_from_arrays(feature_cols, values, codes, labels)
+
+
+def build_dataset_index_from_arrays(features, values, codes, labels, mins=None, maxs=None):
+    """Build a DatasetIndex from raw feature rows and label codes into ``labels``.
+
+    ``mins``/``maxs`` override the per-feature range, e.g. when it was
+    tracked over more rows than ``values`` holds.
+    """
+    values = np.asarray(values)
+    if mins is None:
+        mins = values.min(axis=0) if len(values) else np.zeros(len(features))
+    if maxs is None:
+        maxs = values.max(axis=0) if len(values) else np.ones(len(features))
+    mins = np.asarray(mins, dtype=np.float64)
+    maxs = np.asarray(maxs, dtype=np.float64)
+    ranges = maxs - mins
+    ranges[ranges == 0] = 1
+
+    order = np.argsort(codes, kind="stable")
+    matrix = (values[order] - mins) / ranges
+    return DatasetIndex(features, matrix, mins, ranges, np.asarray(codes)[order], labels, maxs=maxs)
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised by BoundedExecutor.submit when every worker is busy and the queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Inference queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Thread pool for model inference with a hard cap on waiting work.
+
+    At most ``max_workers`` calls run at once and ``max_queue`` more wait;
+    anything beyond that is rejected with QueueFull instead of queueing
+    unboundedly, so callers can answer with backpressure. NumPy and
+    scikit-learn release the GIL in their inner loops, so threads overlap
+    the heavy parts of predict_proba and the distance scans.
+    """
+
+    def __init__(self, max_workers=4, max_queue=32, retry_after=1, thread_name_prefix="inference"):
+        self.max_workers = int(max_workers)
+        self.max_queue = int(max_queue)
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule ``fn(*args, **kwargs)`` and return its Future, or raise QueueFull."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull(self.retry_after)
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Submit ``fn`` and wait up to ``timeout`` seconds for its result."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
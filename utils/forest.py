@@ -0,0 +1,260 @@
+"""Array-backed export of tree-ensemble classifiers and a predictor that needs only NumPy.
+
+``export_forest`` flattens every tree of a fitted RandomForestClassifier,
+ExtraTreesClassifier or DecisionTreeClassifier into shared node arrays
+(feature, threshold, children) plus a table of per-leaf class
+probabilities, each saved as its own ``.npy`` file. ``ForestPredictor``
+opens them with ``np.load(mmap_mode="r")`` and walks all trees at once,
+one vectorized step per tree level, so a one-row ``predict_proba`` skips
+scikit-learn's per-call validation and joblib dispatch. Inputs are cast
+to float32 and per-tree probabilities summed in estimator order, exactly
+as scikit-learn does, so outputs match the original model bit for bit.
+Batches of thousands of rows remain faster through scikit-learn's
+compiled loop.
+
+Run from the repository root to convert a pickled model:
+
+    python -m utils.forest --model models/crop_model.pkl --out models/crop_forest
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+MANIFEST = "forest.json"
+FORMAT_VERSION = 1
+ARRAYS = ("feature", "threshold", "children", "missing_left", "leaf_index", "leaf_proba", "roots", "classes")
+# (row, tree) pairs walked together; bounds the per-call temporaries
+PAIRS_PER_CHUNK = 1 << 16
+# Levels between dropping pairs that have reached a leaf
+COMPACT_EVERY = 3
+
+
+def _save(out_dir, name, array):
+    np.save(os.path.join(out_dir, name + ".npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _leaf_proba(tree, n_classes):
+    values = np.asarray(tree.value[:, 0, :n_classes], dtype=np.float64)
+    sums = values.sum(axis=1, keepdims=True)
+    if np.allclose(sums[sums > 0], 1.0):
+        return values  # scikit-learn >= 1.4 stores class fractions
+    sums[sums == 0.0] = 1.0
+    return values / sums
+
+
+def is_exportable(model):
+    """True for single-output tree classifiers whose predict_proba is the mean of their trees'."""
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    if not isinstance(model, (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier)):
+        return False
+    return getattr(model, "n_outputs_", None) == 1 and hasattr(model, "classes_")
+
+
+def export_forest(model, out_dir):
+    """Write ``model`` to ``out_dir`` as flat node arrays; raises ValueError if it is not exportable."""
+    if not is_exportable(model):
+        raise ValueError(f"Cannot export {type(model).__name__}: expected a single-output tree classifier")
+    estimators = getattr(model, "estimators_", [model])
+    n_classes = len(model.classes_)
+
+    features, thresholds, children, missing_left, leaf_index, leaf_proba, roots = [], [], [], [], [], [], []
+    node_offset = leaf_offset = 0
+    max_depth = 0
+    # scikit-learn >= 1.3 routes NaN in every tree, whether or not it was fitted on any
+    missing_values = True
+    for estimator in estimators:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(n)
+        # Leaves point at themselves, so extra steps past a shallow tree's depth are no-ops
+        left = np.where(is_leaf, nodes, tree.children_left) + node_offset
+        right = np.where(is_leaf, nodes, tree.children_right) + node_offset
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        children.append(np.stack([left, right], axis=1))
+        missing = getattr(tree, "missing_go_to_left", None)
+        missing_values = missing_values and missing is not None
+        missing_left.append(np.zeros(n, dtype=bool) if missing is None else np.asarray(missing, dtype=bool) & ~is_leaf)
+        index = np.full(n, -1, dtype=np.int64)
+        index[is_leaf] = np.arange(is_leaf.sum()) + leaf_offset
+        leaf_index.append(index)
+        leaf_proba.append(_leaf_proba(tree, n_classes)[is_leaf])
+        roots.append(node_offset)
+        node_offset += n
+        leaf_offset += int(is_leaf.sum())
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    os.makedirs(out_dir, exist_ok=True)
+    n_features = int(model.n_features_in_)
+    index_dtype = np.int32 if node_offset < np.iinfo(np.int32).max else np.int64
+    _save(out_dir, "feature", np.concatenate(features).astype(np.int16 if n_features < 2 ** 15 else np.int32))
+    _save(out_dir, "threshold", np.concatenate(thresholds).astype(np.float64))
+    _save(out_dir, "children", np.concatenate(children).astype(index_dtype))
+    _save(out_dir, "missing_left", np.concatenate(missing_left))
+    _save(out_dir, "leaf_index", np.concatenate(leaf_index).astype(index_dtype))
+    _save(out_dir, "leaf_proba", np.concatenate(leaf_proba))
+    _save(out_dir, "roots", np.array(roots, dtype=index_dtype))
+    _save(out_dir, "classes", np.asarray(model.classes_).astype(str))
+
+    names = getattr(model, "feature_names_in_", None)
+    manifest = {
+        "version": FORMAT_VERSION,
+        "source": type(model).__name__,
+        "n_trees": len(estimators),
+        "n_nodes": node_offset,
+        "max_depth": max_depth,
+        "n_features": n_features,
+        "missing_values": missing_values,
+        "feature_names": None if names is None else [str(n) for n in names],
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def is_forest_dir(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def load_model(path):
+    """Load the model at ``path``: a ForestPredictor for an export directory, else the joblib pickle.
+
+    Models ``export_forest`` cannot convert are never exported, so they keep
+    being served from their pickle as before.
+    """
+    if os.path.isdir(path) and is_forest_dir(path):
+        return load_forest(path)
+    import joblib
+    return joblib.load(path)
+
+
+def load_forest(path):
+    """Open the ForestPredictor exported to ``path`` with its arrays memory-mapped."""
+    with open(os.path.join(path, MANIFEST)) as fh:
+        manifest = json.load(fh)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported forest format version {manifest.get('version')!r} in {path}")
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r", allow_pickle=False) for name in ARRAYS}
+    return ForestPredictor(manifest, **arrays)
+
+
+class ForestPredictor:
+    """predict_proba/predict over exported node arrays, a drop-in for the source classifier.
+
+    Exposes ``classes_``, ``n_features_in_`` and, when the model was fitted
+    on a DataFrame, ``feature_names_in_``; DataFrame inputs are reordered to
+    those names.
+    """
+
+    def __init__(self, manifest, feature, threshold, children, missing_left, leaf_index, leaf_proba, roots, classes):
+        self.manifest = manifest
+        self.max_depth = int(manifest["max_depth"])
+        self.n_features_in_ = int(manifest["n_features"])
+        names = manifest.get("feature_names")
+        self.feature_names_in_ = None if names is None else np.array(names, dtype=object)
+        self.classes_ = np.asarray(classes)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = threshold
+        self.children = np.asarray(children, dtype=np.intp).ravel()  # [left, right] per node
+        self.missing_left = missing_left
+        self.leaf_index = leaf_index
+        self.is_leaf = np.asarray(leaf_index) >= 0
+        self.leaf_proba = leaf_proba
+        self.roots = np.asarray(roots, dtype=np.intp)
+        # Exports without the flag predate it; NaN routing was inferred from the arrays
+        self.has_missing = bool(manifest.get("missing_values", np.any(missing_left)))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _as_matrix(self, X):
+        columns = getattr(X, "columns", None)
+        if columns is not None and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        # scikit-learn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}")
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity.")
+        if not self.has_missing and np.isnan(X).any():
+            raise ValueError("Input X contains NaN.")
+        return X
+
+    def _apply(self, X):
+        n_rows, n_trees = len(X), self.n_trees
+        leaves = np.tile(self.roots, n_rows)
+        active = np.arange(len(leaves))
+        nodes = leaves
+        offsets = np.repeat(np.arange(n_rows, dtype=np.intp) * X.shape[1], n_trees)
+        flat = X.ravel()
+        for depth in range(1, self.max_depth + 1):
+            x = flat[offsets + self.feature[nodes]]
+            go_right = ~(x <= self.threshold[nodes])
+            if self.has_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+            nodes = self.children[2 * nodes + go_right]
+            if depth % COMPACT_EVERY == 0:
+                leaves[active] = nodes
+                keep = ~self.is_leaf[nodes]
+                active, nodes, offsets = active[keep], nodes[keep], offsets[keep]
+                if not len(active):
+                    break
+        leaves[active] = nodes
+        return leaves.reshape(n_rows, n_trees)
+
+    def _chunks(self, X):
+        X = self._as_matrix(X)
+        step = max(1, PAIRS_PER_CHUNK // self.n_trees)
+        return [X[start:start + step] for start in range(0, max(len(X), 1), step)]
+
+    def apply(self, X):
+        """Return the global leaf node reached in every tree: shape (n_rows, n_trees)."""
+        return np.concatenate([self._apply(chunk) for chunk in self._chunks(X)])
+
+    def predict_proba(self, X):
+        # Summing over the tree axis adds trees one after another, in estimator order
+        parts = [self.leaf_proba[self.leaf_index[self._apply(chunk)]].sum(axis=1) for chunk in self._chunks(X)]
+        proba = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        if self.n_trees > 1:
+            proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.path.join(root, "models", "crop_model.pkl"))
+    parser.add_argument("--out", default=os.path.join(root, "models", "crop_forest"))
+    parser.add_argument("--data", default=os.path.join(root, "data", "crop_recommendation2_cleaned.csv"),
+                        help="readings used to check the export against the original model")
+    args = parser.parse_args()
+
+    import joblib
+    import pandas as pd
+    from utils.dataset_index import FEATURES
+    model = joblib.load(args.model)
+    if not is_exportable(model):
+        print(f"{type(model).__name__} cannot be exported; keep serving {args.model}")
+        return 1
+    manifest = export_forest(model, args.out)
+    X = pd.read_csv(args.data)[FEATURES]
+    X = X if getattr(model, "feature_names_in_", None) is not None else X.to_numpy()
+    same = np.array_equal(model.predict_proba(X), load_forest(args.out).predict_proba(X))
+    print(f"exported {manifest['n_trees']} trees ({manifest['n_nodes']} nodes, depth {manifest['max_depth']}) "
+          f"to {args.out}; predict_proba on {len(X)} rows {'matches' if same else 'DIFFERS from'} the original")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
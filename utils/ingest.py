@@ -0,0 +1,213 @@
+"""Chunked dataset ingestion with compact dtypes and bounded memory.
+
+CSV (and Parquet, when pyarrow is installed) files are read ``chunksize``
+rows at a time with float32 features and a categorical label, so a chunk
+never costs more than a few MB whatever the file size. Chunks accumulate
+in compact arrays until ``max_rows`` (DEFAULT_MAX_ROWS unless given) have
+been read; past that they feed a fixed-size uniform reservoir sample,
+bounding memory for files larger than RAM. ``max_rows=None`` (or 0) keeps
+every row.
+"""
+import numpy as np
+
+from utils.batch import BatchValidationError
+from utils.dataset_index import FEATURES, LABEL_COLUMNS, build_dataset_index_from_arrays, detect_label_column
+from utils.neighbors import build_neighbor_ranker_from_arrays
+
+FEATURE_DTYPE = np.float32
+# About 32 MB of float32 features and int32 label codes
+DEFAULT_MAX_ROWS = 1_000_000
+
+
+def _header_columns(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    import pandas as pd
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path, chunksize=50_000):
+    """Yield (feature columns, float32 values, label strings) per chunk of ``path``.
+
+    Rows with a missing label or feature are dropped, as the in-memory
+    builders do.
+    """
+    columns = _header_columns(path)
+    label_col = detect_label_column(columns)
+    if not label_col:
+        raise ValueError(f"{path} has no label column (expected one of {', '.join(LABEL_COLUMNS)})")
+    by_name = {str(c).strip().lower(): c for c in columns}
+    feature_cols = [by_name[f] for f in FEATURES if f in by_name]
+    if not feature_cols:
+        raise ValueError(f"{path} has none of the feature columns {', '.join(FEATURES)}")
+    features = [str(c).strip().lower() for c in feature_cols]
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunksize,
+                                                                              columns=[label_col] + feature_cols))
+    else:
+        import pandas as pd
+        dtypes = dict.fromkeys(feature_cols, FEATURE_DTYPE)
+        dtypes[label_col] = "category"
+        batches = pd.read_csv(path, usecols=[label_col] + feature_cols, dtype=dtypes, chunksize=chunksize)
+
+    for chunk in batches:
+        chunk = chunk.dropna()
+        if len(chunk):
+            labels = chunk[label_col].astype(str).to_numpy()
+            yield features, chunk[feature_cols].to_numpy(dtype=FEATURE_DTYPE), labels
+
+
+class StreamingDataset:
+    """Compact arrays accumulated from chunks: float32 features and int32 label codes.
+
+    Feature ranges cover every row seen, even when ``max_rows`` keeps
+    only a reservoir sample of them. The sample depends only on the rows,
+    their order and ``seed``; its arrays grow with the rows read, up to
+    ``max_rows``.
+    """
+
+    def __init__(self, features, max_rows=DEFAULT_MAX_ROWS, seed=0):
+        self.features = list(features)
+        self.max_rows = int(max_rows) if max_rows else None
+        self.labels = []
+        self._label_codes = {}
+        self._chunks = []
+        self._rng = np.random.default_rng(seed)
+        self.seen = 0
+        self.mins = np.full(len(self.features), np.inf)
+        self.maxs = np.full(len(self.features), -np.inf)
+        if self.max_rows:
+            self._values = np.empty((0, len(self.features)), dtype=FEATURE_DTYPE)
+            self._codes = np.empty(0, dtype=np.int32)
+
+    def _reserve(self, rows):
+        """Grow the sample arrays to hold ``rows`` rows, doubling up to ``max_rows``."""
+        if rows <= len(self._codes):
+            return
+        size = min(self.max_rows, max(rows, 2 * len(self._codes)))
+        values = np.empty((size, len(self.features)), dtype=FEATURE_DTYPE)
+        codes = np.empty(size, dtype=np.int32)
+        values[:self.seen] = self._values[:self.seen]
+        codes[:self.seen] = self._codes[:self.seen]
+        self._values, self._codes = values, codes
+
+    def _encode(self, labels):
+        uniques, inverse = np.unique(labels, return_inverse=True)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, label in enumerate(uniques.tolist()):
+            code = self._label_codes.get(label)
+            if code is None:
+                code = self._label_codes[label] = len(self.labels)
+                self.labels.append(label)
+            lookup[i] = code
+        return lookup[inverse]
+
+    def add(self, values, labels):
+        values = np.asarray(values, dtype=FEATURE_DTYPE)
+        codes = self._encode(labels)
+        self.mins = np.minimum(self.mins, values.min(axis=0))
+        self.maxs = np.maximum(self.maxs, values.max(axis=0))
+        if not self.max_rows:
+            self._chunks.append((values, codes))
+            self.seen += len(values)
+            return
+
+        # Reservoir sampling (algorithm R), vectorized over the chunk
+        fill = max(0, min(self.max_rows - self.seen, len(values)))
+        self._reserve(self.seen + fill)
+        self._values[self.seen:self.seen + fill] = values[:fill]
+        self._codes[self.seen:self.seen + fill] = codes[:fill]
+        rest = np.arange(fill, len(values))
+        if len(rest):
+            slots = (self._rng.random(len(rest)) * (self.seen + rest + 1)).astype(np.int64)
+            take = slots < self.max_rows
+            self._values[slots[take]] = values[rest[take]]
+            self._codes[slots[take]] = codes[rest[take]]
+        self.seen += len(values)
+
+    def arrays(self):
+        """Return (values, codes, sorted labels) with codes remapped to the sorted label order."""
+        if self.max_rows:
+            n = min(self.seen, self.max_rows)
+            values, codes = self._values[:n], self._codes[:n]
+        elif self._chunks:
+            values = np.concatenate([c[0] for c in self._chunks])
+            codes = np.concatenate([c[1] for c in self._chunks])
+            self._chunks = [(values, codes)]
+        else:
+            values = np.empty((0, len(self.features)), dtype=FEATURE_DTYPE)
+            codes = np.empty(0, dtype=np.int32)
+        labels = np.array(self.labels, dtype=str)
+        order = np.argsort(labels, kind="stable")
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        return values, remap[codes] if len(codes) else codes, labels[order]
+
+
+def stream_dataset(path, chunksize=50_000, max_rows=DEFAULT_MAX_ROWS):
+    """Read ``path`` chunk by chunk into a StreamingDataset."""
+    dataset = None
+    for features, values, labels in iter_chunks(path, chunksize):
+        if dataset is None:
+            dataset = StreamingDataset(features, max_rows=max_rows)
+        dataset.add(values, labels)
+    return dataset
+
+
+def build_streamed_indexes(path, nn_backend="brute", nn_leaf_size=40, chunksize=50_000, max_rows=DEFAULT_MAX_ROWS,
+                           nn_options=None):
+    """Return (DatasetIndex, NeighborRanker or None, rows kept) built from a chunked read of ``path``.
+
+    ``nn_backend=None`` skips the neighbour ranker.
+    """
+    dataset = stream_dataset(path, chunksize=chunksize, max_rows=max_rows)
+    if dataset is None:
+        return None, None, 0
+    values, codes, labels = dataset.arrays()
+    mins = dataset.mins if np.isfinite(dataset.mins).all() else None
+    maxs = dataset.maxs if np.isfinite(dataset.maxs).all() else None
+    index = build_dataset_index_from_arrays(dataset.features, values, codes, labels, mins=mins, maxs=maxs)
+    ranker = None
+    if nn_backend and dataset.features == FEATURES:
+        try:
+            ranker = build_neighbor_ranker_from_arrays(values, codes, labels, backend=nn_backend, leaf_size=nn_leaf_size,
+                                                       **(nn_options or {}))
+        except Exception as e:
+            print(f"Error building neighbour index: {e}")
+    return index, ranker, len(values)
+
+
+def observations_from_records(records):
+    """Validate observation dicts (FEATURES plus a label) into (float values, label strings).
+
+    Raises BatchValidationError listing every bad row.
+    """
+    errors, rows, labels = [], [], []
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            errors.append({"row": i, "error": "observation must be an object"})
+            continue
+        label_key = detect_label_column(r.keys())
+        label = str(r.get(label_key) or "").strip() if label_key else ""
+        if not label:
+            errors.append({"row": i, "error": f"missing field '{LABEL_COLUMNS[0]}'"})
+            continue
+        try:
+            row = [float(r[f]) for f in FEATURES]
+        except KeyError as e:
+            errors.append({"row": i, "error": f"missing field '{e.args[0]}'"})
+            continue
+        except (TypeError, ValueError):
+            errors.append({"row": i, "error": "feature values must be numbers"})
+            continue
+        if not np.isfinite(row).all():
+            errors.append({"row": i, "error": "feature values must be finite"})
+            continue
+        rows.append(row)
+        labels.append(label)
+    if errors:
+        raise BatchValidationError(errors)
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES)), np.array(labels, dtype=str)
@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.executor import QueueFull
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued")
+
+    def __init__(self, item, future, enqueued):
+        self.item = item
+        self.future = future
+        self.enqueued = enqueued
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one call of ``fn(items)``.
+
+    A dispatcher thread takes the first waiting item, keeps collecting
+    until ``max_batch`` items or ``max_wait`` seconds after that item
+    arrived, then calls ``fn`` with the whole group; ``fn`` must return one
+    result per item, in order. Each caller gets a Future for its own
+    result. Batches run on ``executor`` (anything with ``submit``) when one
+    is given, otherwise on the dispatcher thread. More than ``max_pending``
+    outstanding items raises QueueFull.
+    """
+
+    def __init__(self, fn, max_batch=64, max_wait=0.002, max_pending=1024, executor=None,
+                 retry_after=1, clock=time.perf_counter):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.max_pending = int(max_pending)
+        self.executor = executor
+        self.retry_after = retry_after
+        self.clock = clock
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.pending = 0
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.max_batch_seen = 0
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+        self.size_buckets = [0] * (len(BATCH_BUCKETS) + 1)
+
+    def submit(self, item):
+        """Queue ``item`` for the next batch and return a Future for its result."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(self.retry_after)
+            self.pending += 1
+            # Started on first use so a forking server starts one per worker
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="microbatch", daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put(_Pending(item, future, self.clock()))
+        return future
+
+    def run(self, item, timeout=None):
+        """Submit ``item`` and wait up to ``timeout`` seconds for its result."""
+        return self.submit(item).result(timeout)
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first.enqueued + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - self.clock()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # Window closed: still take whatever is already waiting
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        now = self.clock()
+        delays = [now - p.enqueued for p in batch]
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.delay_total += sum(delays)
+            self.delay_max = max(self.delay_max, max(delays))
+            self.size_buckets[next((i for i, b in enumerate(BATCH_BUCKETS) if len(batch) <= b), len(BATCH_BUCKETS))] += 1
+
+        if self.executor is None:
+            self._run(batch)
+            return
+        try:
+            self.executor.submit(self._run, batch)
+        except Exception as e:
+            self._fail(batch, e)
+
+    def _run(self, batch):
+        try:
+            results = self.fn([p.item for p in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self._finish(len(batch))
+        for p, result in zip(batch, results):
+            p.future.set_result(result)
+
+    def _fail(self, batch, error):
+        self._finish(len(batch))
+        for p in batch:
+            p.future.set_exception(error)
+
+    def _finish(self, count):
+        with self._lock:
+            self.pending -= count
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1e3,
+                "pending": self.pending,
+                "batches": self.batches,
+                "items": self.items,
+                "rejected": self.rejected,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "mean_queue_delay_ms": self.delay_total / self.items * 1e3 if self.items else 0.0,
+                "max_queue_delay_ms": self.delay_max * 1e3,
+                "batch_size_buckets": {
+                    **{f"le_{b}": n for b, n in zip(BATCH_BUCKETS, self.size_buckets)},
+                    "gt_{}".format(BATCH_BUCKETS[-1]): self.size_buckets[-1],
+                },
+            }
@@ -0,0 +1,298 @@
+import numpy as np
+
+from utils.dataset_index import FEATURES, detect_label_column, merge_labels
+
+EXACT_BACKENDS = ("brute", "kd_tree", "ball_tree")
+APPROXIMATE_BACKENDS = ("ivf_sq8",)
+NEIGHBOR_BACKENDS = EXACT_BACKENDS + APPROXIMATE_BACKENDS
+# Appended rows are scanned brute-force until they exceed this share of the tree
+TREE_REBUILD_FRACTION = 0.1
+
+
+def _float_matrix(matrix):
+    # float32 input (streamed datasets) is kept as is rather than doubled to float64
+    matrix = np.asarray(matrix)
+    dtype = matrix.dtype if matrix.dtype in (np.float32, np.float64) else np.float64
+    return np.ascontiguousarray(matrix, dtype=dtype)
+
+
+class BruteForceNeighbors:
+    """Exact k-nearest search by scanning every row.
+
+    Uses ``argpartition`` so only the k selected rows are sorted.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = _float_matrix(matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def extended(self, rows):
+        """Return a backend over this matrix plus ``rows``."""
+        return BruteForceNeighbors(np.concatenate([self.matrix, np.asarray(rows, dtype=self.matrix.dtype)]))
+
+    def query(self, q, k):
+        """Return (indices, distances) of the k nearest rows, nearest first."""
+        dists = np.linalg.norm(self.matrix - np.asarray(q, dtype=self.matrix.dtype), axis=1)
+        k = min(int(k), len(dists))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        if k < len(dists):
+            idx = np.argpartition(dists, k - 1)[:k]
+        else:
+            idx = np.arange(len(dists))
+        # Order by distance, then row number for ties
+        idx = idx[np.lexsort((idx, dists[idx]))]
+        return idx, dists[idx]
+
+
+class TreeNeighbors:
+    """Exact k-nearest search backed by a scikit-learn KD-tree or ball tree.
+
+    Rows appended after the tree was built (``matrix[base_rows:]``) are
+    scanned brute-force and merged into each answer until they outgrow
+    TREE_REBUILD_FRACTION of the tree, when ``extended`` rebuilds it.
+    """
+
+    def __init__(self, matrix, kind="kd_tree", leaf_size=40, tree=None, base_rows=None):
+        self.kind = kind
+        self.leaf_size = leaf_size
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        if tree is None:
+            from sklearn.neighbors import BallTree, KDTree
+
+            tree_cls = KDTree if kind == "kd_tree" else BallTree
+            tree = tree_cls(self.matrix, leaf_size=leaf_size)
+            base_rows = len(self.matrix)
+        self.tree = tree
+        self.base_rows = base_rows
+        self.delta = BruteForceNeighbors(self.matrix[base_rows:]) if base_rows < len(self.matrix) else None
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def extended(self, rows):
+        """Return a backend over this matrix plus ``rows``, reusing the tree while the tail is small."""
+        matrix = np.concatenate([self.matrix, np.asarray(rows, dtype=np.float64)])
+        if len(matrix) - self.base_rows > TREE_REBUILD_FRACTION * max(self.base_rows, 1):
+            return TreeNeighbors(matrix, kind=self.kind, leaf_size=self.leaf_size)
+        return TreeNeighbors(matrix, kind=self.kind, leaf_size=self.leaf_size, tree=self.tree, base_rows=self.base_rows)
+
+    def query(self, q, k):
+        """Return (indices, distances) of the k nearest rows, nearest first."""
+        k = min(int(k), len(self.matrix))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        q = np.asarray(q, dtype=np.float64)
+        dists, idx = self.tree.query(q.reshape(1, -1), k=min(k, self.base_rows))
+        idx, dists = idx[0], dists[0]
+        if self.delta is None:
+            return idx, dists
+        d_idx, d_dists = self.delta.query(q, k)
+        idx = np.concatenate([idx, d_idx + self.base_rows])
+        dists = np.concatenate([dists, d_dists])
+        order = np.lexsort((idx, dists))[:k]
+        return idx[order], dists[order]
+
+
+class IVFQuantizedNeighbors:
+    """Approximate k-nearest search: coarse k-means lists over 8-bit quantized rows.
+
+    Every feature is scalar-quantized to uint8 over its observed range (7
+    bytes per row instead of 56), and rows are grouped into ``n_lists``
+    inverted lists by their nearest k-means centroid. A query scans the
+    ``n_probe`` lists with the closest centroids, adding further lists
+    until at least ``k`` rows are in play, and ranks them by distance
+    between the query and the decoded rows. More lists make each scan
+    shorter; more probes raise recall.
+
+    With ``refine`` > 0 the best ``refine * k`` candidates are re-ranked
+    by exact distance to float32 copies of the rows (28 more bytes per
+    row), which makes the returned distances exact. Without it only the
+    codes, centroids and row ids are kept.
+    """
+
+    def __init__(self, matrix, n_lists=None, n_probe=8, refine=0, train_size=100_000, seed=0):
+        from sklearn.cluster import MiniBatchKMeans
+
+        matrix = np.asarray(matrix)
+        n = len(matrix)
+        self.n_probe = max(1, int(n_probe))
+        self.refine = max(0, int(refine))
+        if n_lists is None:
+            n_lists = int(round(np.sqrt(n)))
+        self.n_lists = max(1, min(int(n_lists), n))
+        # Rows per encoding chunk: keeps the rows x centroids distance block near 64 MB
+        self.chunk_size = max(256, (1 << 24) // self.n_lists)
+
+        self.lo = matrix.min(axis=0).astype(np.float64) if n else np.zeros(matrix.shape[1])
+        hi = matrix.max(axis=0).astype(np.float64) if n else np.ones(matrix.shape[1])
+        self.scale = (hi - self.lo) / 255.0
+        self.scale[self.scale == 0] = 1.0
+
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(n, size=min(n, train_size), replace=False)] if n > train_size else matrix
+        kmeans = MiniBatchKMeans(n_clusters=self.n_lists, random_state=seed, n_init=1,
+                                 batch_size=min(max(4096, 2 * self.n_lists), max(len(sample), 1)))
+        kmeans.fit(np.asarray(sample, dtype=np.float64))
+        self.centroids = kmeans.cluster_centers_.astype(np.float32)
+
+        codes, lists = self._encode(matrix)
+        order = np.argsort(lists, kind="stable")
+        self.codes = codes[order]
+        self.row_ids = order.astype(np.int64 if n > np.iinfo(np.int32).max else np.int32)
+        self.offsets = np.searchsorted(lists[order], np.arange(self.n_lists + 1))
+        self.vectors = np.asarray(matrix, dtype=np.float32)[order] if self.refine else None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        total = self.codes.nbytes + self.row_ids.nbytes + self.offsets.nbytes + self.centroids.nbytes
+        return total + (self.vectors.nbytes if self.vectors is not None else 0)
+
+    def _assign(self, rows):
+        rows = np.asarray(rows, dtype=np.float32)
+        c_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        return np.argmin(c_sq[None, :] - 2.0 * rows @ self.centroids.T, axis=1)
+
+    def _encode(self, matrix):
+        """Quantize and assign ``matrix`` in chunks so temporaries stay small."""
+        codes = np.empty(matrix.shape, dtype=np.uint8)
+        lists = np.empty(len(matrix), dtype=np.int32)
+        for lo in range(0, len(matrix), self.chunk_size):
+            block = np.asarray(matrix[lo:lo + self.chunk_size], dtype=np.float64)
+            codes[lo:lo + len(block)] = np.clip(np.rint((block - self.lo) / self.scale), 0, 255)
+            lists[lo:lo + len(block)] = self._assign(block)
+        return codes, lists
+
+    def extended(self, rows):
+        """Return a backend with ``rows`` quantized into their nearest lists (ranges and centroids stay fixed)."""
+        rows = np.asarray(rows)
+        codes, lists = self._encode(rows)
+        order = np.argsort(lists, kind="stable")
+        at = self.offsets[lists[order] + 1]
+        new_ids = (len(self.codes) + order).astype(self.row_ids.dtype)
+        clone = object.__new__(IVFQuantizedNeighbors)
+        clone.__dict__.update(self.__dict__)
+        clone.codes = np.insert(self.codes, at, codes[order], axis=0)
+        clone.row_ids = np.insert(self.row_ids, at, new_ids)
+        if self.vectors is not None:
+            clone.vectors = np.insert(self.vectors, at, rows[order].astype(np.float32), axis=0)
+        clone.offsets = self.offsets + np.searchsorted(np.sort(lists), np.arange(self.n_lists + 1))
+        return clone
+
+    def query(self, q, k, n_probe=None):
+        """Return (row indices, approximate distances) of about the k nearest rows, nearest first."""
+        k = min(int(k), len(self.codes))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        q = np.asarray(q, dtype=np.float64)
+        centroid_d = np.einsum("ij,ij->i", self.centroids - q, self.centroids - q)
+        probe_order = np.argsort(centroid_d)
+        sizes = np.diff(self.offsets)[probe_order]
+        # Probe n_probe lists, or more if they hold fewer than k rows
+        n_probe = max(n_probe or self.n_probe, int(np.searchsorted(np.cumsum(sizes), k)) + 1)
+        lists = probe_order[:n_probe]
+
+        spans = [(self.offsets[c], self.offsets[c + 1]) for c in lists]
+        positions = np.concatenate([np.arange(a, b) for a, b in spans])
+        codes = self.codes[positions]
+        ids = self.row_ids[positions]
+        # Distance to the decoded rows, computed in code space
+        diff = (codes.astype(np.float32) - ((q - self.lo) / self.scale).astype(np.float32)) * self.scale.astype(np.float32)
+        dists = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+        keep = min(k * self.refine if self.refine else k, len(dists))
+        sel = np.argpartition(dists, keep - 1)[:keep] if keep < len(dists) else np.arange(len(dists))
+        if self.refine:
+            exact = self.vectors[positions[sel]] - q.astype(np.float32)
+            dists = np.full(len(dists), np.inf, dtype=np.float32)
+            dists[sel] = np.sqrt(np.einsum("ij,ij->i", exact, exact))
+            k = min(k, len(sel))
+            sel = sel[np.argpartition(dists[sel], k - 1)[:k]] if k < len(sel) else sel
+        sel = sel[np.lexsort((ids[sel], dists[sel]))]
+        return ids[sel].astype(np.intp), dists[sel].astype(np.float64)
+
+
+def build_neighbor_backend(matrix, backend="brute", leaf_size=40, n_lists=None, n_probe=8, refine=0):
+    """Create the neighbour search backend named by ``backend``.
+
+    ``n_lists``/``n_probe``/``refine`` only apply to the approximate "ivf_sq8" backend.
+    """
+    if backend == "brute":
+        return BruteForceNeighbors(matrix)
+    if backend in ("kd_tree", "ball_tree"):
+        return TreeNeighbors(matrix, kind=backend, leaf_size=leaf_size)
+    if backend == "ivf_sq8":
+        return IVFQuantizedNeighbors(matrix, n_lists=n_lists, n_probe=n_probe, refine=refine)
+    raise ValueError(f"Unknown neighbour backend: {backend!r} (expected one of {', '.join(NEIGHBOR_BACKENDS)})")
+
+
+class NeighborRanker:
+    """Rank crop labels by their nearest raw-feature samples in the dataset."""
+
+    def __init__(self, backend, codes, labels, features=FEATURES):
+        self.backend = backend
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.labels = np.asarray(labels, dtype=object)
+        self.features = list(features)
+
+    def append(self, values, labels):
+        """Return a new ranker with raw ``values`` rows (``self.features`` order) and their labels added."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.features))
+        labels = np.asarray(labels)
+        keep = np.isfinite(values).all(axis=1)
+        values, labels = values[keep], labels[keep]
+        if not len(values):
+            return self
+        merged, old_codes, new_codes = merge_labels(self.labels.astype(str), self.codes, labels.astype(str))
+        return NeighborRanker(self.backend.extended(values), np.concatenate([old_codes, new_codes]),
+                              merged, self.features)
+
+    def top_candidates(self, inputs, top_n, nearest_k=200):
+        """Return top-N labels scored by frequency * mean inverse distance."""
+        try:
+            q = np.array([float(inputs[f]) for f in self.features], dtype=float)
+        except Exception:
+            return None
+        idx, dists = self.backend.query(q, nearest_k)
+        if not len(idx):
+            return []
+
+        codes = self.codes[idx]
+        n_labels = len(self.labels)
+        freq = np.bincount(codes, minlength=n_labels)
+        inv_sum = np.bincount(codes, weights=1.0 / (dists + 1e-6), minlength=n_labels)
+        present = np.flatnonzero(freq)
+        # Composite score: frequency * mean inverse distance
+        score = freq[present] * (inv_sum[present] / freq[present])
+        # Stable sort keeps label order for ties, as groupby + sort_values did
+        order = present[np.argsort(-score, kind="stable")]
+
+        total_freq = float(freq.sum()) or 1.0
+        return [
+            {"crop": self.labels[i], "confidence": round(100.0 * (freq[i] / total_freq), 1)}
+            for i in order[:max(1, top_n)]
+        ]
+
+
+def build_neighbor_ranker(df, backend="brute", leaf_size=40, **options):
+    """Build a NeighborRanker over the raw dataset features, or None if columns are missing."""
+    if df is None:
+        return None
+    label_col = detect_label_column(df.columns)
+    if not label_col or any(f not in df.columns for f in FEATURES):
+        return None
+
+    work = df[[label_col] + FEATURES].dropna()
+    labels, codes = np.unique(work[label_col].to_numpy(), return_inverse=True)
+    matrix = work[FEATURES].to_numpy(dtype=float)
+    return NeighborRanker(build_neighbor_backend(matrix, backend, leaf_size, **options), codes, labels)
+
+
+def build_neighbor_ranker_from_arrays(values, codes, labels, backend="brute", leaf_size=40, **options):
+    """Build a NeighborRanker from raw FEATURES rows and label codes into ``labels``."""
+    return NeighborRanker(build_neighbor_backend(values, backend, leaf_size, **options), codes, labels)
@@ -0,0 +1,282 @@
+"""Per-crop profiles: rank crops from a few summary vectors per label instead of every row.
+
+Each label in the dataset is summarized by its centroid, per-feature
+quantile envelopes (QUANTILES) and up to ``n_prototypes`` k-means
+prototypes. Every prototype keeps the number of rows it stands for and
+their mean squared deviation per feature. All of these are in raw
+feature units, so they survive the dataset's min-max range widening when
+observations are appended.
+
+``CropProfiles`` answers the two dataset fallbacks from the prototypes
+alone, in time proportional to the number of crops:
+
+* ``top_crops`` approximates DatasetIndex.top_crops (nearest row per crop
+  in min-max space). It uses each prototype's distance shrunk by its
+  spread, sqrt(max(d^2 - r^2, 0)).
+* ``top_candidates`` approximates NeighborRanker.top_candidates. It walks
+  prototypes nearest first, taking their row counts until ``nearest_k``
+  rows are covered, then scores frequency times mean inverse distance.
+
+Profiles are saved as ``.npy`` files plus a JSON manifest. The manifest
+records the size and mtime of the CSV they came from, so
+``cached_crop_profiles`` rebuilds them when the file changes. To build
+them ahead of time, run from the repository root:
+
+    python -m utils.profiles --out models/crop_profiles
+
+``python -m benchmarks.profiles`` reports agreement with the full scans.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from utils.dataset_index import rank_suggestions
+
+MANIFEST = "profiles.json"
+FORMAT_VERSION = 1
+QUANTILES = (0.05, 0.5, 0.95)
+ARRAYS = ("labels", "mins", "ranges", "centroids", "quantiles", "prototypes", "proto_codes", "proto_weights",
+          "proto_msd")
+
+
+def _kmeans(rows, n_clusters, sample_size, seed):
+    """Return (centers, row count per center, per-feature mean squared deviation per center)."""
+    n_clusters = min(n_clusters, len(rows))
+    if n_clusters <= 1:
+        center = rows.mean(axis=0, keepdims=True)
+        return center, np.array([len(rows)], dtype=np.int64), ((rows - center) ** 2).mean(axis=0, keepdims=True)
+    from sklearn.cluster import KMeans
+    rng = np.random.default_rng(seed)
+    sample = rows if len(rows) <= sample_size else rows[rng.choice(len(rows), sample_size, replace=False)]
+    centers = KMeans(n_clusters=n_clusters, n_init=1, random_state=seed).fit(sample).cluster_centers_
+
+    counts = np.zeros(n_clusters, dtype=np.int64)
+    sq_dev = np.zeros_like(centers)
+    norms = np.einsum("ij,ij->i", centers, centers)
+    for lo in range(0, len(rows), 65536):
+        chunk = rows[lo:lo + 65536]
+        assign = np.argmin(norms - 2.0 * chunk @ centers.T, axis=1)
+        counts += np.bincount(assign, minlength=n_clusters)
+        np.add.at(sq_dev, assign, (chunk - centers[assign]) ** 2)
+    keep = counts > 0
+    return centers[keep], counts[keep], sq_dev[keep] / counts[keep, None]
+
+
+def _summarize(index, group, n_prototypes, sample_size, seed):
+    """(centroid, quantiles, prototypes, weights, msd) in raw units for one label group of ``index``.
+
+    Clustering runs in the index's min-max space so no feature dominates by scale.
+    """
+    starts = list(index.starts) + [len(index.matrix)]
+    rows = index.matrix[starts[group]:starts[group + 1]].astype(np.float64)
+    centers, counts, msd = _kmeans(rows, n_prototypes, sample_size, seed)
+    raw = rows * index.ranges + index.mins
+    return (raw.mean(axis=0), np.quantile(raw, QUANTILES, axis=0), centers * index.ranges + index.mins, counts,
+            msd * index.ranges ** 2)
+
+
+def build_crop_profiles(index, n_prototypes=16, sample_size=20_000, seed=0):
+    """Summarize every label group of a DatasetIndex; None for an empty or missing index."""
+    if index is None or not len(index):
+        return None
+    parts = [_summarize(index, g, n_prototypes, sample_size, seed) for g in range(len(index.starts))]
+    return CropProfiles.from_groups(index.features, index.group_labels, index.mins, index.ranges, parts)
+
+
+class CropProfiles:
+    """Per-crop centroids, quantile envelopes and weighted prototypes (raw feature units)."""
+
+    def __init__(self, features, labels, mins, ranges, centroids, quantiles, prototypes, proto_codes, proto_weights,
+                 proto_msd, n_prototypes=16):
+        self.features = list(features)
+        self.labels = np.asarray(labels)
+        self.mins = np.asarray(mins, dtype=np.float64)
+        self.ranges = np.asarray(ranges, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.prototypes = np.asarray(prototypes, dtype=np.float64)
+        self.proto_codes = np.asarray(proto_codes, dtype=np.intp)
+        self.proto_weights = np.asarray(proto_weights, dtype=np.float64)
+        self.proto_msd = np.asarray(proto_msd, dtype=np.float64)
+        self.n_prototypes = n_prototypes
+        # Prototypes are grouped by code; the min-max view and squared spread serve top_crops
+        self.proto_starts = np.searchsorted(self.proto_codes, np.arange(len(self.labels)))
+        self.proto_norm = (self.prototypes - self.mins) / self.ranges
+        self.spread_norm_sq = (self.proto_msd / self.ranges ** 2).sum(axis=1)
+
+    @classmethod
+    def from_groups(cls, features, labels, mins, ranges, parts, n_prototypes=16):
+        """Assemble profiles from one ``_summarize`` tuple per label, in label order."""
+        codes = np.concatenate([np.full(len(p[2]), g) for g, p in enumerate(parts)])
+        return cls(features, labels, mins, ranges,
+                   np.stack([p[0] for p in parts]), np.stack([p[1] for p in parts]),
+                   np.concatenate([p[2] for p in parts]), codes,
+                   np.concatenate([p[3] for p in parts]), np.concatenate([p[4] for p in parts]),
+                   n_prototypes=n_prototypes)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _groups(self):
+        return [tuple(arr[self.proto_codes == g] for arr in (self.prototypes, self.proto_weights, self.proto_msd))
+                for g in range(len(self.labels))]
+
+    def query_vector(self, inputs):
+        try:
+            return np.array([float(inputs[c]) for c in self.features], dtype=np.float64)
+        except Exception:
+            return None
+
+    def best_distances(self, x):
+        """Estimated minimum min-max-normalized distance from raw ``x`` to each crop's rows."""
+        diff = self.proto_norm - (np.asarray(x, dtype=np.float64) - self.mins) / self.ranges
+        d_sq = np.einsum("ij,ij->i", diff, diff) - self.spread_norm_sq
+        return np.sqrt(np.maximum(np.minimum.reduceat(d_sq, self.proto_starts), 0.0))
+
+    def top_crops(self, inputs, k=5):
+        """Top-k crops by estimated nearest-row distance, shaped like DatasetIndex.top_crops."""
+        x = self.query_vector(inputs)
+        if x is None or not len(self.labels):
+            return []
+        return rank_suggestions(self.best_distances(x), self.labels, k)
+
+    def top_crops_batch(self, X, k=5):
+        """Rank crops for every row of the raw feature matrix ``X`` (columns in ``self.features`` order)."""
+        return [rank_suggestions(self.best_distances(x), self.labels, k) for x in np.asarray(X, dtype=np.float64)]
+
+    def top_candidates(self, inputs, top_n, nearest_k=200):
+        """Top-N crops by frequency * mean inverse distance over the ~``nearest_k`` closest rows.
+
+        Shaped like NeighborRanker.top_candidates; distances are raw-unit Euclidean.
+        """
+        x = self.query_vector(inputs)
+        if x is None or not len(self.labels):
+            return None
+        diff = self.prototypes - x
+        dists = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        order = np.argsort(dists, kind="stable")
+        weights = self.proto_weights[order]
+        before = np.cumsum(weights) - weights
+        take = np.clip(nearest_k - before, 0, weights)
+        used = take > 0
+        order, take = order[used], take[used]
+
+        n_labels = len(self.labels)
+        codes = self.proto_codes[order]
+        freq = np.bincount(codes, weights=take, minlength=n_labels)
+        inv_sum = np.bincount(codes, weights=take / (dists[order] + 1e-6), minlength=n_labels)
+        present = np.flatnonzero(freq)
+        score = inv_sum[present]
+        ranked = present[np.argsort(-score, kind="stable")]
+        total_freq = float(freq.sum()) or 1.0
+        return [
+            {"crop": self.labels[i], "confidence": round(100.0 * (freq[i] / total_freq), 1)}
+            for i in ranked[:max(1, top_n)].tolist()
+        ]
+
+    def updated(self, index, labels, sample_size=20_000, seed=0):
+        """Return profiles re-summarized from ``index`` for ``labels`` only; other crops are kept.
+
+        ``index`` is the DatasetIndex after an append; its ranges are adopted.
+        """
+        if index is None or not len(index):
+            return self
+        changed = {str(label) for label in labels}
+        old = {str(label): g for g, label in enumerate(self.labels)}
+        groups = self._groups()
+        parts = []
+        for g, label in enumerate(index.group_labels):
+            key = str(label)
+            if key in changed or key not in old:
+                parts.append(_summarize(index, g, self.n_prototypes, sample_size, seed))
+            else:
+                i = old[key]
+                parts.append((self.centroids[i], self.quantiles[i]) + groups[i])
+        return CropProfiles.from_groups(index.features, index.group_labels, index.mins, index.ranges, parts,
+                                        n_prototypes=self.n_prototypes)
+
+
+def source_fingerprint(path):
+    """Size and mtime of the dataset file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def save_profiles(profiles, out_dir, source=None):
+    """Write ``profiles`` to ``out_dir``, recording the fingerprint of the ``source`` CSV."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ARRAYS:
+        array = getattr(profiles, name)
+        if name == "labels":
+            array = array.astype(str)
+        np.save(os.path.join(out_dir, name + ".npy"), np.ascontiguousarray(array), allow_pickle=False)
+    manifest = {
+        "version": FORMAT_VERSION,
+        "features": profiles.features,
+        "n_prototypes": profiles.n_prototypes,
+        "quantiles": list(QUANTILES),
+        "source": None if source is None else source_fingerprint(source),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def load_profiles(path, source=None):
+    """Load profiles from ``path``; None if missing, outdated, or built from a different ``source`` file."""
+    try:
+        with open(os.path.join(path, MANIFEST)) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != FORMAT_VERSION or manifest.get("quantiles") != list(QUANTILES):
+        return None
+    if source is not None and manifest.get("source") != source_fingerprint(source):
+        return None
+    try:
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), allow_pickle=False) for name in ARRAYS}
+    except (OSError, ValueError):
+        return None
+    return CropProfiles(manifest["features"], n_prototypes=manifest["n_prototypes"], **arrays)
+
+
+def cached_crop_profiles(out_dir, index, source=None, n_prototypes=16):
+    """Profiles saved in ``out_dir`` if they match ``source``; otherwise rebuilt from ``index`` and saved."""
+    profiles = load_profiles(out_dir, source) if out_dir else None
+    if profiles is not None and profiles.n_prototypes == n_prototypes:
+        return profiles
+    profiles = build_crop_profiles(index, n_prototypes=n_prototypes)
+    if profiles is not None and out_dir:
+        try:
+            save_profiles(profiles, out_dir, source)
+        except OSError as e:
+            print(f"Error saving crop profiles: {e}")
+    return profiles
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=os.path.join(root, "data", "crop_recommendation2_cleaned.csv"))
+    parser.add_argument("--out", default=os.path.join(root, "models", "crop_profiles"))
+    parser.add_argument("--prototypes", type=int, default=16, help="k-means prototypes per crop")
+    args = parser.parse_args()
+
+    from utils.ingest import build_streamed_indexes
+    index, _, rows = build_streamed_indexes(args.data, nn_backend=None)
+    profiles = build_crop_profiles(index, n_prototypes=args.prototypes)
+    if profiles is None:
+        print(f"No labelled rows in {args.data}")
+        return 1
+    save_profiles(profiles, args.out, source=args.data)
+    print(f"profiled {len(profiles)} crops from {rows} rows ({len(profiles.prototypes)} prototypes) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+import cProfile
+import os
+import threading
+import time
+
+PROFILE_MODES = ("off", "header", "all")
+
+
+class RequestProfiler:
+    """Optional per-request cProfile hook.
+
+    ``mode`` is "off", "header" (profile requests that send ``header``) or
+    "all". Each profiled request is written to ``out_dir`` as a .prof file
+    that ``python -m pstats`` or snakeviz can open.
+    """
+
+    def __init__(self, mode="off", out_dir="profiles", header="X-Verdantia-Profile"):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode!r} (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.out_dir = out_dir
+        self.header = header
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def wants(self, headers):
+        if self.mode == "all":
+            return True
+        return self.mode == "header" and headers.get(self.header, "").strip().lower() in ("1", "true", "yes")
+
+    def start(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, name):
+        """Stop ``profile`` and dump it; returns the file path."""
+        profile.disable()
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        os.makedirs(self.out_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "request"
+        path = os.path.join(self.out_dir, f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{seq}.prof")
+        profile.dump_stats(path)
+        return path
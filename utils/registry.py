@@ -0,0 +1,237 @@
+"""Versioned model registry on a local (or shared) filesystem.
+
+Each published version is an immutable directory holding the model (a
+pickle or a ``python -m utils.forest`` export), optionally the dataset
+CSV it pairs with, and a ``meta.json``:
+
+    <root>/versions/v0001/model.pkl
+    <root>/versions/v0001/data.csv
+    <root>/versions/v0001/meta.json
+    <root>/active.json            {"version": "v0001", "previous": null, ...}
+
+Versions are copied into a temporary directory and renamed into place,
+and ``active.json`` is replaced atomically, so a reader never sees a
+half-written version or pointer. Every node pointing at the same root
+follows ``activate`` through ``RegistryWatcher``, without a restart.
+Run from the repository root:
+
+    python -m utils.registry --root models/registry publish --model models/crop_model.pkl --activate
+    python -m utils.registry --root models/registry activate v0001
+    python -m utils.registry --root models/registry list
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+ACTIVE = "active.json"
+META = "meta.json"
+VERSION_NAME = re.compile(r"^v(\d+)$")
+
+
+class RegistryError(Exception):
+    """Unknown version, or an artifact that cannot be published."""
+
+
+class ModelVersion:
+    """One published version: its name, artifact paths and metadata."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.version = meta["version"]
+        self.model_path = os.path.join(path, meta["model"])
+        self.data_path = os.path.join(path, meta["data"]) if meta.get("data") else None
+
+    def __repr__(self):
+        return f"ModelVersion({self.version!r})"
+
+
+def _write_json_atomic(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(payload, fh, indent=2)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ModelRegistry:
+    """Publish, list and activate model versions under ``root``."""
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+    def _next_number(self):
+        numbers = [int(m.group(1)) for m in map(VERSION_NAME.match, os.listdir(self.versions_dir)) if m]
+        return max(numbers, default=0) + 1
+
+    def publish(self, model_path, data_path=None, note=None, activate=False):
+        """Copy ``model_path`` (and ``data_path``) into a new version; returns its ModelVersion."""
+        if not os.path.exists(model_path):
+            raise RegistryError(f"Model not found: {model_path}")
+        if data_path is not None and not os.path.isfile(data_path):
+            raise RegistryError(f"Dataset not found: {data_path}")
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=".staging-")
+        try:
+            if os.path.isdir(model_path):
+                model_name = "model"
+                shutil.copytree(model_path, os.path.join(staging, model_name))
+            else:
+                model_name = "model" + (os.path.splitext(model_path)[1] or ".pkl")
+                shutil.copy2(model_path, os.path.join(staging, model_name))
+            data_name = None
+            if data_path is not None:
+                data_name = "data" + (os.path.splitext(data_path)[1] or ".csv")
+                shutil.copy2(data_path, os.path.join(staging, data_name))
+            meta = {"model": model_name, "data": data_name, "note": note, "created": time.time()}
+            # Another publisher may claim the same number first; renaming onto a
+            # non-empty version directory fails, so take the next one
+            for _ in range(100):
+                version = f"v{self._next_number():04d}"
+                meta["version"] = version
+                _write_json_atomic(os.path.join(staging, META), meta)
+                try:
+                    os.rename(staging, os.path.join(self.versions_dir, version))
+                    break
+                except OSError:
+                    continue
+            else:
+                raise RegistryError("Could not claim a version number")
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        entry = self.get(version)
+        if activate:
+            self.activate(version)
+        return entry
+
+    def get(self, version):
+        """The ModelVersion named ``version``; raises RegistryError if it does not exist."""
+        if not VERSION_NAME.match(str(version)):
+            raise RegistryError(f"Invalid version name: {version!r}")
+        path = os.path.join(self.versions_dir, version)
+        try:
+            with open(os.path.join(path, META)) as fh:
+                return ModelVersion(path, json.load(fh))
+        except (OSError, ValueError):
+            raise RegistryError(f"Unknown version: {version}") from None
+
+    def versions(self):
+        """All published versions, oldest first."""
+        names = sorted((n for n in os.listdir(self.versions_dir) if VERSION_NAME.match(n)),
+                       key=lambda n: int(VERSION_NAME.match(n).group(1)))
+        return [self.get(n) for n in names]
+
+    def active_version(self):
+        """Name of the active version, or None before the first activation."""
+        try:
+            with open(os.path.join(self.root, ACTIVE)) as fh:
+                return json.load(fh).get("version")
+        except (OSError, ValueError):
+            return None
+
+    def active(self):
+        version = self.active_version()
+        return None if version is None else self.get(version)
+
+    def activate(self, version):
+        """Point every node at ``version``; returns the previously active version name."""
+        self.get(version)
+        previous = self.active_version()
+        _write_json_atomic(os.path.join(self.root, ACTIVE),
+                           {"version": version, "previous": previous, "activated": time.time()})
+        return previous
+
+
+class RegistryWatcher:
+    """Poll the registry's active version every ``interval`` seconds and call ``on_change(version)``.
+
+    Runs in a daemon thread. Errors from ``on_change`` are printed and not
+    retried until the active version changes again.
+    """
+
+    def __init__(self, registry, on_change, interval=5.0, current=None):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self.current = current
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Run one poll now; returns True when a new version was handed to ``on_change``."""
+        version = self.registry.active_version()
+        if version is None or version == self.current:
+            return False
+        self.current = version
+        try:
+            self.on_change(version)
+            self.last_error = None
+        except Exception as e:
+            print(f"Error activating model version {version}: {e}")
+            self.last_error = str(e)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="registry-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=os.environ.get("VERDANTIA_REGISTRY_DIR")
+                        or os.path.join(root, "models", "registry"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="copy a model (and dataset) into a new version")
+    publish.add_argument("--model", required=True, help="crop_model.pkl or a utils.forest export directory")
+    publish.add_argument("--data", help="dataset CSV to serve with this model")
+    publish.add_argument("--note")
+    publish.add_argument("--activate", action="store_true")
+    activate = commands.add_parser("activate", help="make a version active on every node")
+    activate.add_argument("version")
+    commands.add_parser("list", help="list versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == "publish":
+            entry = registry.publish(args.model, args.data, note=args.note, activate=args.activate)
+            print(f"published {entry.version}{' (active)' if args.activate else ''}")
+        elif args.command == "activate":
+            previous = registry.activate(args.version)
+            print(f"active: {args.version} (was {previous})")
+        else:
+            active = registry.active_version()
+            for entry in registry.versions():
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.meta["created"]))
+                print(f"{'*' if entry.version == active else ' '} {entry.version}  {created}  "
+                      f"{entry.meta['model']:<10} {entry.meta.get('data') or '-':<10} {entry.meta.get('note') or ''}")
+    except RegistryError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
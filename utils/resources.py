@@ -0,0 +1,294 @@
+import threading
+import time
+
+import numpy as np
+
+from utils.dataset_index import FEATURES, build_dataset_index
+from utils.neighbors import build_neighbor_ranker
+
+LOAD_MODES = ("background", "lazy", "eager")
+_KEEP = object()
+
+
+class Resource:
+    """A value produced by ``loader``, loaded eagerly, lazily on first use or in a background thread.
+
+    Load failures are printed and leave the value as None so callers can
+    fall back, matching how the app has always treated a missing model.
+    """
+
+    def __init__(self, name, loader, on_load=None):
+        self.name = name
+        self.loader = loader
+        self.on_load = on_load
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._started = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            value, error = self.loader(), None
+        except Exception as e:
+            print(f"Error loading {self.name}: {e}")
+            value, error = None, str(e)
+        self.set(value, error=error, load_seconds=time.perf_counter() - start)
+
+    def load(self):
+        """Load synchronously unless a load has already started."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._load()
+
+    def start_background(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True).start()
+
+    def get(self, timeout=None):
+        """Return the value, loading it now if nothing has started it yet.
+
+        Waits up to ``timeout`` seconds for a load in progress and returns None
+        if it has not finished.
+        """
+        if not self._started:
+            self.load()
+        self._done.wait(timeout)
+        return self.value
+
+    def set(self, value, error=None, load_seconds=None, notify=True):
+        """Swap in a new value; readers see either the old or the new one.
+
+        ``notify=False`` skips ``on_load``, for callers that change several
+        resources and announce them together.
+        """
+        self.value = value
+        self.error = error
+        self.load_seconds = load_seconds
+        self._started = True
+        try:
+            # Before waking waiters, so they see whatever on_load publishes
+            if notify and self.on_load is not None:
+                self.on_load()
+        finally:
+            self._done.set()
+
+    def reload(self):
+        """Load a fresh value synchronously and swap it in."""
+        self._started = True
+        self._load()
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "loaded": self.value is not None,
+            "error": self.error,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 4),
+        }
+
+
+class DatasetResources:
+    """Everything derived from one read of the dataset CSV.
+
+    The DataFrame itself is not kept: both ranking paths only need the
+    arrays inside the index and the neighbour ranker. ``profiles`` holds
+    optional per-crop CropProfiles summarizing the index.
+    """
+
+    profiles = None
+
+    def __init__(self, df, nn_backend="brute", nn_leaf_size=40, nn_options=None):
+        self.rows = 0 if df is None else len(df)
+        # Normalized feature matrix for the fallback ranking
+        self.index = build_dataset_index(df)
+        try:
+            self.neighbors = build_neighbor_ranker(df, backend=nn_backend, leaf_size=nn_leaf_size, **(nn_options or {}))
+        except Exception as e:
+            print(f"Error building neighbour index: {e}")
+            self.neighbors = None
+
+    @classmethod
+    def from_parts(cls, index, neighbors, rows, profiles=None):
+        """Wrap indexes built elsewhere, e.g. opened from a shared export."""
+        self = cls.__new__(cls)
+        self.rows = rows
+        self.index = index
+        self.neighbors = neighbors
+        self.profiles = profiles
+        return self
+
+    def append(self, values, labels):
+        """Return new resources with raw FEATURES ``values`` rows and their labels added to both indexes.
+
+        Profiles, if any, are re-summarized for the appended labels only.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(FEATURES))
+        index = self.index
+        if index is not None:
+            index = index.append(values[:, [FEATURES.index(f) for f in index.features]], labels)
+        neighbors = self.neighbors
+        if neighbors is not None:
+            neighbors = neighbors.append(values, labels)
+        profiles = self.profiles
+        if profiles is not None:
+            profiles = profiles.updated(index, labels)
+        return DatasetResources.from_parts(index, neighbors, self.rows + len(values), profiles=profiles)
+
+
+class Snapshot:
+    """The model, dataset and registry version served together, treat as immutable.
+
+    ``generation`` goes up with every published change, so results computed
+    from one snapshot can be told apart from those of the next.
+    """
+
+    __slots__ = ("model", "dataset", "version", "generation")
+
+    def __init__(self, model, dataset, version, generation):
+        self.model = model
+        self.dataset = dataset
+        self.version = version
+        self.generation = generation
+
+    @property
+    def index(self):
+        return None if self.dataset is None else self.dataset.index
+
+    @property
+    def neighbors(self):
+        return None if self.dataset is None else self.dataset.neighbors
+
+    @property
+    def profiles(self):
+        return None if self.dataset is None else self.dataset.profiles
+
+
+class ResourceManager:
+    """Owns the crop model and the dataset-derived indexes for the app.
+
+    ``mode`` is "background" (load both in threads at start), "lazy" (load
+    on first use) or "eager" (load before start() returns). Every (re)load,
+    append or swap publishes a new Snapshot as ``current`` with one
+    reference assignment, then runs ``on_change`` once, e.g. to invalidate
+    result caches. ``version`` names the model registry version being
+    served, if any.
+    """
+
+    def __init__(self, model_loader, dataset_loader, mode="background", wait_timeout=None, on_change=None,
+                 version=None):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode: {mode!r} (expected one of {', '.join(LOAD_MODES)})")
+        self.mode = mode
+        self.wait_timeout = wait_timeout
+        self.on_change = on_change
+        self.current = Snapshot(None, None, version, 0)
+        self.model = Resource("model", model_loader, on_load=self._publish)
+        self.dataset = Resource("dataset", dataset_loader, on_load=self._publish)
+        self._append_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, version=_KEEP):
+        """Serve the resources' current values as a new Snapshot, then run ``on_change``."""
+        with self._publish_lock:
+            current = self.current
+            self.current = Snapshot(self.model.value, self.dataset.value,
+                                    current.version if version is _KEEP else version, current.generation + 1)
+        if self.on_change is not None:
+            self.on_change()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def start(self):
+        for resource in (self.dataset, self.model):
+            if self.mode == "eager":
+                resource.load()
+            elif self.mode == "background":
+                resource.start_background()
+
+    @property
+    def ready(self):
+        return self.model.ready and self.dataset.ready
+
+    def snapshot(self):
+        """The Snapshot to serve one request from, loading (or waiting for) the resources as needed.
+
+        Take it once per request: separate get_model()/get_dataset() calls
+        can straddle a swap and mix two versions. Waits at most
+        ``wait_timeout`` seconds in all; whatever is still loading then is
+        served as None.
+        """
+        if self.wait_timeout is None:
+            self.model.get()
+            self.dataset.get()
+        else:
+            deadline = time.monotonic() + self.wait_timeout
+            self.model.get(self.wait_timeout)
+            self.dataset.get(max(0.0, deadline - time.monotonic()))
+        return self.current
+
+    def get_model(self):
+        return self.snapshot().model
+
+    def get_dataset(self):
+        return self.snapshot().dataset
+
+    def get_dataset_index(self):
+        return self.snapshot().index
+
+    def get_neighbors(self):
+        return self.snapshot().neighbors
+
+    def get_profiles(self):
+        return self.snapshot().profiles
+
+    def append_observations(self, values, labels):
+        """Add observed rows to the live dataset indexes and swap them in atomically.
+
+        Requests keep reading the old indexes until the new ones are
+        complete; appends are serialized so none is lost. Returns the new
+        row count.
+        """
+        with self._append_lock:
+            current = self.get_dataset()
+            if current is None:
+                raise RuntimeError("Dataset is not loaded")
+            updated = current.append(values, labels)
+            self.dataset.set(updated, load_seconds=self.dataset.load_seconds)
+            return updated.rows
+
+    def swap(self, model, dataset, version=None, load_seconds=None):
+        """Serve a fully loaded ``model`` and ``dataset`` from now on, e.g. a new registry version.
+
+        Both are built by the caller off the request path and published as
+        one Snapshot, so requests in flight finish on the snapshot they
+        already hold, none see one half swapped, and none wait or fail.
+        ``on_change`` runs once. Observations appended to the old dataset
+        are not carried over.
+        """
+        with self._append_lock:
+            self.dataset.set(dataset, load_seconds=load_seconds, notify=False)
+            self.model.set(model, load_seconds=load_seconds, notify=False)
+            self._publish(version)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "version": self.version,
+            "generation": self.current.generation,
+            "model": self.model.status(),
+            "dataset": self.dataset.status(),
+        }
@@ -0,0 +1,279 @@
+import ast
+import operator
+
+import numpy as np
+
+_OP_SYMBOLS = {
+    operator.eq: "==", operator.ne: "!=",
+    operator.lt: "<", operator.le: "<=",
+    operator.gt: ">", operator.ge: ">=",
+}
+
+
+def _row_ref(field):
+    return f"row[{field!r}]"
+
+
+def _literal(value):
+    """Source for ``value`` as a literal (compiled to a constant, like hand-written code), or None."""
+    if isinstance(value, list):
+        value = tuple(value)
+    if isinstance(value, tuple):
+        parts = [_literal(v) for v in value]
+        if any(p is None for p in parts):
+            return None
+        return "(" + "".join(p + ", " for p in parts) + ")"
+    if value is None or type(value) in (bool, int, float, str):
+        text = repr(value)
+        try:
+            return text if ast.literal_eval(text) == value else None
+        except (ValueError, SyntaxError):
+            return None
+    return None
+
+
+def _bind(constants, value):
+    literal = _literal(value)
+    if literal is not None:
+        return literal
+    name = f"_c{len(constants)}"
+    constants[name] = value
+    return name
+
+
+class Condition:
+    """A predicate over one reading (dict) or a column batch (dict of arrays).
+
+    Conditions combine with ``&`` and ``|``; compiled for a single reading they
+    keep Python's short-circuit ``and``/``or`` order.
+    """
+
+    def mask(self, columns):
+        raise NotImplementedError
+
+    def source(self, constants, ref=_row_ref):
+        """Return a Python expression over ``row``; values are bound into ``constants``.
+
+        ``ref`` maps a field name to the expression reading it.
+        """
+        raise NotImplementedError
+
+    def fields(self):
+        """Return the set of input fields the condition reads."""
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+
+class Compare(Condition):
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def mask(self, columns):
+        return np.asarray(self.op(np.asarray(columns[self.field]), self.value), dtype=bool)
+
+    def source(self, constants, ref=_row_ref):
+        return f"({ref(self.field)} {_OP_SYMBOLS[self.op]} {_bind(constants, self.value)})"
+
+    def fields(self):
+        return {self.field}
+
+    def __repr__(self):
+        return f"Compare({self.field!r}, {self.op.__name__}, {self.value!r})"
+
+
+class IsIn(Condition):
+    def __init__(self, field, values):
+        self.field = field
+        self.values = list(values)
+
+    def mask(self, columns):
+        return np.isin(np.asarray(columns[self.field]), self.values)
+
+    def source(self, constants, ref=_row_ref):
+        return f"({ref(self.field)} in {_bind(constants, self.values)})"
+
+    def fields(self):
+        return {self.field}
+
+    def __repr__(self):
+        return f"IsIn({self.field!r}, {self.values!r})"
+
+
+class All(Condition):
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def mask(self, columns):
+        out = self.conditions[0].mask(columns)
+        for c in self.conditions[1:]:
+            out = out & c.mask(columns)
+        return out
+
+    def source(self, constants, ref=_row_ref):
+        return "(" + " and ".join(c.source(constants, ref) for c in self.conditions) + ")"
+
+    def fields(self):
+        return set().union(*(c.fields() for c in self.conditions))
+
+
+class Any(Condition):
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def mask(self, columns):
+        out = self.conditions[0].mask(columns)
+        for c in self.conditions[1:]:
+            out = out | c.mask(columns)
+        return out
+
+    def source(self, constants, ref=_row_ref):
+        return "(" + " or ".join(c.source(constants, ref) for c in self.conditions) + ")"
+
+    def fields(self):
+        return set().union(*(c.fields() for c in self.conditions))
+
+
+class Field:
+    """Builds conditions on one input field, e.g. ``Field("rainfall") > 200``."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, value):
+        return Compare(self.name, operator.eq, value)
+
+    def __ne__(self, value):
+        return Compare(self.name, operator.ne, value)
+
+    def __lt__(self, value):
+        return Compare(self.name, operator.lt, value)
+
+    def __le__(self, value):
+        return Compare(self.name, operator.le, value)
+
+    def __gt__(self, value):
+        return Compare(self.name, operator.gt, value)
+
+    def __ge__(self, value):
+        return Compare(self.name, operator.ge, value)
+
+    def isin(self, values):
+        return IsIn(self.name, values)
+
+    __hash__ = None
+
+
+class Rule:
+    """A condition, its priority (lower runs first) and the outputs it yields."""
+
+    def __init__(self, priority, when, outputs):
+        self.priority = priority
+        self.when = when
+        self.outputs = tuple(outputs)
+
+    def __repr__(self):
+        return f"Rule({self.priority!r}, {self.when!r}, {self.outputs!r})"
+
+
+class RuleSet:
+    """Ordered first-match rules compiled for single readings and column batches.
+
+    Single readings run through a function generated from the rules, the
+    same if-chain as hand-written rules and as fast; ``compile_function``
+    builds one taking the fields as positional arguments. ``outcomes`` holds every rule's
+    outputs in priority order followed by the default, so a batch result is
+    just an integer code per row. ``evaluate_incremental`` re-tests only the
+    rules reading a changed field.
+    """
+
+    def __init__(self, rules, default):
+        self.rules = sorted(rules, key=lambda r: r.priority)
+        self.default = tuple(default)
+        self.outcomes = [r.outputs for r in self.rules] + [self.default]
+        self.rule_fields = [frozenset(r.when.fields()) for r in self.rules]
+        self.fields = frozenset().union(*self.rule_fields)
+        self.evaluate = self._compile()
+        self.tests = self._compile_tests()
+
+    def _compile(self, params=None):
+        constants = {}
+        if params is None:
+            signature, ref = "row", _row_ref
+        else:
+            missing = self.fields - set(params)
+            if missing:
+                raise ValueError(f"Rules read fields not in the parameters: {', '.join(sorted(missing))}")
+            signature, ref = ", ".join(params), str
+        lines = [f"def evaluate({signature}):"]
+        for rule in self.rules:
+            lines.append(f"    if {rule.when.source(constants, ref)}:")
+            lines.append(f"        return {_bind(constants, rule.outputs)}")
+        lines.append(f"    return {_bind(constants, self.default)}")
+        namespace = dict(constants)
+        exec(compile("\n".join(lines), "<ruleset>", "exec"), namespace)
+        evaluate = namespace["evaluate"]
+        evaluate.__doc__ = "Return the outputs of the first matching rule for one reading."
+        return evaluate
+
+    def compile_function(self, *params):
+        """Return the first-match function taking the fields ``params`` positionally, e.g. ``f(soil_type, rainfall)``."""
+        return self._compile(params)
+
+    def _compile_tests(self):
+        constants = {}
+        lines = []
+        for i, rule in enumerate(self.rules):
+            lines.append(f"def test_{i}(row):")
+            lines.append(f"    return {rule.when.source(constants)}")
+        namespace = dict(constants)
+        exec(compile("\n".join(lines), "<ruleset-tests>", "exec"), namespace)
+        return [namespace[f"test_{i}"] for i in range(len(self.rules))]
+
+    def evaluate_incremental(self, row, hits=None, changed=None):
+        """First-match evaluation reusing a previous call's per-rule results.
+
+        ``hits`` is the list returned last time (None tests from scratch) and
+        ``changed`` the fields that differ since; only rules reading one of
+        them are re-tested. Returns (outputs, hits, indices of re-tested rules).
+        """
+        hits = [None] * len(self.rules) if hits is None else list(hits)
+        changed = frozenset(changed or ())
+        for i, fields in enumerate(self.rule_fields):
+            if hits[i] is not None and fields & changed:
+                hits[i] = None
+        tested = []
+        for i, test in enumerate(self.tests):
+            if hits[i] is None:
+                hits[i] = bool(test(row))
+                tested.append(i)
+            if hits[i]:
+                return self.outcomes[i], hits, tested
+        return self.default, hits, tested
+
+    def match_batch(self, columns):
+        """Return, per row, the index into ``outcomes`` of the first matching rule.
+
+        ``columns`` maps field names to equal-length arrays.
+        """
+        n = len(next(iter(columns.values()))) if columns else 0
+        codes = np.full(n, len(self.rules), dtype=np.int32)
+        unmatched = np.ones(n, dtype=bool)
+        for i, rule in enumerate(self.rules):
+            hit = unmatched & rule.when.mask(columns)
+            codes[hit] = i
+            unmatched &= ~hit
+            if not unmatched.any():
+                break
+        return codes
+
+    def evaluate_batch(self, columns):
+        """Return the outputs tuple for every row of a column batch."""
+        outcomes = self.outcomes
+        return [outcomes[c] for c in self.match_batch(columns).tolist()]
@@ -1,165 +1,173 @@
-def soil_rules(soil_type, rainfall):
-    if soil_type == "Clay" and rainfall > 150:
-        return "Waterlogging Risk", "Clay soil retains water. Improve drainage with compost or sand."
-
-    if soil_type == "Sandy" and rainfall < 50:
-        return "Underwatered", "Sandy soil drains quickly. Increase watering frequency."
-
-    return None, None
-
-def pest_disease_rules(temperature, humidity):
-    if humidity > 85 and temperature > 30:
-        return "Pest Risk", "High heat and humidity favor pests. Inspect leaves and apply organic pesticides."
-
-    return None, None
-
-def nutrient_rules(n, p, k):
-    if n < -0.5 or p < -0.5 or k < -0.5:
-        return "Nutrient Deficiency", "Soil nutrients are low. Apply balanced organic fertilizer."
-
-    if n > 1.5:
-        return "Excess Nitrogen", "Too much nitrogen can harm plants. Reduce fertilizer application."
-
-    return None, None
-
-def vegetable_rules(crop):
-    if crop in ["lettuce", "spinach", "pechay"]:
-        return "High Water Demand", "Leafy vegetables need consistent moisture. Water regularly."
-
-    if crop in ["tomato", "eggplant", "pepper"]:
-        return "Pest Sensitive", "Check underside of leaves for pests like aphids."
-
-    return None, None
-
-def climate_rules(climate, soil_type):
-    if climate == "Tropical Wet" and soil_type == "Clay":
-        return "Flood Risk", "Frequent rain may cause root rot. Elevate beds or improve drainage."
-
-    if climate == "Urban Heat Zone":
-        return "Heat Stress", "Provide shade and water early morning or late afternoon."
-
-    return None, None
-
-def apply_rules(inputs):
-
+from utils.rule_engine import Field, Rule, RuleSet
+
+# Each rule set is first-match: rules are tried in priority order (lower first)
+# and the default applies when none match. The same data drives single-reading
+# checks and whole column batches (``RuleSet.evaluate_batch``).
+
+SOIL_RULES = RuleSet([
+    Rule(1, (Field("soil_type") == "Clay") & (Field("rainfall") > 150),
+         ("Waterlogging Risk", "Clay soil retains water. Improve drainage with compost or sand.")),
+    Rule(2, (Field("soil_type") == "Sandy") & (Field("rainfall") < 50),
+         ("Underwatered", "Sandy soil drains quickly. Increase watering frequency.")),
+], default=(None, None))
+
+PEST_DISEASE_RULES = RuleSet([
+    Rule(1, (Field("humidity") > 85) & (Field("temperature") > 30),
+         ("Pest Risk", "High heat and humidity favor pests. Inspect leaves and apply organic pesticides.")),
+], default=(None, None))
+
+NUTRIENT_RULES = RuleSet([
+    Rule(1, (Field("n") < -0.5) | (Field("p") < -0.5) | (Field("k") < -0.5),
+         ("Nutrient Deficiency", "Soil nutrients are low. Apply balanced organic fertilizer.")),
+    Rule(2, Field("n") > 1.5,
+         ("Excess Nitrogen", "Too much nitrogen can harm plants. Reduce fertilizer application.")),
+], default=(None, None))
+
+VEGETABLE_RULES = RuleSet([
+    Rule(1, Field("crop").isin(["lettuce", "spinach", "pechay"]),
+         ("High Water Demand", "Leafy vegetables need consistent moisture. Water regularly.")),
+    Rule(2, Field("crop").isin(["tomato", "eggplant", "pepper"]),
+         ("Pest Sensitive", "Check underside of leaves for pests like aphids.")),
+], default=(None, None))
+
+CLIMATE_RULES = RuleSet([
+    Rule(1, (Field("climate") == "Tropical Wet") & (Field("soil_type") == "Clay"),
+         ("Flood Risk", "Frequent rain may cause root rot. Elevate beds or improve drainage.")),
+    Rule(2, Field("climate") == "Urban Heat Zone",
+         ("Heat Stress", "Provide shade and water early morning or late afternoon.")),
+], default=(None, None))
+
+DIAGNOSIS_RULES = RuleSet([
     # 1. Climate + Soil (highest priority)
-    if inputs["climate"] == "Tropical Wet" and inputs["soil_type"] == "Clay":
-        return (
-            "Flood / Waterlogging Risk",
-            "High rainfall combined with clay soil causes poor drainage.",
-            "Improve drainage using compost or sand and reduce watering."
-        )
-
+    Rule(1, (Field("climate") == "Tropical Wet") & (Field("soil_type") == "Clay"), (
+        "Flood / Waterlogging Risk",
+        "High rainfall combined with clay soil causes poor drainage.",
+        "Improve drainage using compost or sand and reduce watering."
+    )),
     # 2. Overwatering
-    if inputs["rainfall"] > 200:
-        return (
-            "Overwatered",
-            "Excessive rainfall increases soil moisture beyond safe levels.",
-            "Reduce watering and ensure proper drainage."
-        )
-
+    Rule(2, Field("rainfall") > 200, (
+        "Overwatered",
+        "Excessive rainfall increases soil moisture beyond safe levels.",
+        "Reduce watering and ensure proper drainage."
+    )),
     # 3. Underwatering
-    if inputs["rainfall"] < 40:
-        return (
-            "Underwatered",
-            "Low rainfall indicates insufficient water supply.",
-            "Increase watering frequency and apply mulch."
-        )
-
+    Rule(3, Field("rainfall") < 40, (
+        "Underwatered",
+        "Low rainfall indicates insufficient water supply.",
+        "Increase watering frequency and apply mulch."
+    )),
     # 4. Pest risk
-    if inputs["humidity"] > 85 and inputs["temperature"] > 30:
-        return (
-            "Pest Risk",
-            "Warm and humid conditions favor pests and plant diseases.",
-            "Inspect leaves regularly and use organic pest control."
-        )
-
+    Rule(4, (Field("humidity") > 85) & (Field("temperature") > 30), (
+        "Pest Risk",
+        "Warm and humid conditions favor pests and plant diseases.",
+        "Inspect leaves regularly and use organic pest control."
+    )),
     # 5. Nutrient deficiency
-    if inputs["n"] < -0.5 or inputs["p"] < -0.5 or inputs["k"] < -0.5:
-        return (
-            "Nutrient Deficiency",
-            "Soil nutrient levels are below the recommended range.",
-            "Apply balanced organic fertilizer."
-        )
-
-    return (
-        "Healthy",
-        "Environmental conditions are within acceptable ranges.",
-        "Maintain current care and monitor regularly."
-    )
-
-
-def generate_growing_tips(inputs: dict, crop: str | None = None) -> list[str]:
-    """Generate user-friendly growing tips based on inputs and optional crop.
-    Always returns at least a few actionable tips so the UI never looks empty.
+    Rule(5, (Field("n") < -0.5) | (Field("p") < -0.5) | (Field("k") < -0.5), (
+        "Nutrient Deficiency",
+        "Soil nutrient levels are below the recommended range.",
+        "Apply balanced organic fertilizer."
+    )),
+], default=(
+    "Healthy",
+    "Environmental conditions are within acceptable ranges.",
+    "Maintain current care and monitor regularly."
+))
+
+
+# Scalar entry points are the compiled if-chains themselves: a wrapper building a
+# dict per call would cost more than evaluating the rules
+soil_rules = SOIL_RULES.compile_function("soil_type", "rainfall")
+pest_disease_rules = PEST_DISEASE_RULES.compile_function("temperature", "humidity")
+nutrient_rules = NUTRIENT_RULES.compile_function("n", "p", "k")
+vegetable_rules = VEGETABLE_RULES.compile_function("crop")
+climate_rules = CLIMATE_RULES.compile_function("climate", "soil_type")
+apply_rules = DIAGNOSIS_RULES.evaluate
+
+def apply_rules_batch(columns):
+    """Diagnose a column batch ({"climate": [...], "rainfall": [...], ...}) in one pass.
+    Returns one (condition, reason, advice) tuple per row.
     """
-    tips: list[str] = []
+    return DIAGNOSIS_RULES.evaluate_batch(columns)
 
-    soil = inputs.get("soil_type", "").strip()
-    climate = inputs.get("climate", "").strip()
-    ph = float(inputs.get("ph", 0))
-    humidity = float(inputs.get("humidity", 0))
-    temp = float(inputs.get("temperature", 0))
-    rainfall = float(inputs.get("rainfall", 0))
 
-    # pH guidance
+def _ph_tip(inputs, crop):
+    ph = float(inputs.get("ph", 0))
     if ph < 6.0:
-        tips.append(f"Your soil is acidic (pH {ph:g}). Consider adding agricultural lime to raise pH and improve nutrient uptake.")
-    elif ph > 7.5:
-        tips.append(f"Your soil is alkaline (pH {ph:g}). Add organic compost or elemental sulfur to gently lower pH over time.")
-    else:
-        tips.append(f"pH {ph:g} is within a healthy range for most crops. Maintain with regular organic matter additions (compost/mulch).")
+        return f"Your soil is acidic (pH {ph:g}). Consider adding agricultural lime to raise pH and improve nutrient uptake."
+    if ph > 7.5:
+        return f"Your soil is alkaline (pH {ph:g}). Add organic compost or elemental sulfur to gently lower pH over time."
+    return f"pH {ph:g} is within a healthy range for most crops. Maintain with regular organic matter additions (compost/mulch)."
 
-    # Humidity guidance
+def _humidity_tip(inputs, crop):
+    humidity = float(inputs.get("humidity", 0))
     if humidity < 50:
-        tips.append(f"Low humidity ({int(humidity)}%). Mulch and water deeply to reduce evaporation and maintain soil moisture.")
-    elif humidity > 80:
-        tips.append(f"High humidity ({int(humidity)}%). Improve air circulation and avoid overhead watering to reduce fungal risk.")
-    else:
-        tips.append("Humidity looks good. Water in the early morning so foliage dries quickly, limiting disease pressure.")
+        return f"Low humidity ({int(humidity)}%). Mulch and water deeply to reduce evaporation and maintain soil moisture."
+    if humidity > 80:
+        return f"High humidity ({int(humidity)}%). Improve air circulation and avoid overhead watering to reduce fungal risk."
+    return "Humidity looks good. Water in the early morning so foliage dries quickly, limiting disease pressure."
 
-    # Temperature guidance
+def _temperature_tip(inputs, crop):
+    temp = float(inputs.get("temperature", 0))
     if temp > 30:
-        tips.append(f"Hot conditions ({temp:g}°C). Provide afternoon shade, increase mulching, and monitor for heat stress.")
-    elif temp < 20:
-        tips.append(f"Cool conditions ({temp:g}°C). Use row covers or cloches and choose cold-tolerant varieties.")
-    else:
-        tips.append("Temperature is optimal. Keep soil evenly moist and avoid drastic swings with consistent irrigation.")
+        return f"Hot conditions ({temp:g}°C). Provide afternoon shade, increase mulching, and monitor for heat stress."
+    if temp < 20:
+        return f"Cool conditions ({temp:g}°C). Use row covers or cloches and choose cold-tolerant varieties."
+    return "Temperature is optimal. Keep soil evenly moist and avoid drastic swings with consistent irrigation."
 
+def _soil_tip(inputs, crop):
     # Rainfall + soil type interplay
+    soil = inputs.get("soil_type", "").strip()
+    rainfall = float(inputs.get("rainfall", 0))
     if soil == "Clay" and rainfall > 150:
-        tips.append("Clay soil with heavy rain can waterlog roots. Improve drainage with raised beds and coarse amendments.")
-    elif soil == "Sandy" and rainfall < 100:
-        tips.append("Sandy soil drains fast. Use frequent, smaller waterings and add compost to improve water retention.")
-    elif soil == "Loam":
-        tips.append("Loam is ideal. Maintain structure by avoiding compaction and topping up organic matter each season.")
-
-    # Climate specifics
+        return "Clay soil with heavy rain can waterlog roots. Improve drainage with raised beds and coarse amendments."
+    if soil == "Sandy" and rainfall < 100:
+        return "Sandy soil drains fast. Use frequent, smaller waterings and add compost to improve water retention."
+    if soil == "Loam":
+        return "Loam is ideal. Maintain structure by avoiding compaction and topping up organic matter each season."
+    return None
+
+def _climate_tip(inputs, crop):
+    climate = inputs.get("climate", "").strip()
     if climate == "Tropical Wet":
-        tips.append("In tropical wet climates, space plants generously and prune to airflow; consider disease-resistant cultivars.")
-    elif climate == "Tropical Dry":
-        tips.append("In tropical dry climates, prioritize drought-tolerant crops and schedule irrigation to match crop stages.")
-    elif climate == "Urban Heat Zone":
-        tips.append("Urban heat zones run warmer; add shade cloth and monitor containers which heat/dry faster.")
+        return "In tropical wet climates, space plants generously and prune to airflow; consider disease-resistant cultivars."
+    if climate == "Tropical Dry":
+        return "In tropical dry climates, prioritize drought-tolerant crops and schedule irrigation to match crop stages."
+    if climate == "Urban Heat Zone":
+        return "Urban heat zones run warmer; add shade cloth and monitor containers which heat/dry faster."
+    return None
 
+def _crop_tip(inputs, crop):
     # Crop-specific general guidance (basic heuristics)
     crop_key = (crop or "").strip().lower()
-    if crop_key:
-        if crop_key in {"rice"}:
-            tips.append("Rice prefers consistent moisture; avoid nutrient spikes, keep pH near neutral, and manage standing water carefully.")
-        elif crop_key in {"tomato", "eggplant", "pepper", "chili"}:
-            tips.append("Solanaceae tip: stake early, remove lower leaves, and water at soil level to limit leaf diseases.")
-        elif crop_key in {"lettuce", "spinach", "pechay", "bok choy"}:
-            tips.append("Leafy greens benefit from steady moisture and partial shade in hot weather to prevent bolting.")
-        elif crop_key in {"maize", "corn"}:
-            tips.append("Corn needs nitrogen and consistent water during tasseling/silking; plant blocks (not rows) for better pollination.")
-
-    # Ensure a minimum number of tips and unique messages
-    # Remove duplicates while preserving order
+    if crop_key in {"rice"}:
+        return "Rice prefers consistent moisture; avoid nutrient spikes, keep pH near neutral, and manage standing water carefully."
+    if crop_key in {"tomato", "eggplant", "pepper", "chili"}:
+        return "Solanaceae tip: stake early, remove lower leaves, and water at soil level to limit leaf diseases."
+    if crop_key in {"lettuce", "spinach", "pechay", "bok choy"}:
+        return "Leafy greens benefit from steady moisture and partial shade in hot weather to prevent bolting."
+    if crop_key in {"maize", "corn"}:
+        return "Corn needs nitrogen and consistent water during tasseling/silking; plant blocks (not rows) for better pollination."
+    return None
+
+# Tip sections in display order: (name, input fields read, tip function). "crop" is the
+# crop passed to generate_growing_tips, so incremental callers can tell what to redo.
+TIP_SECTIONS = (
+    ("ph", frozenset({"ph"}), _ph_tip),
+    ("humidity", frozenset({"humidity"}), _humidity_tip),
+    ("temperature", frozenset({"temperature"}), _temperature_tip),
+    ("soil", frozenset({"soil_type", "rainfall"}), _soil_tip),
+    ("climate", frozenset({"climate"}), _climate_tip),
+    ("crop", frozenset({"crop"}), _crop_tip),
+)
+
+
+def finish_tips(section_tips):
+    """Drop empty and duplicate section tips (keeping order) and pad to at least four."""
     seen = set()
     unique_tips = []
-    for t in tips:
-        if t not in seen:
+    for t in section_tips:
+        if t and t not in seen:
             unique_tips.append(t)
             seen.add(t)
 
@@ -170,3 +178,10 @@ def generate_growing_tips(inputs: dict, crop: str | None = None) -> list[str]:
         unique_tips.append("Fertilization: Use balanced, slow-release or organic fertilizers and avoid overfeeding to prevent imbalances.")
 
     return unique_tips
+
+
+def generate_growing_tips(inputs: dict, crop: str | None = None) -> list[str]:
+    """Generate user-friendly growing tips based on inputs and optional crop.
+    Always returns at least a few actionable tips so the UI never looks empty.
+    """
+    return finish_tips([tip(inputs, crop) for _, _, tip in TIP_SECTIONS])
@@ -0,0 +1,209 @@
+"""Score a CSV of readings offline: ranked crops, diagnosis and tips for every row.
+
+The input is read ``chunksize`` rows at a time and each chunk is scored
+in a process pool, one model call per chunk. At most ``2 * workers``
+chunks are in flight and results are written in input order as they
+complete, so memory stays bounded whatever the file size. Workers
+format their own output, leaving the parent only to read and write.
+
+Each worker loads the model and dataset index once, memory-mapped from
+the shared export when one exists (see ``utils.shared``). Rows that fail
+validation are written with an ``error`` and no scores. Output is CSV,
+or JSON Lines when ``--out`` ends in ``.jsonl``. Run from the repository
+root:
+
+    python -m utils.score readings.csv --out scored.csv [--workers 4] [--chunksize 5000]
+"""
+import argparse
+import collections
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from utils.batch import BatchValidationError, TEXT_FIELDS, rank_batch, validate_readings
+from utils.dataset_index import FEATURES
+from utils.rules import apply_rules_batch, generate_growing_tips
+
+OUTPUT_FIELDS = ["crop", "suggestions", "condition", "reason", "advice", "tips", "error"]
+
+_worker = {}
+
+
+def load_scoring_resources(model_path=None, data_path=None, shared_dir=None):
+    """Return (model or None, DatasetIndex or None), preferring the shared export."""
+    from utils.shared import load_shared_index, load_shared_model, read_manifest
+    manifest = read_manifest(shared_dir, data_source=data_path, model_source=model_path) if shared_dir else None
+    model = index = None
+    if manifest:
+        model = load_shared_model(shared_dir, manifest)
+        index = load_shared_index(shared_dir, manifest)
+    if model is None and model_path and os.path.exists(model_path):
+        import joblib
+        model = joblib.load(model_path)
+    if index is None and data_path and os.path.exists(data_path):
+        from utils.ingest import build_streamed_indexes
+        index, _, _ = build_streamed_indexes(data_path, nn_backend=None)
+    return model, index
+
+
+def init_worker(model_path, data_path, shared_dir, top_n, output_format):
+    """Pool initializer: load resources once and pin native thread pools to one thread per process."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    model, index = load_scoring_resources(model_path, data_path, shared_dir)
+    _worker.update(model=model, index=index, top_n=top_n, format=output_format)
+
+
+def score_records(records, model=None, dataset_index=None, top_n=5):
+    """Score reading dicts; returns one dict of OUTPUT_FIELDS per record.
+
+    Invalid records get an ``error`` and are left out of the model call.
+    """
+    results = [dict.fromkeys(OUTPUT_FIELDS) for _ in records]
+    valid = list(range(len(records)))
+    try:
+        X, texts = validate_readings(records)
+    except BatchValidationError as e:
+        bad = {}
+        for err in e.errors:
+            bad.setdefault(err["row"], err["error"])
+        for i, message in bad.items():
+            results[i]["error"] = message
+        valid = [i for i in valid if i not in bad]
+        if not valid:
+            return results
+        X, texts = validate_readings([records[i] for i in valid])
+
+    ranked = rank_batch(X, model=model, dataset_index=dataset_index, top_n=top_n)
+    columns = {f: X[:, j] for j, f in enumerate(FEATURES)}
+    columns.update({f: np.array([t[j] for t in texts]) for j, f in enumerate(TEXT_FIELDS)})
+    diagnoses = apply_rules_batch(columns)
+
+    for i, values, (soil_type, climate), suggestions, diagnosis in zip(valid, X.tolist(), texts, ranked, diagnoses):
+        crop = suggestions[0]["crop"] if suggestions else None
+        inputs = dict(zip(FEATURES, values), soil_type=soil_type, climate=climate)
+        condition, reason, advice = diagnosis
+        results[i].update(crop=crop, suggestions=suggestions, condition=condition, reason=reason, advice=advice,
+                          tips=generate_growing_tips(inputs, crop))
+    return results
+
+
+def format_rows(header, rows, results, output_format="csv"):
+    """Serialize input rows joined with their scores as CSV (no header) or JSON Lines text."""
+    buf = io.StringIO()
+    if output_format == "jsonl":
+        for row, result in zip(rows, results):
+            buf.write(json.dumps(dict(zip(header, row), **result)) + "\n")
+        return buf.getvalue()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row, result in zip(rows, results):
+        suggestions = ";".join(f"{s['crop']}:{s['suitability']}" for s in result["suggestions"] or [])
+        scored = dict(result, suggestions=suggestions, tips=" | ".join(result["tips"] or []))
+        writer.writerow(row + ["" if scored[f] is None else scored[f] for f in OUTPUT_FIELDS])
+    return buf.getvalue()
+
+
+def score_chunk(header, rows):
+    """Pool task: score one chunk of raw CSV rows and return (row count, formatted output)."""
+    keys = [str(h).strip().lower() for h in header]
+    records = [dict(zip(keys, row)) for row in rows]
+    results = score_records(records, _worker["model"], _worker["index"], _worker["top_n"])
+    return len(rows), format_rows(header, rows, results, _worker["format"])
+
+
+def iter_row_chunks(path, chunksize):
+    """Yield (header, rows) with each row a list of the raw CSV fields; the parent never parses values."""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return
+        chunk = []
+        for row in reader:
+            chunk.append(row[:len(header)] + [""] * (len(header) - len(row)))
+            if len(chunk) >= chunksize:
+                yield header, chunk
+                chunk = []
+        if chunk:
+            yield header, chunk
+
+
+def run_scoring(in_path, out_path, workers=1, chunksize=5000, model_path=None, data_path=None, shared_dir=None,
+                top_n=5):
+    """Score ``in_path`` into ``out_path`` and return the number of rows written.
+
+    ``workers`` > 1 scores chunks in that many processes; 1 scores in this
+    process.
+    """
+    output_format = "jsonl" if out_path.endswith(".jsonl") else "csv"
+    initargs = (model_path, data_path, shared_dir, top_n, output_format)
+    rows_written = 0
+    header_written = output_format == "jsonl"
+
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        def write(header, result):
+            nonlocal rows_written, header_written
+            if not header_written:
+                csv.writer(out, lineterminator="\n").writerow(header + OUTPUT_FIELDS)
+                header_written = True
+            count, text = result
+            out.write(text)
+            rows_written += count
+
+        chunks = iter_row_chunks(in_path, chunksize)
+        if workers <= 1:
+            init_worker(*initargs)
+            for header, rows in chunks:
+                write(header, score_chunk(header, rows))
+            return rows_written
+
+        from concurrent.futures import ProcessPoolExecutor
+        in_flight = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+            for header, rows in chunks:
+                if len(in_flight) >= 2 * workers:
+                    write(*_pop_result(in_flight))
+                in_flight.append((header, pool.submit(score_chunk, header, rows)))
+            while in_flight:
+                write(*_pop_result(in_flight))
+    return rows_written
+
+
+def _pop_result(in_flight):
+    header, future = in_flight.popleft()
+    return header, future.result()
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV of readings (n, p, k, temperature, humidity, ph, rainfall, soil_type, climate)")
+    parser.add_argument("--out", required=True, help="output .csv or .jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=5000, help="rows per task (and per model call)")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--model", default=os.path.join(root, "models", "crop_model.pkl"))
+    parser.add_argument("--data", default=os.path.join(root, "data", "crop_recommendation2_cleaned.csv"),
+                        help="dataset for the fallback ranking when there is no model")
+    parser.add_argument("--shared", default=os.path.join(root, "models", "shared"),
+                        help="shared export to memory-map (used when present)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = run_scoring(args.input, args.out, workers=args.workers, chunksize=args.chunksize, model_path=args.model,
+                       data_path=args.data, shared_dir=args.shared, top_n=args.top_n)
+    elapsed = time.perf_counter() - start
+    print(f"scored {rows} rows in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):.0f} rows/s) with {args.workers} worker(s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
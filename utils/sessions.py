@@ -0,0 +1,219 @@
+"""Server-side Flask sessions kept in a shared filesystem directory or SQLite database.
+
+With Flask's default signed-cookie sessions, every response that touches
+the session re-sends the whole session to the client, and the data lives
+only in the browser. ``ServerSideSessionInterface`` sends just a random
+session id instead and keeps the data in a ``SessionStore``. Any node
+that mounts the same directory or database serves the same sessions,
+so requests need no sticky routing. Session data must be
+JSON-serializable, as it already is with the cookie backend. A stored
+session expires ``ttl`` seconds after it was last written, which happens
+only when a request changes it: the TTL runs from the last write, not the
+last access. Expired entries are purged at most once every
+PURGE_INTERVAL seconds, during a save.
+"""
+import json
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask.sessions import SecureCookieSession, SessionInterface
+
+SESSION_BACKENDS = ("cookie", "filesystem", "sqlite")
+SID = re.compile(r"^[A-Za-z0-9_-]{43}$")
+PURGE_INTERVAL = 3600
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class SessionStore:
+    """Session data by id: ``load`` returns a dict or None once missing or expired."""
+
+    def load(self, sid):
+        raise NotImplementedError
+
+    def save(self, sid, data, expires):
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Remove expired sessions; returns how many were removed."""
+        raise NotImplementedError
+
+
+class FileSessionStore(SessionStore):
+    """One JSON file per session under ``directory``, replaced atomically on save."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        return os.path.join(self.directory, sid + ".json")
+
+    def load(self, sid):
+        try:
+            with open(self._path(sid)) as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if entry["expires"] < time.time():
+            return None
+        return entry["data"]
+
+    def save(self, sid, data, expires):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"expires": expires, "data": data}, fh)
+            os.replace(tmp_path, self._path(sid))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, sid):
+        try:
+            os.remove(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self):
+        now, removed = time.time(), 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as fh:
+                    expired = json.load(fh)["expires"] < now
+                if expired:
+                    os.remove(path)
+                    removed += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        return removed
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in one SQLite table, one connection per thread, in WAL mode so reads never block on writes."""
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute("SELECT data FROM sessions WHERE sid = ? AND expires >= ?",
+                                      (sid, time.time())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save(self, sid, data, expires):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+                         (sid, json.dumps(data), expires))
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),)).rowcount
+
+
+def open_session_store(backend, path):
+    """The SessionStore for ``backend`` ("filesystem" or "sqlite") at ``path``."""
+    if backend == "filesystem":
+        return FileSessionStore(path)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path)
+    raise ValueError(f"Unknown session backend: {backend!r} (expected one of {', '.join(SESSION_BACKENDS)})")
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict that also carries its id; ``new`` until it has been stored."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        # Views re-assign unchanged values (e.g. the profile fields on every POST);
+        # comparing against the loaded copy avoids rewriting the store for those
+        self.loaded = dict(self)
+
+    @property
+    def changed(self):
+        return self.modified and (self.new or dict(self) != self.loaded)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface keeping session data in ``store`` and only the id in the cookie."""
+
+    session_class = ServerSession
+
+    def __init__(self, store, ttl=14 * 24 * 3600):
+        self.store = store
+        self.ttl = ttl
+        self._next_purge = time.time() + PURGE_INTERVAL
+        self._purge_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID.match(sid):
+            data = self.store.load(sid)
+            if data is not None:
+                return self.session_class(data, sid=sid)
+        return self.session_class(sid=new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+        if not session:
+            # Empty sessions are never stored; an emptied one is deleted with its cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+            return
+        if not session.changed:
+            return
+        self.store.save(session.sid, dict(session), time.time() + self.ttl)
+        self._maybe_purge()
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+    def _maybe_purge(self):
+        if time.time() < self._next_purge or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_purge = time.time() + PURGE_INTERVAL
+            self.store.purge_expired()
+        finally:
+            self._purge_lock.release()
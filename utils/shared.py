@@ -0,0 +1,180 @@
+"""Export the dataset indexes and crop model so pre-forked workers share their pages.
+
+Every index array is written as its own ``.npy`` file and opened with
+``np.load(mmap_mode="r")``, so all workers on a box map the same page
+cache instead of each holding a private copy. The model is dumped with
+uncompressed joblib and loaded with ``mmap_mode="r"``. This shares only
+plain NumPy attributes: scikit-learn trees copy their node arrays while
+unpickling, so each worker still holds a private forest. To share the
+model itself, serve a ``python -m utils.forest`` export instead
+(``python -m benchmarks.shared_memory`` compares the layouts).
+
+The manifest records the size and mtime of the dataset and model files
+the export was built from. ``read_manifest`` ignores the parts whose
+source is now a different file, or has changed since, so an explicit
+VERDANTIA_DATA_PATH or VERDANTIA_MODEL_PATH, or an edited CSV, is never
+shadowed by an old export.
+
+Run from the repository root to (re)build the export:
+
+    python -m utils.shared --out models/shared [--model models/crop_model.pkl]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from utils.dataset_index import DatasetIndex, build_dataset_index
+from utils.neighbors import NeighborRanker, build_neighbor_backend, build_neighbor_ranker
+from utils.profiles import source_fingerprint
+
+MANIFEST = "manifest.json"
+MODEL_FILE = "model.joblib"
+FORMAT_VERSION = 1
+
+
+def _save(out_dir, name, array):
+    np.save(os.path.join(out_dir, name + ".npy"), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _load(path, name):
+    return np.load(os.path.join(path, name + ".npy"), mmap_mode="r", allow_pickle=False)
+
+
+def export_shared(out_dir, df=None, model=None, data_source=None, model_source=None):
+    """Write the arrays behind both fallback rankers (and ``model``, if given) to ``out_dir``.
+
+    ``data_source`` and ``model_source`` are the files ``df`` and ``model``
+    were read from; without them the export is only used when no source
+    path is checked against it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"version": FORMAT_VERSION, "rows": 0 if df is None else len(df), "index": None, "neighbors": None, "model": None,
+                "sources": {"data": None if data_source is None else source_fingerprint(data_source),
+                            "model": None if model_source is None else source_fingerprint(model_source)}}
+
+    index = build_dataset_index(df)
+    if index is not None:
+        _save(out_dir, "index_matrix", index.matrix)
+        _save(out_dir, "index_mins", index.mins)
+        _save(out_dir, "index_ranges", index.ranges)
+        _save(out_dir, "index_codes", index.codes)
+        _save(out_dir, "index_labels", index.labels.astype(str))
+        manifest["index"] = {"features": index.features}
+
+    ranker = build_neighbor_ranker(df)
+    if ranker is not None:
+        _save(out_dir, "nn_matrix", ranker.backend.matrix)
+        _save(out_dir, "nn_codes", ranker.codes)
+        _save(out_dir, "nn_labels", ranker.labels.astype(str))
+        manifest["neighbors"] = {"features": ranker.features}
+
+    if model is not None:
+        import joblib
+        # Uncompressed so joblib.load(mmap_mode="r") can map the arrays in place
+        joblib.dump(model, os.path.join(out_dir, MODEL_FILE))
+        manifest["model"] = MODEL_FILE
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def source_matches(recorded, path):
+    """True when ``path`` is the file an export was built from, unchanged since.
+
+    A source that no longer exists matches its recorded path, so an export
+    can be deployed without the CSV or pickle it came from.
+    """
+    if not recorded:
+        return False
+    current = source_fingerprint(path)
+    if current is None:
+        return recorded["path"] == os.path.abspath(path)
+    return current == recorded
+
+
+def read_manifest(path, data_source=None, model_source=None):
+    """Return the export manifest in ``path``, or None if there is no usable export.
+
+    With ``data_source``/``model_source`` given, the dataset indexes or the
+    model are dropped from the manifest unless the export was built from
+    that unchanged file.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST)) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        return None
+    sources = manifest.get("sources") or {}
+    if data_source is not None and (manifest.get("index") or manifest.get("neighbors")) \
+            and not source_matches(sources.get("data"), data_source):
+        print(f"Ignoring dataset arrays in {path}: not exported from the current {data_source}")
+        manifest["index"] = manifest["neighbors"] = None
+    if model_source is not None and manifest.get("model") and not source_matches(sources.get("model"), model_source):
+        print(f"Ignoring model in {path}: not exported from the current {model_source}")
+        manifest["model"] = None
+    if not (manifest.get("index") or manifest.get("neighbors") or manifest.get("model")):
+        return None
+    return manifest
+
+
+def load_shared_index(path, manifest):
+    """Open the exported DatasetIndex with its matrix memory-mapped."""
+    if not manifest.get("index"):
+        return None
+    return DatasetIndex(
+        manifest["index"]["features"],
+        _load(path, "index_matrix"),
+        _load(path, "index_mins"),
+        _load(path, "index_ranges"),
+        _load(path, "index_codes"),
+        _load(path, "index_labels"),
+    )
+
+
+def load_shared_neighbors(path, manifest, backend="brute", leaf_size=40, **options):
+    """Open the exported NeighborRanker; the brute-force backend scans the mapped matrix directly."""
+    if not manifest.get("neighbors"):
+        return None
+    matrix = _load(path, "nn_matrix")
+    return NeighborRanker(
+        build_neighbor_backend(matrix, backend, leaf_size, **options),
+        _load(path, "nn_codes"),
+        _load(path, "nn_labels"),
+        features=manifest["neighbors"]["features"],
+    )
+
+
+def load_shared_model(path, manifest):
+    """joblib.load the exported model with its arrays memory-mapped, or None if none was exported."""
+    if not manifest.get("model"):
+        return None
+    import joblib
+    return joblib.load(os.path.join(path, manifest["model"]), mmap_mode="r")
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=os.path.join(root, "models", "shared"))
+    parser.add_argument("--data", default=os.path.join(root, "data", "crop_recommendation2_cleaned.csv"))
+    parser.add_argument("--model", default=os.path.join(root, "models", "crop_model.pkl"),
+                        help="pickled model to re-export (skipped if missing)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    model = None
+    if os.path.exists(args.model):
+        import joblib
+        model = joblib.load(args.model)
+    manifest = export_shared(args.out, pd.read_csv(args.data), model, data_source=args.data,
+                             model_source=args.model if model is not None else None)
+    print(f"exported {manifest['rows']} rows to {args.out}" + (" with model" if model is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
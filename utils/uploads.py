@@ -0,0 +1,134 @@
+"""Content-addressed storage for uploaded images, with downscaling kept off the request path.
+
+``store_upload`` copies an upload stream to disk CHUNK_SIZE bytes at a
+time, hashing as it goes, and aborts as soon as it passes ``max_bytes``,
+so memory stays flat whatever the client sends. The type is taken from
+the file's magic bytes, never its name. The file is then renamed to its
+SHA-256, so the same image uploaded twice is stored once and its URL
+never changes content, which lets it be served with a far-future cache
+header. ``make_thumbnail`` writes a downscaled copy when Pillow is
+installed and is meant to run on a background pool.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+# Magic-byte prefixes of the accepted image types (WebP is checked separately)
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+STORED_NAME = re.compile(r"^[0-9a-f]{32}(\.\d+)?\.(png|jpg|gif|webp)$")
+# Larger images are left as they are rather than decoded for a thumbnail
+MAX_THUMBNAIL_PIXELS = 40_000_000
+
+
+class UploadError(ValueError):
+    """The upload was empty or not a supported image."""
+
+
+class UploadTooLarge(UploadError):
+    """The upload passed its size limit while streaming."""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def sniff_image_type(head):
+    """Extension for the image whose first bytes are ``head``, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+def is_stored_name(name):
+    """True for names produced by store_upload (or make_thumbnail)."""
+    return bool(name) and STORED_NAME.match(name) is not None
+
+
+def store_upload(stream, upload_dir, max_bytes, chunk_size=CHUNK_SIZE):
+    """Stream an image upload into ``upload_dir`` under its content hash.
+
+    Returns (name, created); ``created`` is False when an identical file was
+    already stored. Raises UploadTooLarge once more than ``max_bytes`` have
+    been read and UploadError for empty or non-image uploads; nothing is
+    left behind in either case.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+        ext = sniff_image_type(head)
+        if ext is None:
+            raise UploadError("Upload is empty or not a PNG, JPEG, GIF or WebP image")
+        name = digest.hexdigest()[:32] + ext
+        path = os.path.join(upload_dir, name)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return name, False
+        os.replace(tmp_path, path)
+        return name, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def thumbnail_name(name, size):
+    """Name of the ``size``-pixel thumbnail of stored file ``name``; GIFs become PNGs."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{size}{'.png' if ext == '.gif' else ext}"
+
+
+def make_thumbnail(upload_dir, name, size):
+    """Write a copy of ``name`` downscaled to fit ``size`` x ``size`` pixels.
+
+    Returns the thumbnail's name, or None without Pillow, for images over
+    MAX_THUMBNAIL_PIXELS, or when the image is already small enough.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    out_name = thumbnail_name(name, size)
+    out_path = os.path.join(upload_dir, out_name)
+    if os.path.exists(out_path):
+        return out_name
+    with Image.open(os.path.join(upload_dir, name)) as image:
+        if image.width * image.height > MAX_THUMBNAIL_PIXELS or max(image.size) <= size:
+            return None
+        image.draft("RGB", (size, size))  # JPEG: decode at a reduced scale
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        image.thumbnail((size, size))
+        fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".thumb-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                fmt = {".jpg": "JPEG", ".webp": "WEBP"}.get(os.path.splitext(out_name)[1], "PNG")
+                image.save(out, format=fmt, optimize=True)
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return out_name
@@ -0,0 +1,116 @@
+"""Incremental re-evaluation of one reading for "what-if" edits.
+
+A ``WhatIfResult`` keeps every stage's output for a reading: the crop
+ranking, the per-rule hits of the diagnosis rules and each growing-tip
+section. ``evaluate`` given a previous result and edited inputs redoes
+only the stages that read a changed field. A pH edit re-ranks (the model
+reads pH) and rebuilds the pH tip, but leaves the soil, climate and
+crop tips and the climate/soil diagnosis rules alone.
+"""
+import math
+
+from utils.dataset_index import FEATURES
+from utils.rules import DIAGNOSIS_RULES, TIP_SECTIONS, finish_tips
+
+RANKING_FIELDS = frozenset(FEATURES)
+INPUT_FIELDS = tuple(FEATURES) + ("soil_type", "climate")
+
+
+class WhatIfResult:
+    """Stage outputs for one reading; treat as immutable, ``evaluate`` returns a new one."""
+
+    def __init__(self, inputs, ranking, rule_hits, diagnosis, tip_sections, recomputed):
+        self.inputs = inputs
+        self.ranking = ranking
+        self.rule_hits = rule_hits
+        self.diagnosis = diagnosis
+        self.tip_sections = tip_sections
+        self.recomputed = recomputed
+
+    @property
+    def crop(self):
+        return self.ranking[0] if self.ranking else None
+
+    @property
+    def suggestions(self):
+        return list(self.ranking[1]) if self.ranking else []
+
+    @property
+    def tips(self):
+        return finish_tips(self.tip_sections)
+
+    def to_dict(self):
+        condition, reason, advice = self.diagnosis
+        return {
+            "inputs": self.inputs,
+            "crop": self.crop,
+            "suggestions": self.suggestions,
+            "tips": self.tips,
+            "diagnosis": {"condition": condition, "reason": reason, "advice": advice},
+            "recomputed": self.recomputed,
+        }
+
+
+def changed_fields(old, new):
+    return {f for f in set(old) | set(new) if old.get(f) != new.get(f)}
+
+
+def evaluate(inputs, rank=None, previous=None):
+    """Evaluate ``inputs``, reusing every stage of ``previous`` whose fields are unchanged.
+
+    ``rank(inputs)`` returns a (crop, suggestions, ...) ranking or None;
+    without it no ranking is done (diagnosis and tips only). ``recomputed``
+    on the result names the ranking, the priorities of re-tested rules and
+    the rebuilt tip sections.
+    """
+    changed = None if previous is None else changed_fields(previous.inputs, inputs)
+
+    if rank is None:
+        ranking, reranked = None, False
+    elif previous is None or previous.ranking is None or changed & RANKING_FIELDS:
+        ranking, reranked = rank(inputs), True
+    else:
+        ranking, reranked = previous.ranking, False
+
+    diagnosis, hits, tested = DIAGNOSIS_RULES.evaluate_incremental(
+        inputs, None if previous is None else previous.rule_hits, changed)
+
+    crop = ranking[0] if ranking else None
+    if previous is not None and crop != previous.crop:
+        changed = changed | {"crop"}
+    sections, rebuilt = [], []
+    for i, (name, fields, tip) in enumerate(TIP_SECTIONS):
+        if previous is None or fields & changed:
+            sections.append(tip(inputs, crop))
+            rebuilt.append(name)
+        else:
+            sections.append(previous.tip_sections[i])
+
+    recomputed = {
+        "ranking": reranked,
+        "rules": [DIAGNOSIS_RULES.rules[i].priority for i in tested],
+        "tips": rebuilt,
+    }
+    return WhatIfResult(dict(inputs), ranking, hits, diagnosis, sections, recomputed)
+
+
+def apply_changes(inputs, changes):
+    """Return ``inputs`` updated with ``changes``, validated like the forms.
+
+    Raises ValueError for unknown fields or non-numeric or non-finite feature values.
+    """
+    updated = dict(inputs)
+    for field, value in changes.items():
+        if field not in INPUT_FIELDS:
+            raise ValueError(f"unknown field '{field}'")
+        if field in RANKING_FIELDS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"field '{field}' is not a number") from None
+            if not math.isfinite(value):
+                raise ValueError(f"field '{field}' is not finite")
+        else:
+            value = str(value)
+        updated[field] = value
+    return updated
@@ -1,112 +1,266 @@
-from flask import Flask, render_template, request, session, redirect, url_for
-from werkzeug.utils import secure_filename
-import joblib
-import pandas as pd
+from flask import Flask, render_template, request, session, redirect, url_for, jsonify, g, send_from_directory, make_response
+from werkzeug.exceptions import RequestEntityTooLarge
 import sys
 import os
+import gzip
+import hmac
 import math
-import numpy as np
+import secrets
+import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.rules import apply_rules, generate_growing_tips
+from utils.assets import Shell, build_assets, choose_encoding, variant_etag
+from utils.batch import BatchValidationError, ModelInferenceError, rank_batch, readings_from_csv, recommend_batch
+from utils.cache import LRUCache, quantized_inputs, recommendation_key
+from utils.dataset_index import FEATURES
+from utils.executor import BoundedExecutor, QueueFull
+from utils.forest import load_model as load_model_file
+from utils.ingest import DEFAULT_MAX_ROWS, build_streamed_indexes, observations_from_records
+from utils.metrics import Registry
+from utils.microbatch import MicroBatcher
+from utils.profiles import cached_crop_profiles
+from utils.profiling import RequestProfiler
+from utils.registry import ModelRegistry, RegistryWatcher
+from utils.resources import DatasetResources, ResourceManager
+from utils.sessions import ServerSideSessionInterface, open_session_store
+from utils.shared import load_shared_index, load_shared_model, load_shared_neighbors, read_manifest
+from utils.uploads import UploadError, UploadTooLarge, is_stored_name, make_thumbnail, store_upload, thumbnail_name
+from utils.whatif import INPUT_FIELDS, apply_changes, evaluate as evaluate_whatif
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
 
-# Uploads
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "static", "uploads")
+# Sessions: "cookie" (default) keeps them in Flask's signed cookie; "filesystem" or "sqlite"
+# keep them server-side at SESSION_PATH, which every node of a deployment can share, and
+# the cookie carries only a random id. Stored sessions expire SESSION_TTL seconds after
+# their last change: requests that only read a session do not extend it
+SESSION_BACKEND = os.environ.get("VERDANTIA_SESSION_BACKEND", "cookie")
+SESSION_PATH = os.environ.get("VERDANTIA_SESSION_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "sessions" + (".sqlite3" if SESSION_BACKEND == "sqlite" else ""))
+SESSION_TTL = float(os.environ.get("VERDANTIA_SESSION_TTL", str(14 * 24 * 3600)))
+if SESSION_BACKEND != "cookie":
+    app.session_interface = ServerSideSessionInterface(open_session_store(SESSION_BACKEND, SESSION_PATH), ttl=SESSION_TTL)
+
+# Uploads: request bodies over MAX_CONTENT_LENGTH bytes are refused with 413 before they are
+# parsed. Avatars (at most AVATAR_MAX_BYTES) are streamed to UPLOAD_FOLDER under content-hash
+# names and served from /uploads with a one-year immutable Cache-Control; AVATAR_WORKERS
+# background threads downscale them to AVATAR_SIZE px (needs Pillow), AVATAR_QUEUE more waiting
+UPLOAD_FOLDER = os.environ.get("VERDANTIA_UPLOAD_DIR") or os.path.join(os.path.dirname(__file__), "static", "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("VERDANTIA_MAX_CONTENT_LENGTH", str(16 * 1024 * 1024))) or None
+AVATAR_MAX_BYTES = int(os.environ.get("VERDANTIA_AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+AVATAR_SIZE = int(os.environ.get("VERDANTIA_AVATAR_SIZE", "256"))
+AVATAR_WORKERS = int(os.environ.get("VERDANTIA_AVATAR_WORKERS", "1"))
+AVATAR_QUEUE = int(os.environ.get("VERDANTIA_AVATAR_QUEUE", "64"))
+UPLOAD_MAX_AGE = 365 * 24 * 3600
+avatar_pool = BoundedExecutor(max_workers=AVATAR_WORKERS, max_queue=AVATAR_QUEUE, thread_name_prefix="avatar")
 
-# Load model using absolute path
-model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "crop_model.pkl")
-try:
-    model = joblib.load(model_path)
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-
-# Load dataset for fallback multi-crop suggestions
-data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "crop_recommendation2_cleaned.csv")
-df = None
-try:
-    if os.path.exists(data_path):
-        df = pd.read_csv(data_path)
-except Exception as e:
-    print(f"Error loading dataset: {e}")
-    df = None
-
-def top_crops_by_dataset(inputs, k=5):
+TOP_N = int(os.environ.get("VERDANTIA_TOP_N", "5"))
+BATCH_MAX_ROWS = int(os.environ.get("VERDANTIA_BATCH_MAX_ROWS", "50000"))
+
+# Nearest-neighbour search over the raw features: "brute", "kd_tree", "ball_tree" or the
+# approximate "ivf_sq8" (NN_LISTS k-means lists, NN_PROBE probed per query; more probes,
+# higher recall and latency. NN_REFINE > 0 re-ranks the best NN_REFINE * k by exact distance)
+NN_BACKEND = os.environ.get("VERDANTIA_NN_BACKEND", "brute")
+NN_LEAF_SIZE = int(os.environ.get("VERDANTIA_NN_LEAF_SIZE", "40"))
+NN_OPTIONS = {}
+if NN_BACKEND == "ivf_sq8":
+    NN_OPTIONS = {"n_lists": int(os.environ.get("VERDANTIA_NN_LISTS", "0")) or None,
+                  "n_probe": int(os.environ.get("VERDANTIA_NN_PROBE", "8")),
+                  "refine": int(os.environ.get("VERDANTIA_NN_REFINE", "0"))}
+
+# Dataset fallback used when the model is unavailable: "scan" compares the reading with every
+# row; "profiles" ranks against PROFILES_N k-means prototypes per crop, built once and kept in
+# PROFILES_DIR until the dataset file changes (approximate, O(crops) per request)
+FALLBACK = os.environ.get("VERDANTIA_FALLBACK", "scan")
+PROFILES_DIR = os.environ.get("VERDANTIA_PROFILES_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "crop_profiles")
+PROFILES_N = int(os.environ.get("VERDANTIA_PROFILES_N", "16"))
+
+# Front end: with STATIC_CACHE "on", files under web_app/static (uploads aside) are served from
+# /assets/ under content-hash names with a one-year immutable Cache-Control, pre-compressed with
+# gzip (and brotli when installed) at startup. GET pages are rendered once per profile into up to
+# SHELL_CACHE_SIZE cached shells answered with ETags; other HTML/JSON responses of at least
+# COMPRESS_MIN_BYTES are gzipped at COMPRESS_LEVEL. "off" serves everything as before.
+STATIC_CACHE = os.environ.get("VERDANTIA_STATIC_CACHE", "on") == "on"
+SHELL_CACHE_SIZE = int(os.environ.get("VERDANTIA_SHELL_CACHE_SIZE", "256")) if STATIC_CACHE else 0
+COMPRESS_MIN_BYTES = int(os.environ.get("VERDANTIA_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("VERDANTIA_COMPRESS_LEVEL", "6"))
+ASSET_MAX_AGE = 365 * 24 * 3600
+assets = build_assets(app.static_folder) if STATIC_CACHE else None
+shell_cache = LRUCache(maxsize=SHELL_CACHE_SIZE)
+
+# Recommendation cache: readings that match after rounding to CACHE_PRECISION decimals
+# share one crop ranking (tips are generated per request from the exact reading);
+# size 0 disables it and ranks every reading unrounded, TTL 0 keeps entries until evicted
+CACHE_SIZE = int(os.environ.get("VERDANTIA_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("VERDANTIA_CACHE_TTL", "300")) or None
+CACHE_PRECISION = int(os.environ.get("VERDANTIA_CACHE_PRECISION", "2"))
+recommendation_cache = LRUCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+
+# What-if results: each /api/whatif result is kept for WHATIF_TTL seconds under its session,
+# so later edits sent as a delta redo only the stages they affect. Result pages store nothing;
+# their first edit sends the full reading, which makes the baseline
+WHATIF_CACHE_SIZE = int(os.environ.get("VERDANTIA_WHATIF_CACHE_SIZE", "4096"))
+WHATIF_TTL = float(os.environ.get("VERDANTIA_WHATIF_TTL", "900")) or None
+whatif_results = LRUCache(maxsize=WHATIF_CACHE_SIZE, ttl=WHATIF_TTL)
+
+# Inference pool: cache misses and batches run on INFERENCE_WORKERS threads with at most
+# INFERENCE_QUEUE more waiting; beyond that requests get 503 + Retry-After
+INFERENCE_WORKERS = int(os.environ.get("VERDANTIA_INFERENCE_WORKERS", str(min(8, os.cpu_count() or 1))))
+INFERENCE_QUEUE = int(os.environ.get("VERDANTIA_INFERENCE_QUEUE", "32"))
+INFERENCE_TIMEOUT = float(os.environ.get("VERDANTIA_INFERENCE_TIMEOUT", "30"))
+RETRY_AFTER = int(os.environ.get("VERDANTIA_RETRY_AFTER", "1"))
+inference = BoundedExecutor(max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE, retry_after=RETRY_AFTER)
+
+# Micro-batching: cache misses arriving within MICROBATCH_WAIT_MS of each other (up to
+# MICROBATCH_MAX of them) share one predict_proba call; MICROBATCH_MAX=1 turns it off
+MICROBATCH_MAX = int(os.environ.get("VERDANTIA_MICROBATCH_MAX", "64"))
+MICROBATCH_WAIT_MS = float(os.environ.get("VERDANTIA_MICROBATCH_WAIT_MS", "2"))
+
+# Metrics: always-on stage timers and ranking-path counters, scraped from /metrics
+metrics = Registry(prefix="verdantia_")
+REQUEST_SECONDS = metrics.histogram("request_seconds", "Request latency by endpoint and status.", ["endpoint", "method", "status"])
+STAGE_SECONDS = metrics.histogram("stage_seconds", "Time spent in each recommend/advisor stage.", ["stage"])
+RANKING_PATH = metrics.counter("ranking_path", "Recommendations by ranking path: model, dataset fallback or error (none).", ["path"])
+MODEL_ERRORS = metrics.counter("model_errors", "Model calls that raised and fell back to the dataset.", ["error"])
+STAGE_PARSE = STAGE_SECONDS.labels(stage="parse")
+STAGE_DATAFRAME = STAGE_SECONDS.labels(stage="dataframe")
+STAGE_MODEL = STAGE_SECONDS.labels(stage="model")
+STAGE_MODEL_BATCH = STAGE_SECONDS.labels(stage="model_batch")
+STAGE_FALLBACK = STAGE_SECONDS.labels(stage="fallback")
+STAGE_TIPS = STAGE_SECONDS.labels(stage="tips")
+STAGE_RULES = STAGE_SECONDS.labels(stage="rules")
+STAGE_RENDER = STAGE_SECONDS.labels(stage="render")
+STAGE_WHATIF = STAGE_SECONDS.labels(stage="whatif")
+PATH_MODEL = RANKING_PATH.labels(path="model")
+PATH_DATASET = RANKING_PATH.labels(path="dataset")
+PATH_ERROR = RANKING_PATH.labels(path="error")
+RANKING_PATHS = {"model": PATH_MODEL, "dataset": PATH_DATASET}
+AVATAR_UPLOADS = metrics.counter("avatar_uploads", "Avatar uploads by outcome: stored, duplicate, rejected or too_large.", ["outcome"])
+
+# Per-request cProfile: "off", "header" (requests sending X-Verdantia-Profile: 1) or "all";
+# profiled requests run inference on the request thread and are dumped to PROFILE_DIR
+profiler = RequestProfiler(
+    mode=os.environ.get("VERDANTIA_PROFILE", "off"),
+    out_dir=os.environ.get("VERDANTIA_PROFILE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "profiles"),
+)
+
+# Model and dataset loading: "background" (default), "lazy" or "eager".
+# Requests arriving mid-load wait up to LOAD_TIMEOUT seconds before falling back.
+LOAD_MODE = os.environ.get("VERDANTIA_LOAD_MODE", "background")
+LOAD_TIMEOUT = float(os.environ.get("VERDANTIA_LOAD_TIMEOUT", "30"))
+
+# VERDANTIA_MODEL_PATH may also name a directory written by `python -m utils.forest`,
+# served by the NumPy-only ForestPredictor instead of the pickled scikit-learn model
+model_path = os.environ.get("VERDANTIA_MODEL_PATH") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "crop_model.pkl")
+data_path = os.environ.get("VERDANTIA_DATA_PATH") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "crop_recommendation2_cleaned.csv")
+
+# The dataset (CSV or Parquet) is streamed DATASET_CHUNKSIZE rows at a time into float32
+# arrays; past DATASET_MAX_ROWS rows (1,000,000 by default) a uniform sample of that many
+# is kept to bound memory, 0 keeps every row
+DATASET_CHUNKSIZE = int(os.environ.get("VERDANTIA_DATASET_CHUNKSIZE", "50000"))
+DATASET_MAX_ROWS = int(os.environ.get("VERDANTIA_DATASET_MAX_ROWS", str(DEFAULT_MAX_ROWS))) or None
+
+# POST /api/observations appends labelled readings to the live indexes; disabled unless
+# a bearer token is configured
+INGEST_TOKEN = os.environ.get("VERDANTIA_INGEST_TOKEN", "")
+
+# Directory written by `python -m utils.shared`; when it holds an export of the current
+# DATA_PATH (and MODEL_PATH) files, workers memory-map its dataset arrays instead of each
+# building a private copy. Parts exported from other or since-modified files are ignored.
+SHARED_DIR = os.environ.get("VERDANTIA_SHARED_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "shared")
+
+# Model registry written by `python -m utils.registry`: when REGISTRY_DIR is set, the model
+# and dataset come from its active version instead of MODEL_PATH/DATA_PATH (and SHARED_DIR).
+# Every REGISTRY_POLL seconds each node checks which version is active; a new one is loaded
+# in the background and swapped in whole while requests keep being served by the old one
+REGISTRY_DIR = os.environ.get("VERDANTIA_REGISTRY_DIR", "")
+REGISTRY_POLL = float(os.environ.get("VERDANTIA_REGISTRY_POLL", "5"))
+registry = ModelRegistry(REGISTRY_DIR) if REGISTRY_DIR else None
+start_version = registry.active_version() if registry is not None else None
+
+def version_paths(version):
+    """(model path, dataset path) to serve for registry ``version``; the configured paths for None."""
+    if version is None:
+        return model_path, data_path
+    entry = registry.get(version)
+    return entry.model_path, entry.data_path or data_path
+
+def load_model(path=None):
+    """Load the crop model: a utils.forest export directory, else the joblib pickle at ``path``."""
+    if path is None:
+        path = version_paths(start_version)[0]
+        manifest = read_manifest(SHARED_DIR, model_source=path) if registry is None else None
+        if manifest and manifest.get("model"):
+            return load_shared_model(SHARED_DIR, manifest)
+    return load_model_file(path)
+
+def load_profiles(index, source=None):
+    if FALLBACK != "profiles":
+        return None
+    return cached_crop_profiles(PROFILES_DIR, index, source=source or data_path, n_prototypes=PROFILES_N)
+
+def load_dataset(path=None):
+    """Stream the dataset once and build both fallback indexes (and crop profiles) from it."""
+    manifest = read_manifest(SHARED_DIR, data_source=data_path) if path is None and registry is None else None
+    path = path or version_paths(start_version)[1]
+    if manifest and (manifest.get("index") or manifest.get("neighbors")):
+        index = load_shared_index(SHARED_DIR, manifest)
+        return DatasetResources.from_parts(
+            index,
+            load_shared_neighbors(SHARED_DIR, manifest, backend=NN_BACKEND, leaf_size=NN_LEAF_SIZE, **NN_OPTIONS),
+            manifest["rows"],
+            profiles=load_profiles(index),
+        )
+    if not os.path.exists(path):
+        return DatasetResources(None)
+    index, neighbors, rows = build_streamed_indexes(path, nn_backend=NN_BACKEND, nn_leaf_size=NN_LEAF_SIZE,
+                                                    chunksize=DATASET_CHUNKSIZE, max_rows=DATASET_MAX_ROWS,
+                                                    nn_options=NN_OPTIONS)
+    return DatasetResources.from_parts(index, neighbors, rows, profiles=load_profiles(index, source=path))
+
+def invalidate_results():
+    """Drop cached results after the model or dataset changes."""
+    recommendation_cache.invalidate()
+    whatif_results.invalidate()
+
+resources = ResourceManager(load_model, load_dataset, mode=LOAD_MODE, wait_timeout=LOAD_TIMEOUT,
+                            on_change=invalidate_results, version=start_version)
+resources.start()
+
+def activate_version(version):
+    """Load registry ``version`` off the request path, then swap it in; on error the old one stays."""
+    start = time.perf_counter()
+    version_model, version_data = version_paths(version)
+    model = load_model(version_model)
+    dataset = load_dataset(version_data)
+    resources.swap(model, dataset, version=version, load_seconds=time.perf_counter() - start)
+    app.logger.info("Serving model version %s", version)
+
+registry_watcher = None
+if registry is not None:
+    registry_watcher = RegistryWatcher(registry, activate_version, interval=REGISTRY_POLL, current=start_version)
+    registry_watcher.start()
+
+def fallback_index(snapshot=None):
+    """The crop profiles in "profiles" fallback mode when built, else the full dataset index."""
+    snapshot = snapshot or resources.snapshot()
+    return snapshot.profiles or snapshot.index
+
+def top_crops_by_dataset(inputs, k=5, snapshot=None):
     """Return top-k crop names ranked by similarity to inputs using the dataset.
     Uses min-max normalization on available numeric features and groups by crop label.
     """
-    if df is None:
-        return []
-
-    # Detect label column
-    label_col = None
-    for c in df.columns:
-        lc = str(c).strip().lower()
-        if lc in ("label", "crop", "crops"):
-            label_col = c
-            break
-    if not label_col:
-        return []
-
-    feature_cols = [c for c in ["n","p","k","temperature","humidity","ph","rainfall"] if c in df.columns]
-    if not feature_cols:
-        return []
-
-    work = df[[label_col] + feature_cols].copy()
-    # Min-max scale
-    mins = work[feature_cols].min()
-    maxs = work[feature_cols].max()
-    ranges = (maxs - mins).replace(0, 1)
-
-    # Build input vector
-    try:
-        x = pd.Series({c: float(inputs[c]) for c in feature_cols})
-    except Exception:
+    dataset_index = fallback_index(snapshot)
+    if dataset_index is None:
         return []
+    return dataset_index.top_crops(inputs, k=k)
 
-    x_norm = (x - mins) / ranges
-    X_norm = (work[feature_cols] - mins) / ranges
-    # Compute distances
-    dists = ((X_norm - x_norm) ** 2).sum(axis=1) ** 0.5
-    work["_dist"] = dists
-
-    # Best distance per crop
-    best = work.groupby(label_col)["_dist"].min().reset_index().sort_values("_dist")
-    if best.empty:
-        return []
-
-    # Convert to suitability score (higher is better)
-    d_max = best["_dist"].max()
-    eps = 1e-9
-    best["suitability"] = ((1.0 - best["_dist"] / (d_max + eps)) * 100).clip(lower=0, upper=100)
-
-    suggestions = []
-    for _, row in best.head(max(1, int(k))).iterrows():
-        suggestions.append({
-            "crop": str(row[label_col]).strip(),
-            "suitability": int(round(row["suitability"]))
-        })
-    return suggestions
-
-# Load dataset for fallback multi-crop suggestions
-dataset_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "crop_recommendation2_cleaned.csv")
-dataset_df = None
-if os.path.exists(dataset_path):
-    try:
-        dataset_df = pd.read_csv(dataset_path)
-    except Exception as e:
-        print(f"Error loading dataset fallback: {e}")
-        dataset_df = None
-
-TOP_N = int(os.environ.get("VERDANTIA_TOP_N", "5"))
-
-def top_candidates_from_model(X: pd.DataFrame, top_n: int):
+def top_candidates_from_model(X, top_n: int):
     """Return top-N crops using model probabilities, if available."""
+    model = resources.get_model()
     try:
         if not hasattr(model, "predict_proba"):
             return None
@@ -122,42 +276,299 @@ def top_candidates_from_model(X: pd.DataFrame, top_n: int):
 
 def top_candidates_from_dataset(inputs: dict, top_n: int, nearest_k: int = 200):
     """Fallback: find nearest samples in dataset and return top-N labels."""
-    if dataset_df is None:
+    snapshot = resources.snapshot()
+    dataset_neighbors = snapshot.profiles or snapshot.neighbors
+    if dataset_neighbors is None:
         return None
     try:
-        feats = ["n", "p", "k", "temperature", "humidity", "ph", "rainfall"]
-        q = np.array([float(inputs[f]) for f in feats], dtype=float)
-        M = dataset_df[feats].to_numpy(dtype=float)
-        # Euclidean distance
-        dists = np.linalg.norm(M - q, axis=1)
-        idx = np.argsort(dists)[:nearest_k]
-        nearest = dataset_df.iloc[idx]
-        # Score by average inverse distance and frequency
-        nearest = nearest.assign(_dist=dists[idx])
-        # Avoid division by zero
-        nearest["_inv"] = nearest["_dist"].apply(lambda x: 1.0 / (x + 1e-6))
-        agg = nearest.groupby("label").agg(freq=("label", "count"), inv=("_inv", "mean")).reset_index()
-        # Composite score: frequency * inverse distance
-        agg["score"] = agg["freq"] * agg["inv"]
-        agg.sort_values("score", ascending=False, inplace=True)
-        total_freq = float(agg["freq"].sum()) or 1.0
-        out = []
-        for _, row in agg.head(max(1, top_n)).iterrows():
-            out.append({
-                "crop": row["label"],
-                "confidence": round(100.0 * (row["freq"] / total_freq), 1)
-            })
-        return out
+        return dataset_neighbors.top_candidates(inputs, top_n, nearest_k)
     except Exception:
         return None
 
+FALLBACK_TIPS = [
+    "Maintain 2–3 cm mulch, water deeply, and monitor weekly.",
+    "Use balanced, slow-release fertilizer and avoid overfeeding.",
+    "Ensure good airflow; avoid overhead watering in humid periods."
+]
+
+def count_model_error(e):
+    """Count and log a model call that raised; the caller falls back to the dataset."""
+    MODEL_ERRORS.labels(error=type(e).__name__).inc()
+    app.logger.warning("Model inference failed, using dataset fallback: %s", e)
+
+def count_ranking_path(ranking):
+    """Count one served ranking by the path that produced it, or as an error when there is none."""
+    (PATH_ERROR if ranking is None else RANKING_PATHS[ranking[2]]).inc()
+
+def rank_reading(inputs, snapshot=None):
+    """Rank crops for one reading's numeric features with the model and dataset of ``snapshot``
+    (the one being served by default).
+    Returns (primary_crop, suggestions, path), path being "model" or "dataset",
+    or None when no ranking is available. Callers count what they serve.
+    """
+    snapshot = snapshot or resources.snapshot()
+    suggestions = []
+    primary_crop = None
+    ranking_path = None
+
+    # Try model top-N first
+    model = snapshot.model
+    if model is not None:
+        with STAGE_DATAFRAME.time():
+            import pandas as pd
+            X = pd.DataFrame([[inputs["n"], inputs["p"], inputs["k"], inputs["temperature"], inputs["humidity"], inputs["ph"], inputs["rainfall"]]],
+                             columns=["n", "p", "k", "temperature", "humidity", "ph", "rainfall"])
+        try:
+            with STAGE_MODEL.time():
+                # Prefer probability-based ranking when available
+                if hasattr(model, "predict_proba"):
+                    proba = model.predict_proba(X)[0]
+                    classes = list(getattr(model, "classes_", []))
+                    ranked = sorted(zip(classes, proba), key=lambda t: t[1], reverse=True)
+                    for crop_name, p in ranked[:5]:
+                        suggestions.append({"crop": str(crop_name), "suitability": int(round(p * 100))})
+                    if suggestions:
+                        primary_crop = suggestions[0]["crop"]
+                else:
+                    # Fallback: single prediction plus dataset-based ranking
+                    primary_crop = str(model.predict(X)[0])
+            if primary_crop is not None:
+                ranking_path = "model"
+        except Exception as e:
+            # Model exists but failed; count it and use dataset fallback
+            count_model_error(e)
+
+    # Dataset-based ranking if needed or to supplement
+    if not suggestions:
+        with STAGE_FALLBACK.time():
+            suggestions = top_crops_by_dataset(inputs, k=5, snapshot=snapshot)
+        if suggestions:
+            primary_crop = suggestions[0]["crop"]
+            ranking_path = "dataset"
+
+    if primary_crop is None and not suggestions:
+        return None
+    if primary_crop is None and suggestions:
+        primary_crop = suggestions[0]["crop"]
+    return primary_crop, suggestions, ranking_path
+
+def rank_readings(inputs_list, snapshot=None):
+    """rank_reading() for many readings with one predict_proba call.
+    Readings the model cannot rank go through rank_reading() one by one.
+    """
+    snapshot = snapshot or resources.snapshot()
+    model = snapshot.model
+    if model is None or not hasattr(model, "predict_proba"):
+        return [rank_reading(inputs, snapshot) for inputs in inputs_list]
+    try:
+        import numpy as np
+        X = np.array([[inputs[f] for f in FEATURES] for inputs in inputs_list], dtype=np.float64)
+        with STAGE_MODEL_BATCH.time():
+            ranked = rank_batch(X, model=model, top_n=5)
+    except Exception as e:
+        count_model_error(e.__cause__ if isinstance(e, ModelInferenceError) else e)
+        return [rank_reading(inputs, snapshot) for inputs in inputs_list]
+
+    results = []
+    for inputs, suggestions in zip(inputs_list, ranked):
+        if not suggestions:
+            results.append(rank_reading(inputs, snapshot))
+            continue
+        results.append((suggestions[0]["crop"], suggestions, "model"))
+    return results
+
+def rank_snapshot_readings(items):
+    """Micro-batch entry point: rank (snapshot, inputs) pairs, one rank_readings() call per snapshot.
+    A batch only spans two snapshots when a swap lands while it fills.
+    """
+    groups = {}
+    for i, (snapshot, _) in enumerate(items):
+        groups.setdefault(snapshot.generation, (snapshot, []))[1].append(i)
+    results = [None] * len(items)
+    for snapshot, positions in groups.values():
+        for i, ranking in zip(positions, rank_readings([items[i][1] for i in positions], snapshot)):
+            results[i] = ranking
+    return results
+
+def growing_tips(inputs, primary_crop):
+    """Growing tips for the exact reading; generic tips if generation fails, so the UI isn't empty."""
+    with STAGE_TIPS.time():
+        try:
+            return generate_growing_tips(inputs, primary_crop)
+        except Exception:
+            return FALLBACK_TIPS
+
+def build_recommendation(inputs):
+    """Rank crops for one reading and generate growing tips, without the cache.
+    Returns (primary_crop, suggestions, tips), or None when no ranking is available.
+    """
+    ranking = rank_reading(inputs)
+    count_ranking_path(ranking)
+    if ranking is None:
+        return None
+    primary_crop, suggestions, _ = ranking
+    return primary_crop, suggestions, growing_tips(inputs, primary_crop)
+
+microbatcher = None
+if MICROBATCH_MAX > 1:
+    microbatcher = MicroBatcher(rank_snapshot_readings, max_batch=MICROBATCH_MAX, max_wait=MICROBATCH_WAIT_MS / 1e3,
+                                max_pending=(INFERENCE_WORKERS + INFERENCE_QUEUE) * MICROBATCH_MAX,
+                                executor=inference, retry_after=RETRY_AFTER)
+
+metrics.callback("cache_hits_total", "Recommendation cache hits.", lambda: recommendation_cache.hits, kind="counter")
+metrics.callback("cache_misses_total", "Recommendation cache misses.", lambda: recommendation_cache.misses, kind="counter")
+metrics.callback("cache_entries", "Entries in the recommendation cache.", lambda: len(recommendation_cache))
+metrics.callback("inference_pending", "Tasks running or queued on the inference pool.", lambda: inference.pending)
+metrics.callback("inference_rejected_total", "Tasks refused because the inference pool was full.", lambda: inference.rejected, kind="counter")
+if microbatcher is not None:
+    metrics.callback("microbatch_batches_total", "Micro-batches dispatched.", lambda: microbatcher.batches, kind="counter")
+    metrics.callback("microbatch_items_total", "Readings dispatched in micro-batches.", lambda: microbatcher.items, kind="counter")
+    metrics.callback("microbatch_queue_delay_seconds_total", "Summed wait of readings before their batch ran.",
+                     lambda: microbatcher.delay_total, kind="counter")
+metrics.callback("ready", "1 once the model and dataset have finished loading.", lambda: int(resources.ready))
+
+def whatif_session():
+    """Per-session key for what-if results, so request ids never resolve across sessions."""
+    if "whatif" not in session:
+        session["whatif"] = secrets.token_hex(8)
+    return session["whatif"]
+
+def remember_whatif(result, generation=None):
+    """Keep a what-if result for later deltas; returns its request id.
+
+    ``generation`` is whatif_results.generation from before ``result`` was
+    computed; a result that outlived a model swap is not kept, so its id
+    answers 404 and the client resends the full reading.
+    """
+    request_id = secrets.token_hex(8)
+    whatif_results.set((whatif_session(), request_id), result, generation=generation)
+    return request_id
+
+def whatif_rank(inputs):
+    """Ranking stage for what-if edits: the cached, pooled recommend path."""
+    return cached_ranking(inputs)
+
+def busy_response(body):
+    """503 with Retry-After, sent when the inference pool is saturated or too slow."""
+    return body, 503, {"Retry-After": str(RETRY_AFTER)}
+
+def cached_ranking(inputs, inline=False):
+    """rank_reading() behind the LRU cache keyed on quantized inputs.
+
+    A miss ranks the quantized reading itself, so every reading sharing a
+    key gets the same ranking whichever arrived first; with the cache
+    disabled (size 0) nothing is shared and the exact reading is ranked.
+    The key carries the generation of the one snapshot the ranking is
+    computed from, so a ranking finished after a swap is never served for
+    the new model. Misses run on the inference pool, micro-batched when
+    enabled; raises QueueFull when it is saturated. ``inline`` runs a miss
+    on the calling thread instead. Hits and misses alike are counted in
+    ranking_path.
+    """
+    snapshot = resources.snapshot()
+    key = ranking = None
+    if recommendation_cache.maxsize > 0:
+        rounded = recommendation_key(inputs, CACHE_PRECISION)
+        key = (snapshot.generation, rounded)
+        ranking = recommendation_cache.get(key)
+    if ranking is None:
+        generation = recommendation_cache.generation
+        reading = inputs if key is None else quantized_inputs(rounded)
+        if inline:
+            ranking = rank_reading(reading, snapshot)
+        elif microbatcher is not None:
+            ranking = microbatcher.run((snapshot, reading), timeout=INFERENCE_TIMEOUT)
+        else:
+            ranking = inference.run(rank_reading, reading, snapshot, timeout=INFERENCE_TIMEOUT)
+        if ranking is not None and key is not None:
+            recommendation_cache.set(key, ranking, generation=generation)
+    count_ranking_path(ranking)
+    return ranking
+
+def cached_recommendation(inputs, inline=False):
+    """(primary_crop, suggestions, tips) for a reading, or None: the cached ranking plus
+    tips generated from the exact reading, which are cheap and depend on unrounded values.
+    """
+    ranking = cached_ranking(inputs, inline=inline)
+    if ranking is None:
+        return None
+    primary_crop, suggestions, _ = ranking
+    return primary_crop, suggestions, growing_tips(inputs, primary_crop)
+
+def schedule_thumbnail(name):
+    """Queue downscaling of a stored avatar; when the pool is full the original is served."""
+    try:
+        avatar_pool.submit(make_thumbnail, UPLOAD_FOLDER, name, AVATAR_SIZE)
+    except QueueFull:
+        pass
+
+@app.template_global()
+def avatar_url(avatar):
+    """URL for the session's avatar: its thumbnail once made, else the stored original.
+
+    Values that are not stored uploads (e.g. data: URLs from the browser) pass through.
+    """
+    if not is_stored_name(avatar):
+        return avatar
+    thumb = thumbnail_name(avatar, AVATAR_SIZE)
+    if os.path.exists(os.path.join(UPLOAD_FOLDER, thumb)):
+        avatar = thumb
+    return url_for("uploaded_file", name=avatar)
+
+@app.template_global()
+def asset_url(filename):
+    """URL for a static file: its fingerprinted /assets/ name when STATIC_CACHE is on."""
+    name = None if assets is None else assets.url_name(filename)
+    if name is None:
+        return url_for("static", filename=filename)
+    return url_for("asset", name=name)
+
+@app.route("/assets/<path:name>")
+def asset(name):
+    """Serve a fingerprinted static file; its name changes with its content, so it never goes stale."""
+    item = None if assets is None else assets.get(name)
+    if item is None:
+        return jsonify({"error": "Not found."}), 404
+    encoding = choose_encoding(request.accept_encodings, item.variants)
+    response = make_response(item.variants[encoding] if encoding else item.data)
+    response.content_type = item.content_type
+    if encoding:
+        response.content_encoding = encoding
+    if item.variants:
+        response.vary.add("Accept-Encoding")
+    response.set_etag(variant_etag(item.etag, encoding))
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+def render_shell(template, **context):
+    """Render a GET page, reusing the cached HTML for the same template, context and session profile.
+
+    Answers with the best pre-compressed variant the client accepts and
+    that variant's ETag (304 when the browser's copy matches).
+    """
+    with STAGE_RENDER.time():
+        # The avatar's URL, not its name, so pages pick up the thumbnail once it is made
+        key = (template, tuple(sorted(context.items())),
+               session.get("profile_username"), avatar_url(session.get("profile_avatar")))
+        shell = shell_cache.get(key)
+        if shell is None:
+            shell = Shell(render_template(template, **context))
+            shell_cache.set(key, shell)
+        encoding = choose_encoding(request.accept_encodings, shell.variants)
+        response = make_response(shell.variants[encoding] if encoding else shell.body)
+        if encoding:
+            response.content_encoding = encoding
+        if shell.variants:
+            response.vary.add("Accept-Encoding")
+        response.set_etag(variant_etag(shell.etag, encoding))
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
 @app.route("/")
 def landing():
-    return render_template(
-        "landing.html",
-        profile_username=session.get("profile_username"),
-        profile_avatar=session.get("profile_avatar"),
-    )
+    return render_shell("landing.html", profile_username=session.get("profile_username"))
 
 @app.route("/profile", methods=["GET", "POST"])
 def profile():
@@ -168,156 +579,318 @@ def profile():
         session["profile_favorite"] = (request.form.get("favorite", "").strip() or None)
         session["profile_bio"] = (request.form.get("bio", "").strip() or None)
 
-        # Optional avatar upload
+        # Optional avatar upload, streamed to disk under its content hash
         avatar = request.files.get("avatar")
         if avatar and avatar.filename:
-            fname = secure_filename(avatar.filename)
-            save_path = os.path.join(app.config["UPLOAD_FOLDER"], fname)
             try:
-                avatar.save(save_path)
-                session["profile_avatar"] = fname
-            except Exception:
+                name, created = store_upload(avatar.stream, UPLOAD_FOLDER, AVATAR_MAX_BYTES)
+            except UploadTooLarge:
+                AVATAR_UPLOADS.labels(outcome="too_large").inc()
+            except (UploadError, OSError):
                 # If saving fails, just skip storing an avatar
-                pass
+                AVATAR_UPLOADS.labels(outcome="rejected").inc()
+            else:
+                AVATAR_UPLOADS.labels(outcome="stored" if created else "duplicate").inc()
+                session["profile_avatar"] = name
+                if created:
+                    schedule_thumbnail(name)
 
         return redirect(url_for("mode_select"))
     # The dedicated profile page was removed; redirect to mode selection.
     return redirect(url_for("mode_select"))
 
+@app.route("/uploads/<name>")
+def uploaded_file(name):
+    """Serve a stored upload; content-hash names never change content, so caches may keep them."""
+    if not is_stored_name(name):
+        return jsonify({"error": "Not found."}), 404
+    response = send_from_directory(UPLOAD_FOLDER, name, max_age=UPLOAD_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
 @app.route("/select")
 def mode_select():
-    return render_template(
-        "mode_select.html",
-        profile_username=session.get("profile_username"),
-        profile_avatar=session.get("profile_avatar"),
-    )
+    return render_shell("mode_select.html", profile_username=session.get("profile_username"))
 
 @app.route("/recommend", methods=["GET", "POST"])
 def recommend():
+    if request.method == "GET":
+        return render_shell("recommend.html", result=None, error=None)
     result = None
     error = None
-    if request.method == "POST":
-        try:
-            profile_username = request.form.get("profile_username")
-            profile_avatar = request.form.get("profile_avatar")
-            if profile_username is not None:
-                session["profile_username"] = profile_username.strip()
-            if profile_avatar is not None:
-                session["profile_avatar"] = profile_avatar
-
-            inputs = {
-                "n": float(request.form["n"]),
-                "p": float(request.form["p"]),
-                "k": float(request.form["k"]),
-                "temperature": float(request.form["temperature"]),
-                "humidity": float(request.form["humidity"]),
-                "ph": float(request.form["ph"]),
-                "rainfall": float(request.form["rainfall"]),
-                "soil_type": request.form["soil_type"],
-                "climate": request.form["climate"]
+    try:
+        profile_username = request.form.get("profile_username")
+        profile_avatar = request.form.get("profile_avatar")
+        if profile_username is not None:
+            session["profile_username"] = profile_username.strip()
+        if profile_avatar is not None:
+            session["profile_avatar"] = profile_avatar
+
+        started = time.perf_counter()
+        inputs = {
+            "n": float(request.form["n"]),
+            "p": float(request.form["p"]),
+            "k": float(request.form["k"]),
+            "temperature": float(request.form["temperature"]),
+            "humidity": float(request.form["humidity"]),
+            "ph": float(request.form["ph"]),
+            "rainfall": float(request.form["rainfall"]),
+            "soil_type": request.form["soil_type"],
+            "climate": request.form["climate"]
+        }
+        STAGE_PARSE.observe(time.perf_counter() - started)
+
+        recommendation = cached_recommendation(inputs, inline="profile" in g)
+        if recommendation is None:
+            error = "Unable to generate recommendations at this time."
+        else:
+            primary_crop, suggestions, tips = recommendation
+            # Build result structure; keep top as primary and provide several alternatives
+            result = {
+                "mode": "recommend",
+                "crop": primary_crop,
+                "message": "Top matches ranked by suitability to your conditions.",
+                "inputs": inputs,
+                "alternatives": [s for s in suggestions if s.get("crop") != primary_crop],
+                "tips": list(tips),
             }
+    except (QueueFull, TimeoutError):
+        return busy_response(render_template("recommend.html", result=None,
+                                             error="The server is busy. Please try again in a moment."))
+    except Exception as e:
+        error = f"Error processing request: {str(e)}"
 
-            X = pd.DataFrame([[inputs["n"], inputs["p"], inputs["k"], inputs["temperature"], inputs["humidity"], inputs["ph"], inputs["rainfall"]]],
-                             columns=["n", "p", "k", "temperature", "humidity", "ph", "rainfall"])
-
-            candidates = None
-            primary_crop = None
-            # Try model top-N first
-            suggestions = []
-            primary_crop = None
-
-            if model is not None:
-                X = pd.DataFrame([[inputs["n"], inputs["p"], inputs["k"], inputs["temperature"], inputs["humidity"], inputs["ph"], inputs["rainfall"]]],
-                                 columns=["n", "p", "k", "temperature", "humidity", "ph", "rainfall"])
-                try:
-                    # Prefer probability-based ranking when available
-                    if hasattr(model, "predict_proba"):
-                        proba = model.predict_proba(X)[0]
-                        classes = list(getattr(model, "classes_", []))
-                        ranked = sorted(zip(classes, proba), key=lambda t: t[1], reverse=True)
-                        for crop_name, p in ranked[:5]:
-                            suggestions.append({"crop": str(crop_name), "suitability": int(round(p * 100))})
-                        if suggestions:
-                            primary_crop = suggestions[0]["crop"]
-                    else:
-                        # Fallback: single prediction plus dataset-based ranking
-                        primary_crop = str(model.predict(X)[0])
-                except Exception:
-                    # Model exists but failed; ignore and use dataset fallback
-                    pass
-
-            # Dataset-based ranking if needed or to supplement
-            if not suggestions:
-                suggestions = top_crops_by_dataset(inputs, k=5)
-                if suggestions:
-                    primary_crop = suggestions[0]["crop"]
-
-            if primary_crop is None and not suggestions:
-                error = "Unable to generate recommendations at this time."
-            else:
-                if primary_crop is None and suggestions:
-                    primary_crop = suggestions[0]["crop"]
-                # Build result structure; keep top as primary and provide several alternatives
-                result = {
-                    "mode": "recommend",
-                    "crop": primary_crop,
-                    "message": "Top matches ranked by suitability to your conditions.",
-                    "inputs": inputs,
-                    "alternatives": [s for s in suggestions if s.get("crop") != primary_crop]
-                }
-                # Always include growing tips so the UI isn't empty
-                try:
-                    result["tips"] = generate_growing_tips(inputs, primary_crop)
-                except Exception:
-                    result["tips"] = [
-                        "Maintain 2–3 cm mulch, water deeply, and monitor weekly.",
-                        "Use balanced, slow-release fertilizer and avoid overfeeding.",
-                        "Ensure good airflow; avoid overhead watering in humid periods."
-                    ]
-        except Exception as e:
-            error = f"Error processing request: {str(e)}"
-
-    return render_template("recommend.html", result=result, error=error)
+    with STAGE_RENDER.time():
+        return render_template("recommend.html", result=result, error=error)
 
 @app.route("/advisor", methods=["GET", "POST"])
 def advisor():
+    if request.method == "GET":
+        return render_shell("advisor.html", result=None, error=None)
     result = None
     error = None
-    if request.method == "POST":
-        try:
-            profile_username = request.form.get("profile_username")
-            profile_avatar = request.form.get("profile_avatar")
-            if profile_username is not None:
-                session["profile_username"] = profile_username.strip()
-            if profile_avatar is not None:
-                session["profile_avatar"] = profile_avatar
-
-            inputs = {
-                "n": float(request.form["n"]),
-                "p": float(request.form["p"]),
-                "k": float(request.form["k"]),
-                "temperature": float(request.form["temperature"]),
-                "humidity": float(request.form["humidity"]),
-                "ph": float(request.form["ph"]),
-                "rainfall": float(request.form["rainfall"]),
-                "soil_type": request.form["soil_type"],
-                "climate": request.form["climate"]
-            }
-            current_plant = request.form.get("current_plant", "your plant")
-            inputs["crop"] = current_plant
+    try:
+        profile_username = request.form.get("profile_username")
+        profile_avatar = request.form.get("profile_avatar")
+        if profile_username is not None:
+            session["profile_username"] = profile_username.strip()
+        if profile_avatar is not None:
+            session["profile_avatar"] = profile_avatar
+
+        started = time.perf_counter()
+        inputs = {
+            "n": float(request.form["n"]),
+            "p": float(request.form["p"]),
+            "k": float(request.form["k"]),
+            "temperature": float(request.form["temperature"]),
+            "humidity": float(request.form["humidity"]),
+            "ph": float(request.form["ph"]),
+            "rainfall": float(request.form["rainfall"]),
+            "soil_type": request.form["soil_type"],
+            "climate": request.form["climate"]
+        }
+        STAGE_PARSE.observe(time.perf_counter() - started)
+        current_plant = request.form.get("current_plant", "your plant")
+        inputs["crop"] = current_plant
+        with STAGE_RULES.time():
             condition, reason, advice = apply_rules(inputs)
-            result = {
-                "mode": "diagnose",
-                "plant": current_plant,
-                "condition": condition,
-                "reason": reason,
-                "advice": advice,
-                "inputs": inputs
-            }
-        except Exception as e:
-            error = f"Error processing request: {str(e)}"
+        result = {
+            "mode": "diagnose",
+            "plant": current_plant,
+            "condition": condition,
+            "reason": reason,
+            "advice": advice,
+            "inputs": inputs,
+        }
+    except Exception as e:
+        error = f"Error processing request: {str(e)}"
+
+    with STAGE_RENDER.time():
+        return render_template("advisor.html", result=result, error=error)
+
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch_api():
+    """Rank crops for many readings at once.
+
+    Accepts a JSON list of readings (or {"readings": [...]}), a text/csv body,
+    or a CSV upload in the "file" field. Optional ?top_n= query parameter.
+    """
+    try:
+        upload = request.files.get("file")
+        if upload:
+            records = readings_from_csv(upload.read().decode("utf-8-sig"))
+        elif request.mimetype == "text/csv":
+            records = readings_from_csv(request.get_data(as_text=True))
+        else:
+            payload = request.get_json(silent=True)
+            records = payload.get("readings") if isinstance(payload, dict) else payload
+        top_n = int(request.args.get("top_n", TOP_N))
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Invalid batch payload: {e}"}), 400
 
-    return render_template("advisor.html", result=result, error=error)
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a non-empty list of readings."}), 400
+    if len(records) > BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch exceeds {BATCH_MAX_ROWS} readings."}), 413
+
+    snapshot = resources.snapshot()
+    paths = []
+    try:
+        results = inference.run(recommend_batch, records, model=snapshot.model,
+                                dataset_index=fallback_index(snapshot), top_n=top_n, on_model_error=count_model_error,
+                                on_path=paths.append, timeout=INFERENCE_TIMEOUT)
+    except (QueueFull, TimeoutError):
+        return busy_response(jsonify({"error": "Inference queue is full; retry later."}))
+    except BatchValidationError as e:
+        return jsonify({"error": str(e), "rows": e.errors}), 400
+    except ModelInferenceError as e:
+        # No dataset to fall back to: the same outcome as a reading nothing could rank
+        count_model_error(e.__cause__)
+        PATH_ERROR.inc(len(records))
+        return jsonify({"error": "Unable to generate recommendations at this time."}), 503
+    for result in results:
+        # One ranking_path count per row, like one per /recommend response
+        (RANKING_PATHS[paths[0]] if result["crop"] is not None else PATH_ERROR).inc()
+    return jsonify({"count": len(results), "results": results})
+
+@app.route("/api/whatif", methods=["POST"])
+def whatif():
+    """Re-evaluate a reading after an edit, redoing only the stages the edit affects.
+
+    JSON body: {"inputs": {...all fields...}} for a new reading, or
+    {"base": "<request_id>", "changes": {"ph": 6.8}} against an earlier result
+    from this session. "rank": false skips crop ranking (diagnosis and tips only).
+    Responds with a new request_id, the results and which stages were recomputed.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object."}), 400
+    previous = None
+    try:
+        rank = payload.get("rank", True)
+        if not isinstance(rank, bool):
+            raise ValueError("'rank' must be true or false")
+        if payload.get("base"):
+            previous = whatif_results.get((whatif_session(), str(payload["base"])))
+            if previous is None:
+                return jsonify({"error": "Unknown or expired base request; send full inputs."}), 404
+            changes = payload.get("changes") or {}
+            if not isinstance(changes, dict):
+                raise ValueError("'changes' must be an object")
+            inputs = apply_changes(previous.inputs, changes)
+        else:
+            fields = payload.get("inputs")
+            if not isinstance(fields, dict):
+                raise ValueError("expected 'inputs' or 'base'")
+            missing = [f for f in INPUT_FIELDS if f not in fields]
+            if missing:
+                raise ValueError(f"missing field '{missing[0]}'")
+            inputs = apply_changes({}, {f: fields[f] for f in INPUT_FIELDS})
+    except ValueError as e:
+        return jsonify({"error": f"Invalid what-if request: {e}"}), 400
+
+    generation = whatif_results.generation
+    try:
+        with STAGE_WHATIF.time():
+            result = evaluate_whatif(inputs, rank=whatif_rank if rank else None, previous=previous)
+    except (QueueFull, TimeoutError):
+        return busy_response(jsonify({"error": "Inference queue is full; retry later."}))
+    return jsonify(dict(result.to_dict(), request_id=remember_whatif(result, generation)))
+
+@app.route("/api/observations", methods=["POST"])
+def add_observations():
+    """Append labelled field readings to the live dataset indexes without a restart.
+
+    Accepts the same JSON / CSV shapes as the batch API, with a "label" per
+    reading. Requires "Authorization: Bearer <VERDANTIA_INGEST_TOKEN>".
+    """
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not INGEST_TOKEN or not hmac.compare_digest(supplied, INGEST_TOKEN):
+        return jsonify({"error": "Observation ingestion is disabled or the token is wrong."}), 403
+    try:
+        upload = request.files.get("file")
+        if upload:
+            records = readings_from_csv(upload.read().decode("utf-8-sig"))
+        elif request.mimetype == "text/csv":
+            records = readings_from_csv(request.get_data(as_text=True))
+        else:
+            payload = request.get_json(silent=True)
+            records = payload.get("observations") if isinstance(payload, dict) else payload
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Invalid observations payload: {e}"}), 400
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a non-empty list of observations."}), 400
+    if len(records) > BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch exceeds {BATCH_MAX_ROWS} observations."}), 413
+
+    try:
+        values, labels = observations_from_records(records)
+        rows = resources.append_observations(values, labels)
+    except BatchValidationError as e:
+        return jsonify({"error": str(e), "rows": e.errors}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"added": len(labels), "rows": rows})
+
+@app.route("/ready")
+def ready():
+    """Readiness probe: 200 once the model and dataset have finished loading, 503 before."""
+    status = resources.status()
+    status["inference"] = inference.stats()
+    status["avatars"] = avatar_pool.stats()
+    if registry_watcher is not None:
+        status["registry"] = {"active": registry_watcher.current, "error": registry_watcher.last_error}
+    if microbatcher is not None:
+        status["microbatch"] = microbatcher.stats()
+    return jsonify(status), (200 if status["ready"] else 503)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text-format metrics: request/stage latency histograms and counters."""
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(_error):
+    limit = app.config["MAX_CONTENT_LENGTH"]
+    if request.path.startswith("/api/"):
+        return jsonify({"error": f"Request body exceeds {limit} bytes."}), 413
+    return f"Request body exceeds {limit} bytes.", 413, {"Content-Type": "text/plain; charset=utf-8"}
+
+def compress_response(response):
+    """Gzip a dynamic HTML/JSON response in place when the client accepts it and it is large enough."""
+    # Responses with an ETag chose their own encoding; gzipping them here would reuse it for other bytes
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed or response.content_encoding
+            or "ETag" in response.headers or response.mimetype not in ("text/html", "application/json")
+            or not request.accept_encodings["gzip"]):
+        return
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return
+    response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0))
+    response.content_encoding = "gzip"
+    response.vary.add("Accept-Encoding")
+
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    if profiler.wants(request.headers):
+        g.profile = profiler.start()
+
+@app.after_request
+def record_request(response):
+    if STATIC_CACHE:
+        compress_response(response)
+    if "profile" in g:
+        path = profiler.finish(g.pop("profile"), request.endpoint or "request")
+        response.headers["X-Verdantia-Profile-File"] = os.path.basename(path)
+    if "started" in g:
+        REQUEST_SECONDS.labels(endpoint=request.endpoint or "unknown", method=request.method,
+                               status=response.status_code).observe(time.perf_counter() - g.started)
+    return response
 
 # Static files are served from /static by default (web_app/static)
 
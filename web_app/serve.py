@@ -0,0 +1,46 @@
+"""Production entry point: serve the app from a multi-threaded WSGI server.
+
+Uses waitress when it is installed and falls back to Werkzeug's threaded
+server otherwise. Inference is bounded separately by the app's pool
+(VERDANTIA_INFERENCE_WORKERS / VERDANTIA_INFERENCE_QUEUE), so connection
+threads stay free to answer cache hits and 503s while the model is busy.
+Waitress buffers each request body before handing it to a thread and
+refuses bodies over the app's MAX_CONTENT_LENGTH, so slow or oversized
+uploads never occupy one.
+
+    python web_app/serve.py [--host 0.0.0.0] [--port 8000] [--threads 16]
+"""
+import argparse
+import os
+
+from app import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get("VERDANTIA_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("VERDANTIA_PORT", "8000")))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("VERDANTIA_HTTP_THREADS", "16")),
+                        help="connection-handling threads")
+    parser.add_argument("--backlog", type=int, default=int(os.environ.get("VERDANTIA_HTTP_BACKLOG", "128")),
+                        help="pending connections the socket accepts (waitress only)")
+    args = parser.parse_args()
+
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    if serve is not None:
+        print(f"Serving on http://{args.host}:{args.port} (waitress, {args.threads} threads)")
+        limit = app.config.get("MAX_CONTENT_LENGTH")
+        options = {} if limit is None else {"max_request_body_size": limit}
+        serve(app, host=args.host, port=args.port, threads=args.threads, backlog=args.backlog, **options)
+    else:
+        from werkzeug.serving import make_server
+        print(f"Serving on http://{args.host}:{args.port} (werkzeug threaded; install waitress for production)")
+        make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
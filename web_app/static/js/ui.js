@@ -26,3 +26,102 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   });
 });
+
+// What-if edits: once a result is on screen, the form is filled with its inputs. The
+// first change sends the whole reading to /api/whatif; every later one is sent as a
+// delta against the last result, so only the stages it affects are recomputed. The
+// result card updates in place.
+document.addEventListener('DOMContentLoaded', () => {
+  const card = document.querySelector('[data-whatif-inputs]');
+  const form = document.querySelector('form[method="POST"]');
+  if (!card || !form) return;
+
+  const rank = card.dataset.whatifRank !== 'false';
+  const inputs = JSON.parse(card.dataset.whatifInputs || '{}');
+  let base = null;
+  let pending = {};
+  let timer = null;
+  let inFlight = false;
+
+  Object.entries(inputs).forEach(([name, value]) => {
+    const el = form.elements[name];
+    if (el && el.type !== 'hidden') el.value = value;
+  });
+
+  const setText = (key, value) => {
+    card.querySelectorAll(`[data-whatif="${key}"]`).forEach((el) => { el.textContent = value ?? ''; });
+  };
+
+  const setList = (key, items, render) => {
+    card.querySelectorAll(`[data-whatif="${key}"]`).forEach((list) => {
+      list.replaceChildren(...items.map((item) => {
+        const li = document.createElement('li');
+        render(li, item);
+        return li;
+      }));
+    });
+  };
+
+  const update = (data) => {
+    base = data.request_id;
+    card.querySelectorAll('[data-whatif-stale]').forEach((el) => { el.hidden = true; });
+    card.querySelectorAll('[data-whatif-input]').forEach((el) => {
+      el.textContent = data.inputs[el.dataset.whatifInput];
+    });
+    setText('condition', data.diagnosis.condition);
+    setText('reason', data.diagnosis.reason);
+    setText('advice', data.diagnosis.advice);
+    if (!rank) return;
+    setText('crop', data.crop);
+    setList('tips', data.tips, (li, tip) => { li.textContent = tip; });
+    setList('alternatives', data.suggestions.filter((s) => s.crop !== data.crop), (li, alt) => {
+      const name = document.createElement('strong');
+      name.textContent = alt.crop;
+      li.append(name);
+      if (alt.suitability !== undefined) {
+        const score = document.createElement('span');
+        score.className = 'alt-confidence';
+        score.textContent = ` — suitability ${alt.suitability}%`;
+        li.append(' ', score);
+      }
+    });
+  };
+
+  const fullInputs = () => Object.fromEntries(Object.keys(inputs)
+    .filter((name) => form.elements[name])
+    .map((name) => [name, form.elements[name].value]));
+
+  const post = (body) => fetch('/api/whatif', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    credentials: 'same-origin',
+    body: JSON.stringify(Object.assign({ rank }, body)),
+  });
+
+  const send = async () => {
+    if (inFlight || !Object.keys(pending).length) return;
+    const changes = pending;
+    pending = {};
+    inFlight = true;
+    try {
+      let response = base ? await post({ base, changes }) : null;
+      if (!response || response.status === 404) response = await post({ inputs: fullInputs() });
+      if (response.ok) update(await response.json());
+    } catch (err) {
+      // Network hiccup: the next edit (or Analyze) brings the card back in sync
+    } finally {
+      inFlight = false;
+      send();
+    }
+  };
+
+  const queue = (event) => {
+    const { name, value } = event.target;
+    if (!(name in inputs) || value === '') return;
+    pending[name] = value;
+    clearTimeout(timer);
+    timer = setTimeout(send, 150);
+  };
+  form.addEventListener('input', queue);
+  form.addEventListener('change', queue);
+});